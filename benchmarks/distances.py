@@ -0,0 +1,95 @@
+"""Benchmark of the surface distances (:class:`pymia.evaluation.metric.Distances`) against the previous implementation,
+which computed the surface area table in Python loops, the distance transforms of the entire bounding box, and sorted
+the surface elements with :code:`sorted(zip(...))`."""
+import argparse
+import timeit
+
+import numpy as np
+import scipy.ndimage as ndimage
+
+import pymia.evaluation.metric as metric
+import pymia.evaluation.metric.base as base
+
+
+def previous_distances(prediction: np.ndarray, reference: np.ndarray, spacing: tuple):
+    neighbour_code_to_surface_area = np.zeros([256])
+    for code in range(256):
+        normals = np.array(base._neighbour_code_to_normals[code])
+        sum_area = 0
+        for normal_idx in range(normals.shape[0]):
+            n = np.zeros([3])
+            n[0] = normals[normal_idx, 0] * spacing[1] * spacing[2]
+            n[1] = normals[normal_idx, 1] * spacing[0] * spacing[2]
+            n[2] = normals[normal_idx, 2] * spacing[0] * spacing[1]
+            sum_area += np.linalg.norm(n)
+        neighbour_code_to_surface_area[code] = sum_area
+
+    mask_all = reference | prediction
+    bbox_min = [np.flatnonzero(np.max(np.max(mask_all, axis=a), axis=b)).min() for a, b in ((2, 1), (2, 0), (1, 0))]
+    bbox_max = [np.flatnonzero(np.max(np.max(mask_all, axis=a), axis=b)).max() for a, b in ((2, 1), (2, 0), (1, 0))]
+    bbox = tuple(slice(mn, mx + 1) for mn, mx in zip(bbox_min, bbox_max))
+
+    kernel = np.array([[[128, 64], [32, 16]], [[8, 4], [2, 1]]])
+    results = []
+    for arr in (reference, prediction):
+        cropmask = np.zeros(np.array(bbox_max) - np.array(bbox_min) + 2, np.uint8)
+        cropmask[0:-1, 0:-1, 0:-1] = arr[bbox]
+        code_map = ndimage.correlate(cropmask, kernel, mode='constant', cval=0)
+        borders = (code_map != 0) & (code_map != 255)
+        results.append((code_map, borders, ndimage.distance_transform_edt(~borders, sampling=spacing)))
+    (code_map_gt, borders_gt, distmap_gt), (code_map_pred, borders_pred, distmap_pred) = results
+
+    surfels_gt = np.array(sorted(zip(distmap_pred[borders_gt], neighbour_code_to_surface_area[code_map_gt][borders_gt])))
+    surfels_pred = np.array(sorted(zip(distmap_gt[borders_pred],
+                                       neighbour_code_to_surface_area[code_map_pred][borders_pred])))
+    return surfels_gt[:, 0], surfels_pred[:, 0], surfels_gt[:, 1], surfels_pred[:, 1]
+
+
+def get_spheres(size: int):
+    z, y, x = np.ogrid[:size, :size, :size]
+    center, radius = size / 2, size * 0.3
+    reference = ((z - center) ** 2 + (y - center) ** 2 + (x - center) ** 2 < radius ** 2).astype(np.uint8)
+    prediction = ((z - center - 4) ** 2 + (y - center + 2) ** 2 + (x - center) ** 2 < (radius - 2) ** 2).astype(np.uint8)
+    return prediction, reference
+
+
+def main(size: int, repeat: int):
+    prediction, reference = get_spheres(size)
+    spacing = (1.0, 1.0, 1.5)
+
+    distances = metric.Distances(prediction, reference, spacing)
+    expected = previous_distances(prediction, reference, spacing)
+    for actual, previous in zip((distances.distances_gt_to_pred, distances.distances_pred_to_gt,
+                                 distances.surfel_areas_gt, distances.surfel_areas_pred), expected):
+        np.testing.assert_allclose(actual, previous)
+
+    current = min(timeit.repeat(lambda: metric.Distances(prediction, reference, spacing), number=1, repeat=repeat))
+    previous = min(timeit.repeat(lambda: previous_distances(prediction, reference, spacing), number=1, repeat=repeat))
+    print('Distances of {0}^3 spheres ({1} surface elements)'.format(size, len(distances.surfel_areas_gt)))
+    print('previous: {:.3f} s, current: {:.3f} s, speedup: {:.1f}x'.format(previous, current, previous / current))
+
+
+if __name__ == '__main__':
+    """The program's entry point.
+
+    Parse the arguments and run the program.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark of the surface distances')
+
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=256,
+        help='The size of the cubic volume.'
+    )
+
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='The number of repetitions (the minimum time is reported).'
+    )
+
+    args = parser.parse_args()
+    main(args.size, args.repeat)
@@ -0,0 +1,69 @@
+"""Benchmark of the structural similarity (:class:`pymia.evaluation.metric.StructuralSimilarityIndexMeasure`) against
+:func:`skimage.metrics.structural_similarity`, which the previous implementation called on the entire float64 volume."""
+import argparse
+import timeit
+
+import numpy as np
+import skimage.metrics
+
+import pymia.evaluation.metric as metric
+
+
+def get_volumes(size: int):
+    rs = np.random.RandomState(0)
+    z, y, x = np.ogrid[:size, :size, :size]
+    reference = (1000 * np.exp(-((z - size / 2) ** 2 + (y - size / 2) ** 2 + (x - size / 2) ** 2) / (size / 3) ** 2)
+                 + 20 * rs.rand(size, size, size)).astype(np.float32)
+    prediction = reference + 10 * rs.randn(size, size, size).astype(np.float32)
+    return prediction, reference
+
+
+def main(size: int, repeat: int, gaussian_weights: bool):
+    prediction, reference = get_volumes(size)
+
+    ssim = metric.StructuralSimilarityIndexMeasure(gaussian_weights=gaussian_weights)
+    ssim.prediction, ssim.reference = prediction, reference
+
+    def previous():
+        return skimage.metrics.structural_similarity(reference, prediction, data_range=float(reference.max()),
+                                                     gaussian_weights=gaussian_weights)
+
+    np.testing.assert_allclose(ssim.calculate(), previous(), rtol=1e-5)
+
+    current_time = min(timeit.repeat(ssim.calculate, number=1, repeat=repeat))
+    previous_time = min(timeit.repeat(previous, number=1, repeat=repeat))
+    print('SSIM of {0}^3 volumes ({1} weights)'.format(size, 'Gaussian' if gaussian_weights else 'uniform'))
+    print('previous: {:.3f} s, current: {:.3f} s, speedup: {:.1f}x'.format(previous_time, current_time,
+                                                                           previous_time / current_time))
+
+
+if __name__ == '__main__':
+    """The program's entry point.
+
+    Parse the arguments and run the program.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark of the structural similarity')
+
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=256,
+        help='The size of the cubic volume.'
+    )
+
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='The number of repetitions (the minimum time is reported).'
+    )
+
+    parser.add_argument(
+        '--gaussian',
+        action='store_true',
+        help='Weight the window with a Gaussian instead of uniformly.'
+    )
+
+    args = parser.parse_args()
+    main(args.size, args.repeat, args.gaussian)
@@ -1,8 +1,12 @@
 import abc
+import functools
+import os
+import threading
 import typing
 
 import numpy as np
 
+import pymia.data.creation.writer as wr
 import pymia.data.definition as defs
 import pymia.data.transformation as tfm
 import pymia.data.extraction as extr
@@ -41,92 +45,501 @@ class Assembler(abc.ABC):
 
 
 def numpy_zeros(shape: tuple, assembling_key: str, subject_index: int):
+    """Initializes the predictions as :code:`np.float64` arrays (the former default :code:`zero_fn` of the assemblers,
+    which now allocate the dtype of the predictions, see :class:`.BoundedAssembler`)."""
     return np.zeros(shape)
 
 
-class SubjectAssembler(Assembler):
+class MemmapZeros:
 
-    def __init__(self, datasource: extr.PymiaDatasource, zero_fn=numpy_zeros, assemble_interaction_fn=None):
+    def __init__(self, directory: str, dtype=np.float32) -> None:
+        """Initializes the predictions as memory-mapped arrays (:code:`zero_fn` of the assemblers).
+
+        The predictions are stored in .npy files (:code:`<subject_index>_<key>.npy`) in :obj:`directory` such that the
+        memory required is independent of the image size. The files of the assembled subjects can be loaded with
+        :code:`np.load(file, mmap_mode='r')` and need to be deleted by the user.
+
+        Args:
+            directory (str): The directory of the files, which is created if it does not exist.
+            dtype: The data type of the predictions (e.g., :code:`np.float16` or :code:`np.uint8` with
+                :class:`QuantizeInteractionFn`).
+        """
+        self.directory = directory
+        self.dtype = dtype
+
+    def get_file_path(self, assembling_key: str, subject_index: int) -> str:
+        """Get the file path of a prediction.
+
+        Args:
+            assembling_key (str): The key of the prediction.
+            subject_index (int): The subject index.
+
+        Returns:
+            str: The file path.
+        """
+        return os.path.join(self.directory, '{}_{}.npy'.format(subject_index, assembling_key.strip('_')))
+
+    def __call__(self, shape: tuple, assembling_key: str, subject_index: int) -> np.memmap:
+        os.makedirs(self.directory, exist_ok=True)
+        # a new .npy file is zero-initialized (sparse file)
+        return np.lib.format.open_memmap(self.get_file_path(assembling_key, subject_index), mode='w+',
+                                         dtype=self.dtype, shape=shape)
+
+
+class Hdf5Zeros:
+
+    def __init__(self, writer: wr.Hdf5Writer, dtype=np.float32, entry: str = 'predictions/{subject}/{key}',
+                 chunks: typing.Union[tuple, bool] = True, compression=None) -> None:
+        """Initializes the predictions as datasets of an (open) HDF5 file (:code:`zero_fn` of the assemblers).
+
+        The predictions are stored in the HDF5 file only, such that the memory required is independent of the image
+        size. The assemblers return the :class:`h5py.Dataset` of the assembled subjects.
+
+        Args:
+            writer (.Hdf5Writer): The open writer of the output file.
+            dtype: The data type of the predictions (e.g., :code:`np.float16` or :code:`np.uint8` with
+                :class:`QuantizeInteractionFn`).
+            entry (str): The entry of the datasets with :code:`subject` and :code:`key` placeholders.
+            chunks (tuple, bool): The chunk shape (see :meth:`.Hdf5Writer.reserve`).
+            compression (str, int): The compression filter (see :meth:`.Hdf5Writer.reserve`).
+        """
+        self.writer = writer
+        self.dtype = dtype
+        self.entry = entry
+        self.chunks = chunks
+        self.compression = compression
+
+    def __call__(self, shape: tuple, assembling_key: str, subject_index: int):
+        entry = self.entry.format(subject=subject_index, key=assembling_key.strip('_'))
+        if entry in self.writer.h5:
+            del self.writer.h5[entry]
+        self.writer.reserve(entry, shape, self.dtype, chunks=self.chunks, compression=self.compression)
+        return self.writer.h5[entry]
+
+
+def _divide(arr, divisor):
+    # divides in place if possible, datasets (e.g., h5py) are divided along the first axis to bound the memory
+    if isinstance(arr, np.ndarray):
+        if np.issubdtype(arr.dtype, np.floating):
+            arr /= divisor
+            return arr
+        return arr / divisor
+    for i in range(arr.shape[0]):
+        arr[i] = arr[i] / (divisor[i] if isinstance(divisor, np.ndarray) else divisor)
+    return arr
+
+
+def _flush(arr):
+    # writes the data of out-of-core predictions (e.g., np.memmap, h5py.Dataset) to disk
+    if hasattr(arr, 'flush'):
+        arr.flush()
+
+
+def uniform_weights(shape: tuple) -> np.ndarray:
+    """Uniform importance map, i.e. overlapping predictions are averaged (see :class:`.SubjectAssembler`).
+
+    Args:
+        shape (tuple): The (spatial) shape of the prediction.
+
+    Returns:
+        np.ndarray: The weights of shape :obj:`shape`.
+    """
+    return np.ones(shape, dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=8)
+def gaussian_weights(shape: tuple, sigma_scale: float = 0.125) -> np.ndarray:
+    """Gaussian importance map, which weights the center of a prediction higher than its border (see
+    :class:`.SubjectAssembler`). This reduces artifacts at the borders of overlapping patches.
+
+    Args:
+        shape (tuple): The (spatial) shape of the prediction.
+        sigma_scale (float): The standard deviation of the Gaussian relative to the shape.
+
+    Returns:
+        np.ndarray: The (read-only) weights of shape :obj:`shape` with maximum 1.
+    """
+    weights = np.ones((), dtype=np.float32)
+    for size in shape:
+        # separable, i.e. the outer product of one-dimensional Gaussians
+        x = np.arange(size, dtype=np.float32) - (size - 1) / 2
+        sigma = max(size * sigma_scale, np.finfo(np.float32).eps)
+        weights = np.multiply.outer(weights, np.exp(-0.5 * (x / sigma) ** 2))
+    weights = (weights / weights.max()).astype(np.float32)
+    weights = np.maximum(weights, weights[weights > 0].min())  # prevent zero weights
+    weights.flags.writeable = False
+    return weights
+
+
+class SampleCounter:
+
+    def __init__(self, datasource: extr.PymiaDatasource, sample_indices: typing.Iterable[int] = None) -> None:
+        """Counts the assembled samples of each subject in order to determine the completely assembled subjects,
+        independent of the order of the samples.
+
+        Args:
+            datasource (.PymiaDatasource): The datasource.
+            sample_indices (iterable): The sample indices that will be assembled (e.g., a subset of the samples, see
+                :func:`.select_indices`). If :code:`None`, all samples of the datasource are expected.
+        """
+        self.datasource = datasource
+        self.sample_indices = sample_indices
+        self.expected = None
+        self.counts = None
+
+    def add(self, subject_indices: np.ndarray) -> typing.Set[int]:
+        """Counts samples.
+
+        Args:
+            subject_indices (np.ndarray): The subject index of each sample.
+
+        Returns:
+            set: The subjects that are complete with these samples.
+        """
+        if self.expected is None:
+            expected_subjects = self.datasource.indices.subject_indices
+            if self.sample_indices is not None:
+                expected_subjects = expected_subjects[np.asarray(list(self.sample_indices), dtype=np.intp)]
+            self.expected = np.bincount(expected_subjects.astype(np.intp))
+            self.counts = np.zeros_like(self.expected)
+
+        subject_indices = np.asarray(subject_indices, dtype=np.intp)
+        if len(subject_indices) == 0:
+            return set()
+        if subject_indices.max() >= len(self.counts):
+            # subjects without expected samples
+            missing = subject_indices.max() + 1 - len(self.counts)
+            self.expected = np.pad(self.expected, (0, missing))
+            self.counts = np.pad(self.counts, (0, missing))
+        self.counts += np.bincount(subject_indices, minlength=len(self.counts))
+
+        subjects = np.unique(subject_indices)
+        return set(subjects[self.counts[subjects] == self.expected[subjects]].tolist())
+
+    def reset(self, subject_index: int):
+        """Resets the count of a subject (e.g., when assembling the samples of the subject another time).
+
+        Args:
+            subject_index (int): The subject index.
+        """
+        if self.counts is not None and subject_index < len(self.counts):
+            self.counts[subject_index] = 0
+
+
+class BoundedAssembler(Assembler):
+
+    def __init__(self, datasource: extr.PymiaDatasource, dtype=None, max_subjects: int = None,
+                 max_bytes: int = None) -> None:
+        """Base class of the assemblers holding the predictions of the open subjects, i.e. the subjects with added
+        samples that are not yet retrieved by :meth:`get_assembled_subject`.
+
+        The predictions are allocated with :obj:`dtype` or, if :code:`None`, with the dtype of the first batch (per
+        key). Accumulated predictions are at least :code:`np.float32`.
+
+        The number or the memory of the open subjects can be limited, e.g., when the batches interleave many subjects
+        (shuffled samples or multiple workers). Adding a batch that opens subjects beyond the limit raises a
+        :class:`ValueError`. To apply backpressure instead, check :meth:`can_add` before adding a batch or, with separate
+        producer and consumer threads, block in :meth:`wait_for_capacity` until enough subjects are retrieved. A batch
+        is always accepted if no subject is open.
+
+        Args:
+            datasource (.PymiaDatasource): The datasource.
+            dtype: The data type of the predictions. If :code:`None`, the data type of the first batch.
+            max_subjects (int): The maximum number of open subjects. If :code:`None`, the number is not limited.
+            max_bytes (int): The maximum memory of the in-memory predictions (and weights) of the open subjects.
+                Out-of-core predictions (see :class:`MemmapZeros` and :class:`Hdf5Zeros`) are not counted, but the
+                memory of new subjects is estimated as if in-memory. If :code:`None`, the memory is not limited.
+        """
+        if max_subjects is not None and max_subjects < 1:
+            raise ValueError('max_subjects must be at least 1, got {}'.format(max_subjects))
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError('max_bytes must be at least 1, got {}'.format(max_bytes))
+        self.datasource = datasource
+        self.dtype = dtype
+        self.max_subjects = max_subjects
+        self.max_bytes = max_bytes
+        self._dtypes = {}
+        self._capacity = threading.Condition()
+        self._shape_extractor = extr.ImagePropertyShapeExtractor(numpy_format=True)
+        self._shapes = {}
+
+    @property
+    @abc.abstractmethod
+    def open_subjects(self) -> typing.Set[int]:
+        """set: The indices of the subjects with added samples that are not yet retrieved."""
+        pass
+
+    @property
+    @abc.abstractmethod
+    def nbytes(self) -> int:
+        """int: The memory (in bytes) of the in-memory predictions of the open subjects."""
+        pass
+
+    def can_add(self, to_assemble: typing.Union[np.ndarray, typing.Dict[str, np.ndarray]],
+                sample_indices: np.ndarray) -> bool:
+        """Checks whether a batch can be added without exceeding the limits (see :class:`BoundedAssembler`).
+
+        Args:
+            to_assemble (np.ndarray, dict): The batch to be added.
+            sample_indices (np.ndarray): The sample indices of the batch.
+
+        Returns:
+            bool: Whether the batch can be added.
+        """
+        if self.max_subjects is None and self.max_bytes is None:
+            return True
+        if not isinstance(to_assemble, dict):
+            to_assemble = {'__prediction': to_assemble}
+
+        with self._capacity:
+            open_subjects = self.open_subjects
+            sample_indices = np.asarray(sample_indices, dtype=np.intp).reshape(-1)
+            subject_indices = np.unique(self.datasource.indices.subject_indices[sample_indices]).tolist()
+            new_subjects = [s for s in subject_indices if s not in open_subjects]
+            if len(new_subjects) == 0 or len(open_subjects) == 0:
+                return True
+            if self.max_subjects is not None and len(open_subjects) + len(new_subjects) > self.max_subjects:
+                return False
+            if self.max_bytes is not None:
+                new_nbytes = sum(self._estimate_nbytes(to_assemble, s) for s in new_subjects)
+                if self.nbytes + new_nbytes > self.max_bytes:
+                    return False
+            return True
+
+    def wait_for_capacity(self, to_assemble: typing.Union[np.ndarray, typing.Dict[str, np.ndarray]],
+                          sample_indices: np.ndarray, timeout: float = None) -> bool:
+        """Blocks until a batch can be added (see :meth:`can_add`), i.e. until another thread retrieved enough subjects.
+
+        Args:
+            to_assemble (np.ndarray, dict): The batch to be added.
+            sample_indices (np.ndarray): The sample indices of the batch.
+            timeout (float): The maximum time to wait in seconds. If :code:`None`, waits without timeout.
+
+        Returns:
+            bool: Whether the batch can be added, i.e. :code:`False` if the timeout expired.
+        """
+        with self._capacity:
+            return self._capacity.wait_for(lambda: self.can_add(to_assemble, sample_indices), timeout)
+
+    def _check_capacity(self, to_assemble: dict, sample_indices: np.ndarray):
+        if not self.can_add(to_assemble, sample_indices):
+            raise ValueError('Batch exceeds the limit of open subjects (max_subjects={}, max_bytes={}). Retrieve the '
+                             'ready subjects before adding the batch (see can_add and wait_for_capacity)'
+                             .format(self.max_subjects, self.max_bytes))
+
+    def _release(self, subject_index: int):
+        # called (with the lock held) when a subject is retrieved
+        self._shapes.pop(subject_index, None)
+        self._capacity.notify_all()
+
+    def _get_shape(self, subject_index: int) -> tuple:
+        if subject_index not in self._shapes:
+            self._shapes[subject_index] = self.datasource.direct_extract(self._shape_extractor, subject_index)[defs.KEY_SHAPE]
+        return self._shapes[subject_index]
+
+    def _get_dtype(self, key: str, data_dtype, accumulate: bool = False) -> np.dtype:
+        if key not in self._dtypes:
+            dtype = np.dtype(self.dtype if self.dtype is not None else data_dtype)
+            if accumulate:
+                dtype = np.promote_types(dtype, np.float32)
+            self._dtypes[key] = dtype
+        return self._dtypes[key]
+
+    @abc.abstractmethod
+    def _estimate_nbytes(self, to_assemble: dict, subject_index: int) -> int:
+        pass
+
+
+def _get_nbytes(arr) -> int:
+    # out-of-core arrays (e.g., np.memmap, h5py.Dataset) do not occupy memory
+    if isinstance(arr, np.ndarray) and not isinstance(arr, np.memmap):
+        return arr.nbytes
+    return 0
+
+
+class SubjectAssembler(BoundedAssembler):
+
+    def __init__(self, datasource: extr.PymiaDatasource, zero_fn=None, assemble_interaction_fn=None,
+                 weight_fn=None, sample_indices: typing.Iterable[int] = None, dtype=None, max_subjects: int = None,
+                 max_bytes: int = None):
         """Assembles predictions of one or multiple subjects.
 
         Assumes that the network output, i.e. to_assemble, is of shape (B, ..., C)
         where B is the batch size and C is the numbers of channels (must be at least 1) and ... refers to an arbitrary image
         dimension.
 
+        A subject is ready as soon as all its samples have been added, independent of the order of the samples (e.g.,
+        shuffled or from multiple workers). The samples of a batch are added subject by subject, and samples indexed by
+        integers (e.g., slices or voxels) at once.
+
+        By default, a prediction overwrites the previous predictions at its location. For overlapping predictions (e.g.,
+        sliding-window inference with :class:`.PatchWiseIndexing` and a stride), a :obj:`weight_fn` accumulates the
+        weighted predictions and their weights, and normalizes the assembled subject by the summed weights.
+
         Args:
             datasource (.PymiaDatasource): The datasource.
             zero_fn: A function that initializes the numpy array to hold the predictions.
                 Args: shape: tuple with the shape of the subject's labels.
                 Returns: A np.ndarray
+                If :code:`None`, zero-initialized arrays of :obj:`dtype`.
             assemble_interaction_fn (callable, optional): A `callable` that may modify the sample and indexing before adding
                 the data to the assembled array. This enables handling special cases. Must follow the
                 :code:`.AssembleInteractionFn.__call__` interface. By default neither data nor indexing is modified.
+            weight_fn (callable, optional): A function returning the weights (importance map) of a prediction, e.g.,
+                :func:`uniform_weights` or :func:`gaussian_weights`.
+                Args: shape: tuple with the (spatial) shape of the prediction (without channel dimension).
+                Returns: A np.ndarray of shape :code:`shape`
+                If :code:`None`, predictions are not accumulated but overwritten.
+            sample_indices (iterable): The sample indices that will be assembled, if only a subset of the samples is
+                assembled (see :class:`SampleCounter`). Otherwise, subjects with missing samples are only ready after
+                the last batch.
+            dtype: The data type of the predictions (see :class:`BoundedAssembler`). Ignored by a :obj:`zero_fn`.
+            max_subjects (int): The maximum number of open subjects (see :class:`BoundedAssembler`).
+            max_bytes (int): The maximum memory of the open subjects (see :class:`BoundedAssembler`).
         """
-        self.datasource = datasource
+        super().__init__(datasource, dtype, max_subjects, max_bytes)
         self.zero_fn = zero_fn
         self.assemble_interaction_fn = assemble_interaction_fn
+        self.weight_fn = weight_fn
+        self.sample_counter = SampleCounter(datasource, sample_indices)
         self._subjects_ready = set()
         self.predictions = {}
+        self.weights = {}
+        """dict: The summed weights of the subjects (only if :code:`weight_fn`)."""
 
     @property
     def subjects_ready(self):
         """see :meth:`Assembler.subjects_ready`"""
         return self._subjects_ready.copy()
 
+    @property
+    def open_subjects(self) -> typing.Set[int]:
+        """see :attr:`BoundedAssembler.open_subjects`"""
+        return set(self.predictions.keys())
+
+    @property
+    def nbytes(self) -> int:
+        """see :attr:`BoundedAssembler.nbytes`"""
+        with self._capacity:
+            nbytes = sum(_get_nbytes(p) for prediction in self.predictions.values() for p in prediction.values())
+            return nbytes + sum(_get_nbytes(w) for weights in self.weights.values() for w in weights.values())
+
     def add_batch(self, to_assemble: typing.Union[np.ndarray, typing.Dict[str, np.ndarray]], sample_indices: np.ndarray,
                   last_batch=False, **kwargs):
-        """see :meth:`Assembler.add_batch`"""
+        """see :meth:`Assembler.add_batch`
+
+        Raises:
+            ValueError: If the batch exceeds the limit of open subjects (see :meth:`BoundedAssembler.can_add`).
+        """
         if not isinstance(to_assemble, dict):
             to_assemble = {'__prediction': to_assemble}
 
-        sample_indices = sample_indices.tolist()  # to ensure that not np.int64 entries, but int
+        sample_indices = np.asarray(sample_indices, dtype=np.intp).reshape(-1)
+        subject_indices = self.datasource.indices.subject_indices[sample_indices]
 
-        for batch_idx, sample_idx in enumerate(sample_indices):
-            self.add_sample(to_assemble, batch_idx, sample_idx)
+        with self._capacity:
+            self._check_capacity(to_assemble, sample_indices)
+            for subject_index in np.unique(subject_indices).tolist():
+                batch_indices = np.flatnonzero(subject_indices == subject_index)
+                self._add_subject_samples(to_assemble, subject_index, batch_indices, sample_indices[batch_indices])
+            self._subjects_ready.update(self.sample_counter.add(subject_indices))
 
-        if last_batch:
-            # to prevent from last batch to be ignored
-            self.end()
+            if last_batch:
+                # to prevent from last batch to be ignored
+                self.end()
 
     def end(self):
         self._subjects_ready = set(self.predictions.keys())
 
     def add_sample(self, to_assemble, batch_idx, sample_idx):
-        subject_index, index_expression = self.datasource.indices[sample_idx]
+        subject_index = int(self.datasource.indices.subject_indices[sample_idx])
+        self._add_subject_samples(to_assemble, subject_index, np.array([batch_idx]), np.array([sample_idx]))
+        self._subjects_ready.update(self.sample_counter.add([subject_index]))
 
-        # initialize subject
-        if subject_index not in self.predictions and not self.predictions:  # fist subject
-            self.predictions[subject_index] = self._init_new_subject(to_assemble, subject_index)
-        elif subject_index not in self.predictions:  # new subject
-            self._subjects_ready = set(self.predictions.keys())
+    def _add_subject_samples(self, to_assemble, subject_index: int, batch_indices: np.ndarray,
+                             sample_indices: np.ndarray):
+        if subject_index not in self.predictions:
             self.predictions[subject_index] = self._init_new_subject(to_assemble, subject_index)
 
+        integer_indexing = None
+        if self.assemble_interaction_fn is None and self.weight_fn is None and \
+                all(isinstance(p, np.ndarray) for p in self.predictions[subject_index].values()):
+            integer_indexing = self.datasource.indices.get_integer_indexing(sample_indices)
+
+        if integer_indexing is None:
+            for batch_idx, sample_idx in zip(batch_indices.tolist(), sample_indices.tolist()):
+                self._add(to_assemble, subject_index, batch_idx, sample_idx)
+            return
+
+        # scatter all samples at once, the sample dimension replaces the integer-indexed axes
+        first_axis, indices = integer_indexing
+        index = (slice(None), ) * first_axis + tuple(indices.T)
+        for key in to_assemble:
+            data = np.moveaxis(to_assemble[key][batch_indices], 0, first_axis)
+            self.predictions[subject_index][key][index] = data
+
+    def _add(self, to_assemble, subject_index: int, batch_idx: int, sample_idx: int):
+        index_expression = self.datasource.indices.get_index_expression(sample_idx)
         for key in to_assemble:
             data = to_assemble[key][batch_idx]
             if self.assemble_interaction_fn:
                 data, index_expression = self.assemble_interaction_fn(key, data, index_expression)
-            self.predictions[subject_index][key][index_expression.expression] = data
+            if self.weight_fn is None:
+                self.predictions[subject_index][key][index_expression.expression] = data
+            else:
+                weights = self.weight_fn(data.shape[:-1])
+                self.predictions[subject_index][key][index_expression.expression] += data * weights[..., np.newaxis]
+                self.weights[subject_index][key][index_expression.expression] += weights
 
-    def _init_new_subject(self, to_assemble, subject_index):
+    def _init_new_subject(self, to_assemble, subject_index, subject_shape: tuple = None):
         subject_prediction = {}
 
-        extractor = extr.ImagePropertyShapeExtractor(numpy_format=True)
-        subject_shape = self.datasource.direct_extract(extractor, subject_index)[defs.KEY_SHAPE]
+        if subject_shape is None:
+            subject_shape = self._get_shape(subject_index)
         for key in to_assemble:
             assemble_shape = subject_shape + (to_assemble[key].shape[-1],)
-            subject_prediction[key] = self.zero_fn(assemble_shape, key, subject_index)
+            if self.zero_fn is None:
+                dtype = self._get_dtype(key, to_assemble[key].dtype, self.weight_fn is not None)
+                subject_prediction[key] = np.zeros(assemble_shape, dtype=dtype)
+            else:
+                subject_prediction[key] = self.zero_fn(assemble_shape, key, subject_index)
+        if self.weight_fn is not None:
+            self.weights[subject_index] = {key: np.zeros(subject_shape, dtype=np.float32) for key in to_assemble}
         return subject_prediction
 
+    def _estimate_nbytes(self, to_assemble: dict, subject_index: int) -> int:
+        nb_voxels = int(np.prod(self._get_shape(subject_index)))
+        nbytes = 0
+        for key in to_assemble:
+            dtype = self._get_dtype(key, to_assemble[key].dtype, self.weight_fn is not None)
+            nbytes += nb_voxels * to_assemble[key].shape[-1] * dtype.itemsize
+            if self.weight_fn is not None:
+                nbytes += nb_voxels * np.dtype(np.float32).itemsize
+        return nbytes
+
     def get_assembled_subject(self, subject_index: int):
         """see :meth:`Assembler.get_assembled_subject`"""
-        try:
-            self._subjects_ready.remove(subject_index)
-        except KeyError:
-            # check if subject is assembled but not listed as ready
-            # this can happen if only one subject was assembled or last
-            if subject_index not in self.predictions:
-                raise ValueError('Subject with index {} not in assembler'.format(subject_index))
-        assembled = self.predictions.pop(subject_index)
+        with self._capacity:
+            try:
+                self._subjects_ready.remove(subject_index)
+            except KeyError:
+                # check if subject is assembled but not listed as ready
+                # this can happen if only one subject was assembled or last
+                if subject_index not in self.predictions:
+                    raise ValueError('Subject with index {} not in assembler'.format(subject_index))
+            assembled = self.predictions.pop(subject_index)
+            weights = self.weights.pop(subject_index, None)
+            self.sample_counter.reset(subject_index)
+            self._release(subject_index)
+
+        if weights is not None:
+            # normalize the accumulated predictions, locations without prediction remain zero
+            for key, key_weights in weights.items():
+                key_weights = key_weights[..., np.newaxis]
+                key_weights[key_weights == 0] = 1
+                assembled[key] = _divide(assembled[key], key_weights)
+        for value in assembled.values():
+            _flush(value)
         if '__prediction' in assembled:
             return assembled['__prediction']
         return assembled
@@ -160,6 +573,28 @@ class AssembleInteractionFn:
         raise NotImplementedError()
 
 
+class QuantizeInteractionFn(AssembleInteractionFn):
+
+    def __init__(self, dtype=np.uint8, max_value: float = 1.0) -> None:
+        """Quantizes the data (e.g., probabilities) to an integer type before adding it to the assembled prediction,
+        e.g., to store the predictions with :code:`np.uint8` instead of float (see :class:`MemmapZeros`).
+
+        The data in [0, :obj:`max_value`] is scaled to the range of :obj:`dtype`, i.e. divide the assembled prediction
+        by :code:`np.iinfo(dtype).max / max_value` to restore the values. Not suitable for accumulating predictions
+        (:code:`weight_fn` of :class:`.SubjectAssembler`).
+
+        Args:
+            dtype: The integer data type.
+            max_value (float): The maximum value of the data.
+        """
+        self.dtype = dtype
+        self.scale = np.iinfo(dtype).max / max_value
+
+    def __call__(self, key, data, index_expr, **kwargs):
+        quantized = np.rint(np.clip(data, 0, None) * self.scale)
+        return np.minimum(quantized, np.iinfo(self.dtype).max).astype(self.dtype), index_expr
+
+
 class ApplyTransformInteractionFn(AssembleInteractionFn):
 
     def __init__(self, transform: tfm.Transform) -> None:
@@ -167,16 +602,19 @@ class ApplyTransformInteractionFn(AssembleInteractionFn):
 
     def __call__(self, key, data, index_expr, **kwargs):
         temp = tfm.raise_error_if_entry_not_extracted
-        tfm.raise_error_entry_not_extracted = False
-        ret = self.transform({key: data, defs.KEY_INDEX_EXPR: index_expr})
-        tfm.raise_error_entry_not_extracted = temp
+        tfm.raise_error_if_entry_not_extracted = False
+        try:
+            ret = self.transform({key: data, defs.KEY_INDEX_EXPR: index_expr})
+        finally:
+            tfm.raise_error_if_entry_not_extracted = temp
 
         return ret[key], ret[defs.KEY_INDEX_EXPR]
 
 
-class PlaneSubjectAssembler(Assembler):
+class PlaneSubjectAssembler(BoundedAssembler):
 
-    def __init__(self, datasource: extr.PymiaDatasource, merge_fn=mean_merge_fn, zero_fn=numpy_zeros):
+    def __init__(self, datasource: extr.PymiaDatasource, merge_fn=mean_merge_fn, zero_fn=None,
+                 running_merge: bool = False, dtype=None, max_subjects: int = None, max_bytes: int = None):
         """Assembles predictions of one or multiple subjects where predictions are made in all three planes.
 
         This class assembles the prediction from all planes (axial, coronal, sagittal) and merges the prediction
@@ -194,86 +632,189 @@ class PlaneSubjectAssembler(Assembler):
             zero_fn: A function that initializes the numpy array to hold the predictions.
                 Args: shape: tuple with the shape of the subject's labels, id: str identifying the subject.
                 Returns: A np.ndarray
+                If :code:`None`, zero-initialized arrays of :obj:`dtype`.
+            running_merge (bool): Whether to accumulate the predictions of all planes in one array and average them
+                (instead of assembling each plane separately and merging them with :code:`merge_fn`). This requires
+                a third of the memory for three planes. :code:`merge_fn` is ignored.
+            dtype: The data type of the predictions (see :class:`BoundedAssembler`). Ignored by a :obj:`zero_fn`.
+            max_subjects (int): The maximum number of open subjects (see :class:`BoundedAssembler`).
+            max_bytes (int): The maximum memory of the open subjects of all planes (see :class:`BoundedAssembler`).
         """
-        self.datasource = datasource
+        super().__init__(datasource, dtype, max_subjects, max_bytes)
         self.planes = {}  # type: typing.Dict[int, SubjectAssembler]
+        self.sample_counter = SampleCounter(datasource)
         self._subjects_ready = set()
         self.zero_fn = zero_fn
         self.merge_fn = merge_fn
+        self.running_merge = running_merge
+        self.merged = {}
+        """dict: The summed predictions of all planes of the subjects (only if :code:`running_merge`)."""
+        self.merged_planes = {}
+        self._corrections = {}
 
     @property
     def subjects_ready(self):
         """see :meth:`Assembler.subjects_ready`"""
         return self._subjects_ready.copy()
 
+    @property
+    def open_subjects(self) -> typing.Set[int]:
+        """see :attr:`BoundedAssembler.open_subjects`"""
+        open_subjects = set(self.merged.keys())
+        for plane_assembler in self.planes.values():
+            open_subjects.update(plane_assembler.open_subjects)
+        return open_subjects
+
+    @property
+    def nbytes(self) -> int:
+        """see :attr:`BoundedAssembler.nbytes`"""
+        with self._capacity:
+            nbytes = sum(_get_nbytes(m) for merged in self.merged.values() for m in merged.values())
+            return nbytes + sum(plane_assembler.nbytes for plane_assembler in self.planes.values())
+
     def add_batch(self, to_assemble: typing.Union[np.ndarray, typing.Dict[str, np.ndarray]], sample_indices: np.ndarray,
                   last_batch=False, **kwargs):
-        """see :meth:`Assembler.add_batch`"""
+        """see :meth:`Assembler.add_batch`
+
+        Raises:
+            ValueError: If the batch exceeds the limit of open subjects (see :meth:`BoundedAssembler.can_add`).
+        """
 
         if not isinstance(to_assemble, dict):
             to_assemble = {'__prediction': to_assemble}
 
-        sample_indices = sample_indices.tolist()  # to ensure that not np.int64 entries, but int
+        sample_indices = np.asarray(sample_indices, dtype=np.intp).reshape(-1)
 
-        for batch_idx, sample_idx in enumerate(sample_indices):
-            subject_index, index_expression = self.datasource.indices[sample_idx]
+        with self._capacity:
+            self._check_capacity(to_assemble, sample_indices)
+            self._add_batch(to_assemble, sample_indices, last_batch)
 
+    def _add_batch(self, to_assemble: dict, sample_indices: np.ndarray, last_batch: bool):
+        for batch_idx, sample_idx in enumerate(sample_indices.tolist()):
+            subject_index, index_expression = self.datasource.indices[sample_idx]
             plane_dimension = self._get_plane_dimension(index_expression)
+            sample = self._correct_size(to_assemble, batch_idx, subject_index, index_expression, plane_dimension)
 
-            if plane_dimension not in self.planes:
-                self.planes[plane_dimension] = SubjectAssembler(self.datasource, self.zero_fn)
-
-            indexing = index_expression.get_indexing()
-            if not isinstance(indexing, list):
-                indexing = [indexing]
-
-            extractor = extr.ImagePropertyShapeExtractor(numpy_format=True)
-            required_plane_shape = self.datasource.direct_extract(extractor, subject_index)[defs.KEY_SHAPE]
-
-            index_at_plane = indexing[plane_dimension]
-            if isinstance(index_at_plane, tuple):
-                # is a range in the off plane direction (tuple)
-                required_off_plane_size = index_at_plane[1] - index_at_plane[0]
-                required_plane_shape[plane_dimension] = required_off_plane_size
-            else:  # isinstance of int
-                # is one slice in off plane direction (int)
-                required_plane_shape.pop(plane_dimension)
-            transform = tfm.SizeCorrection(tuple(required_plane_shape), entries=tuple(to_assemble.keys()))
-            self.planes[plane_dimension].assemble_interaction_fn = ApplyTransformInteractionFn(transform)
-
-            self.planes[plane_dimension].add_sample(to_assemble, batch_idx, sample_idx)
-
-        ready = None
-        for plane_assembler in self.planes.values():
-            if last_batch:
-                plane_assembler.end()
-
-            if ready is None:
-                ready = set(plane_assembler.subjects_ready)
+            if self.running_merge:
+                self._add_to_merged(sample, subject_index, index_expression, plane_dimension)
             else:
-                ready.intersection_update(plane_assembler.subjects_ready)
-        self._subjects_ready = ready
+                if plane_dimension not in self.planes:
+                    self.planes[plane_dimension] = SubjectAssembler(self.datasource, self.zero_fn, dtype=self.dtype)
+                plane_assembler = self.planes[plane_dimension]
+                if subject_index not in plane_assembler.predictions:
+                    plane_assembler.predictions[subject_index] = plane_assembler._init_new_subject(
+                        sample, subject_index, self._get_shape(subject_index))
+                plane_assembler.add_sample(sample, 0, sample_idx)
+
+        # the subjects are ready once the samples of all planes are added
+        self._subjects_ready.update(self.sample_counter.add(self.datasource.indices.subject_indices[sample_indices]))
+        if last_batch:
+            self._subjects_ready.update(self.merged.keys())
+            for plane_assembler in self.planes.values():
+                self._subjects_ready.update(plane_assembler.predictions.keys())
+
+    def _estimate_nbytes(self, to_assemble: dict, subject_index: int) -> int:
+        nb_voxels = int(np.prod(self._get_shape(subject_index)))
+        # the planes are assembled separately unless merged, the number of planes is known after the first batches
+        nb_arrays = 1 if self.running_merge else max(len(self.planes), 1)
+        return sum(nb_voxels * to_assemble[key].shape[-1] * nb_arrays *
+                   self._get_dtype(key, to_assemble[key].dtype, self.running_merge).itemsize for key in to_assemble)
+
+    def _correct_size(self, to_assemble: dict, batch_idx: int, subject_index: int, index_expression,
+                      plane_dimension: int) -> dict:
+        # corrects the size of the prediction to the plane of the subject (equivalent to tfm.SizeCorrection)
+        indexing = index_expression.get_indexing()
+        if not isinstance(indexing, list):
+            indexing = [indexing]
+        index_at_plane = indexing[plane_dimension]
+
+        required_plane_shape = list(self._get_shape(subject_index))
+        if isinstance(index_at_plane, tuple):
+            # is a range in the off plane direction (tuple)
+            required_plane_shape[plane_dimension] = index_at_plane[1] - index_at_plane[0]
+        else:  # isinstance of int
+            # is one slice in off plane direction (int)
+            required_plane_shape.pop(plane_dimension)
+
+        sample = {}
+        for key in to_assemble:
+            data = to_assemble[key][batch_idx]
+            correction_key = (data.shape, tuple(required_plane_shape))
+            if correction_key not in self._corrections:
+                self._corrections[correction_key] = self._get_size_correction(*correction_key)
+            crop, pad_width = self._corrections[correction_key]
+            if crop is not None:
+                data = data[crop]
+            if pad_width is not None:
+                data = np.pad(data, pad_width, mode='constant')
+            sample[key] = data[np.newaxis]
+        return sample
+
+    @staticmethod
+    def _get_size_correction(shape: tuple, required_shape: tuple):
+        crop = [slice(None)] * len(shape)
+        pad_width = [(0, 0)] * len(shape)
+        for idx, size in enumerate(required_shape):
+            if size < shape[idx]:
+                before = (shape[idx] - size) // 2
+                crop[idx] = slice(before, before + size)
+            elif size > shape[idx]:
+                before = (size - shape[idx]) // 2
+                pad_width[idx] = (before, size - shape[idx] - before)
+        crop = tuple(crop) if any(c != slice(None) for c in crop) else None
+        pad_width = pad_width if any(p != (0, 0) for p in pad_width) else None
+        return crop, pad_width
+
+    def _add_to_merged(self, sample: dict, subject_index: int, index_expression, plane_dimension: int):
+        if subject_index not in self.merged:
+            shape = self._get_shape(subject_index)
+            merged = {}
+            for key in sample:
+                if self.zero_fn is None:
+                    merged[key] = np.zeros(shape + (sample[key].shape[-1],),
+                                           dtype=self._get_dtype(key, sample[key].dtype, accumulate=True))
+                else:
+                    merged[key] = self.zero_fn(shape + (sample[key].shape[-1],), key, subject_index)
+            self.merged[subject_index] = merged
+            self.merged_planes[subject_index] = set()
+        self.merged_planes[subject_index].add(plane_dimension)
+        for key in sample:
+            self.merged[subject_index][key][index_expression.expression] += sample[key][0]
 
     def get_assembled_subject(self, subject_index: int):
         """see :meth:`Assembler.get_assembled_subject`"""
-        try:
-            self._subjects_ready.remove(subject_index)
-        except KeyError:
-            # check if subject is assembled but not listed as ready
-            # this can happen if only one subject was assembled or last
-            if subject_index not in self.planes[0].predictions:
-                raise ValueError('Subject with index {} not in assembler'.format(subject_index))
-
-        assembled = {}
-        for plane in self.planes.values():
-            ret_val = plane.get_assembled_subject(subject_index)
-            if not isinstance(ret_val, dict):
-                ret_val = {'__prediction': ret_val}
-            for key, value in ret_val.items():
-                assembled.setdefault(key, []).append(value)
-
-        for key in assembled:
-            assembled[key] = self.merge_fn(assembled[key])
+        with self._capacity:
+            try:
+                self._subjects_ready.remove(subject_index)
+            except KeyError:
+                # check if subject is assembled but not listed as ready
+                # this can happen if only one subject was assembled or last
+                if subject_index not in self.open_subjects:
+                    raise ValueError('Subject with index {} not in assembler'.format(subject_index))
+            self.sample_counter.reset(subject_index)
+
+            if self.running_merge:
+                assembled = self.merged.pop(subject_index)
+                nb_planes = len(self.merged_planes.pop(subject_index))
+            else:
+                assembled = {}
+                for plane in self.planes.values():
+                    if subject_index not in plane.predictions:
+                        continue  # no samples in this plane
+                    ret_val = plane.get_assembled_subject(subject_index)
+                    if not isinstance(ret_val, dict):
+                        ret_val = {'__prediction': ret_val}
+                    for key, value in ret_val.items():
+                        assembled.setdefault(key, []).append(value)
+            self._release(subject_index)
+
+        if self.running_merge:
+            for key, value in assembled.items():
+                assembled[key] = _divide(value, nb_planes)
+                _flush(assembled[key])
+        else:
+            for key in assembled:
+                assembled[key] = self.merge_fn(assembled[key])
 
         if '__prediction' in assembled:
             return assembled['__prediction']
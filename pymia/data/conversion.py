@@ -32,6 +32,33 @@ class ImageProperties:
         self.number_of_components_per_pixel = image.GetNumberOfComponentsPerPixel()
         self.pixel_id = image.GetPixelID()
 
+    @classmethod
+    def from_values(cls, size: typing.Sequence[int], origin: typing.Sequence[float], spacing: typing.Sequence[float],
+                    direction: typing.Sequence[float], number_of_components_per_pixel: int = 1,
+                    pixel_id: int = sitk.sitkUInt8) -> 'ImageProperties':
+        """Creates image properties from values, i.e. without allocating an image.
+
+        Args:
+            size (Sequence[int]): The size of the image (ITK format).
+            origin (Sequence[float]): The origin of the image.
+            spacing (Sequence[float]): The spacing of the image.
+            direction (Sequence[float]): The (flattened) direction of the image.
+            number_of_components_per_pixel (int): The number of components per pixel.
+            pixel_id (int): The SimpleITK pixel type identifier.
+
+        Returns:
+            ImageProperties: The image properties.
+        """
+        properties = cls.__new__(cls)
+        properties.size = tuple(int(s) for s in size)
+        properties.origin = tuple(float(o) for o in origin)
+        properties.spacing = tuple(float(s) for s in spacing)
+        properties.direction = tuple(float(d) for d in direction)
+        properties.dimensions = len(properties.size)
+        properties.number_of_components_per_pixel = int(number_of_components_per_pixel)
+        properties.pixel_id = int(pixel_id)
+        return properties
+
     def is_two_dimensional(self) -> bool:
         """Determines whether the image is two-dimensional.
 
@@ -7,6 +7,7 @@ import pymia.data.conversion as conv
 import pymia.data.definition as defs
 import pymia.data.indexexpression as expr
 import pymia.data.subjectfile as subj
+import pymia.data.extraction.indexing as idx
 from . import writer as wr
 
 
@@ -93,13 +94,29 @@ class MonitoringCallback(Callback):
 
 class WriteDataCallback(Callback):
 
-    def __init__(self, writer: wr.Writer) -> None:
+    def __init__(self, writer: wr.Writer, chunking: typing.Union[idx.IndexingStrategy, tuple, bool] = None,
+                 compression=None, compression_opts=None, shuffle: bool = False) -> None:
         """Callback that writes the raw data to the dataset.
 
+        The storage options allow to optimize the data layout for the later extraction. For instance, chunks aligned with
+        the patches of a :class:`.PatchWiseIndexing` together with compression result in reads that only access and
+        decompress the chunks overlapping a patch.
+
         Args:
             writer (.creation.writer.Writer): The writer used to write the data.
+            chunking (.IndexingStrategy, tuple, bool): The chunking of the data. If :class:`.IndexingStrategy`, the chunk
+                shape is derived from the strategy (see :meth:`.IndexingStrategy.get_chunk_shape`). If tuple, the chunk
+                shape (dimensions not covered, e.g., the channels, are not chunked). If :code:`True`, the chunk shape is
+                determined by the writer. If :code:`None`, the data is stored contiguously if no compression is used.
+            compression (str, int): The compression filter (e.g., 'gzip', 'lzf') or :code:`None` for no compression.
+            compression_opts: The compression filter options (e.g., the gzip level from 0 to 9).
+            shuffle (bool): Whether to apply the shuffle filter before the compression.
         """
         self.writer = writer
+        self.chunking = chunking
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
 
     def on_subject(self, params: dict):
         """see :meth:`.Callback.on_subject`."""
@@ -110,7 +127,18 @@ class WriteDataCallback(Callback):
 
         for category in params[defs.KEY_CATEGORIES]:
             data = params[category]
-            self.writer.write('{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str), data, dtype=data.dtype)
+            self.writer.write('{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str), data, dtype=data.dtype,
+                              **self._get_storage_options(data.shape))
+
+    def _get_storage_options(self, shape: tuple) -> dict:
+        if self.chunking is None and self.compression is None and not self.shuffle:
+            return {}  # keep the writer's default storage
+
+        chunks = self.chunking
+        if isinstance(chunks, idx.IndexingStrategy):
+            chunks = chunks.get_chunk_shape(shape)
+        return {'chunks': chunks, 'compression': self.compression, 'compression_opts': self.compression_opts,
+                'shuffle': self.shuffle}
 
 
 class WriteEssentialCallback(Callback):
@@ -243,19 +271,25 @@ class WriteFilesCallback(Callback):
                 self.writer.fill(defs.LOC_FILES_PLACEHOLDER.format(category), relative_path, index_expr)
 
 
-def get_default_callbacks(writer: wr.Writer, meta_only=False) -> ComposeCallback:
+def get_default_callbacks(writer: wr.Writer, meta_only=False,
+                          chunking: typing.Union[idx.IndexingStrategy, tuple, bool] = None,
+                          compression=None, compression_opts=None, shuffle: bool = False) -> ComposeCallback:
     """Provides a selection of commonly used callbacks to write the most important information to the dataset.
 
     Args:
         writer (.creation.writer.Writer): The writer used to write the data.
         meta_only (bool): Whether only callbacks for a metadata dataset creation should be returned.
+        chunking (.IndexingStrategy, tuple, bool): The chunking of the data (see :class:`.WriteDataCallback`).
+        compression (str, int): The compression filter of the data (see :class:`.WriteDataCallback`).
+        compression_opts: The compression filter options (see :class:`.WriteDataCallback`).
+        shuffle (bool): Whether to apply the shuffle filter (see :class:`.WriteDataCallback`).
 
     Returns:
         Callback: The composed selection of common callbacks.
 
     """
     callbacks = [MonitoringCallback(),
-                 WriteDataCallback(writer),
+                 WriteDataCallback(writer, chunking, compression, compression_opts, shuffle),
                  WriteFilesCallback(writer),
                  WriteImageInformationCallback(writer),
                  WriteEssentialCallback(writer)]
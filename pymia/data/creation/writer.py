@@ -31,13 +31,14 @@ class Writer(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def reserve(self, entry: str, shape: tuple, dtype=None):
+    def reserve(self, entry: str, shape: tuple, dtype=None, **kwargs):
         """Reserve space in the dataset for later writing.
 
         Args:
             entry(str): The dataset entry to be created.
             shape(tuple): The shape to be reserved.
             dtype: The dtype.
+            **kwargs: Writer-specific storage options (e.g., chunking and compression for :class:`.Hdf5Writer`).
         """
         pass
 
@@ -53,13 +54,14 @@ class Writer(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def write(self, entry: str, data, dtype=None):
+    def write(self, entry: str, data, dtype=None, **kwargs):
         """Create and write entry.
 
         Args:
             entry(str): The dataset entry to be written.
             data(object): The data to write.
             dtype: The dtype.
+            **kwargs: Writer-specific storage options (e.g., chunking and compression for :class:`.Hdf5Writer`).
         """
         pass
 
@@ -86,12 +88,22 @@ class Hdf5Writer(Writer):
         """see :meth:`.Writer.open`"""
         self.h5 = h5py.File(self.file_path, mode='a', libver='latest')
 
-    def reserve(self, entry: str, shape: tuple, dtype=None):
-        """see :meth:`.Writer.reserve`"""
+    def reserve(self, entry: str, shape: tuple, dtype=None, chunks=None, compression=None, compression_opts=None,
+                shuffle: bool = False):
+        """see :meth:`.Writer.reserve`
+
+        Args:
+            chunks (tuple, bool): The chunk shape. If :code:`None`, the data is stored contiguously (unless compression
+                or shuffle is used, which require chunking). If :code:`True`, h5py guesses a chunk shape.
+            compression (str, int): The compression filter (e.g., 'gzip', 'lzf'). An integer is interpreted as gzip level.
+            compression_opts: The compression filter options (e.g., the gzip level).
+            shuffle (bool): Whether to apply the shuffle filter, which typically improves the compression ratio.
+        """
         # special string handling (in order not to use length limited strings)
         if dtype is str or dtype == 'str' or (isinstance(dtype, np.dtype) and dtype.type == np.str_):
             dtype = self.str_type
-        self.h5.create_dataset(entry, shape, dtype=dtype)
+        self.h5.create_dataset(entry, shape, dtype=dtype,
+                               **self._get_storage_kwargs(shape, chunks, compression, compression_opts, shuffle))
 
     def fill(self, entry: str, data, index: expr.IndexExpression = None):
         """see :meth:`.Writer.fill`"""
@@ -104,15 +116,46 @@ class Hdf5Writer(Writer):
 
         self.h5[entry][index.expression] = data
 
-    def write(self, entry: str, data, dtype=None):
-        """see :meth:`.Writer.write`"""
+    def write(self, entry: str, data, dtype=None, chunks=None, compression=None, compression_opts=None,
+              shuffle: bool = False):
+        """see :meth:`.Writer.write`
+
+        Args:
+            chunks (tuple, bool): See :meth:`.Hdf5Writer.reserve`.
+            compression (str, int): See :meth:`.Hdf5Writer.reserve`.
+            compression_opts: See :meth:`.Hdf5Writer.reserve`.
+            shuffle (bool): See :meth:`.Hdf5Writer.reserve`.
+        """
         # special string handling (in order not to use length limited strings)
         if dtype is str or dtype == 'str' or (isinstance(dtype, np.dtype) and dtype.type == np.str_):
             dtype = self.str_type
             data = np.asarray(data, dtype=object)
         if entry in self.h5:
             del self.h5[entry]
-        self.h5.create_dataset(entry, dtype=dtype, data=data)
+        self.h5.create_dataset(entry, dtype=dtype, data=data,
+                               **self._get_storage_kwargs(np.shape(data), chunks, compression, compression_opts, shuffle))
+
+    @staticmethod
+    def _get_storage_kwargs(shape: tuple, chunks, compression, compression_opts, shuffle: bool) -> dict:
+        if len(shape) == 0:
+            # scalar datasets do not support chunking nor filters
+            return {}
+
+        kwargs = {}
+        if isinstance(chunks, (tuple, list)):
+            # clip to the data shape, dimensions not covered by chunks (e.g., channels) are not chunked
+            chunks = tuple(min(max(int(c), 1), s) for c, s in zip(chunks, shape)) + tuple(shape[len(chunks):])
+            if 0 in chunks:
+                chunks = None  # empty dimension, chunking not possible
+        if chunks is not None:
+            kwargs['chunks'] = chunks
+        if compression is not None:
+            kwargs['compression'] = compression
+            if compression_opts is not None:
+                kwargs['compression_opts'] = compression_opts
+        if shuffle:
+            kwargs['shuffle'] = True
+        return kwargs
 
 
 def get_writer(file_path: str) -> Writer:
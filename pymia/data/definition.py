@@ -8,6 +8,7 @@ def subject_index_to_str(subject_index, nb_subjects):
 
 
 # location strings for the database
+LOC_META = 'meta'
 LOC_NAMES_PLACEHOLDER = 'meta/names/{}_names'
 LOC_IMGPROP_SHAPE = 'meta/image_props/shapes'
 LOC_IMGPROP_ORIGIN = 'meta/image_props/origins'
@@ -17,6 +18,7 @@ LOC_FILES_PLACEHOLDER = 'meta/files/{}_files'
 LOC_FILES_ROOT = 'meta/files/file_root'
 LOC_SUBJECT = 'meta/subjects'
 LOC_SHAPE_PLACEHOLDER = 'meta/shapes/{}_shapes'
+LOC_DATA = 'data'
 LOC_DATA_PLACEHOLDER = 'data/{}'
 
 # keys for a (batch) dictionary
@@ -35,3 +37,5 @@ KEY_SUBJECT = 'subject'  #:
 KEY_SUBJECT_INDEX = 'subject_index'  #:
 KEY_INDEX_EXPR = 'index_expr'  #:
 KEY_SAMPLE_INDEX = 'sample_index'  #:
+KEY_OUT = 'out'  #:
+KEY_OUT_INDEX_EXPR = 'out_index_expr'  #:
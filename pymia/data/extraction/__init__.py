@@ -1,6 +1,8 @@
-from .reader import (Reader, Hdf5Reader, get_reader)
-from .indexing import (IndexingStrategy, SliceIndexing, VoxelWiseIndexing, EmptyIndexing, PatchWiseIndexing)
-from .datasource import PymiaDatasource
+from .reader import (Reader, Hdf5Reader, VolumeCache, get_reader)
+from .indexing import (IndexingStrategy, SliceIndexing, VoxelWiseIndexing, EmptyIndexing, PatchWiseIndexing, IndexTable,
+                       IndexCache)
+from .datasource import PymiaDatasource, stack_samples
+from .sampler import PatchQueue
 from .extractor import (Extractor, DataExtractor, FilesExtractor, NamesExtractor, SubjectExtractor, IndexingExtractor,
                         SelectiveDataExtractor, RandomDataExtractor, ComposeExtractor,
                         ImagePropertiesExtractor, PadDataExtractor, ImagePropertyShapeExtractor, FilesystemDataExtractor)
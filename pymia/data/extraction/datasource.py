@@ -1,3 +1,8 @@
+import contextlib
+import typing
+
+import numpy as np
+
 import pymia.data.definition as defs
 import pymia.data.indexexpression as expr
 import pymia.data.transformation as tfm
@@ -13,7 +18,10 @@ class PymiaDatasource:
                  extractor: extr.Extractor = None,
                  transform: tfm.Transform = None,
                  subject_subset: list = None,
-                 init_reader_once: bool = True) -> None:
+                 init_reader_once: bool = True,
+                 index_cache_path: str = None,
+                 preload_meta: bool = True,
+                 volume_cache_size: int = None) -> None:
         """Provides convenient and adaptable reading of the data from a created dataset.
 
         Args:
@@ -24,6 +32,13 @@ class PymiaDatasource:
             transform (.Transform): Transformation(s) to be applied to the extracted data.
             subject_subset (list): A list of subject identifiers defining a subset of subject to be processed.
             init_reader_once (bool): Whether the reader is initialized once or for every retrieval (default: :code:`True`)
+            index_cache_path (str): Path to a file caching the computed sample indices (see :class:`.IndexCache`), which
+                avoids recomputing the indices of large datasets. If :code:`None`, the indices are not cached.
+            preload_meta (bool): Whether the reader kept open (see :code:`init_reader_once`) and the reader used to
+                compute the indices read all meta-data at once (see :class:`.Hdf5Reader`).
+            volume_cache_size (int): Memory budget in bytes to cache entire data volumes (see :class:`.VolumeCache`),
+                such that repeated extractions of a subject (e.g., slices, patches, or epochs) are served from memory.
+                If :code:`None`, the data is always read from the dataset.
 
         Examples:
             The class mainly allows to modes of operation. The first mode is by extracting the data by index.
@@ -50,8 +65,12 @@ class PymiaDatasource:
         self.transform = transform
         self.subject_subset = subject_subset
         self.init_reader_once = init_reader_once
-        self.indices = []
-        """list: A list containing all sample indices. This is a mapping from item `i` to tuple 
+        self.index_cache = idx.IndexCache(index_cache_path) if index_cache_path is not None else None
+        self.preload_meta = preload_meta
+        self.volume_cache = rd.VolumeCache(volume_cache_size) if volume_cache_size is not None else None
+        """VolumeCache: The cache of the data volumes (:code:`None` if not :code:`volume_cache_size`)."""
+        self.indices = idx.IndexTable.empty()
+        """IndexTable: A table containing all sample indices. This is a mapping from item `i` to tuple 
         `(subject_index, index_expression)`."""
         self.reader = None
 
@@ -82,20 +101,34 @@ class PymiaDatasource:
             indexing_strategy (.IndexingStrategy): Strategy defining how the data is indexed for reading.
             subject_subset (list): A list of subject identifiers defining a subset of subject to be processed.
         """
-        self.indices.clear()
         self.indexing_strategy = indexing_strategy
-        with rd.get_reader(self.dataset_path) as reader:
+
+        cache_key = None
+        if self.index_cache is not None:
+            cache_key = self.index_cache.get_key(indexing_strategy, subject_subset, self.dataset_path)
+            cached_indices = self.index_cache.load(cache_key)
+            if cached_indices is not None:
+                self.indices = cached_indices
+                return
+
+        subject_tables = []
+        subject_indices = []
+        with self._open_reader() as reader:
             all_subjects = reader.get_subjects()
             last_shape = None  # remember shape to optimize initialization
             for subject_idx in range(len(all_subjects)):
                 if subject_subset is None or all_subjects[subject_idx] in subject_subset:
                     current_shape = reader.get_shape(subject_idx)
                     if not last_shape == current_shape:
-                        subject_indices = self.indexing_strategy(current_shape)
+                        subject_table = self.indexing_strategy.get_index_table(current_shape)
                         last_shape = current_shape
 
-                    subject_and_indices = zip(len(subject_indices) * [subject_idx], subject_indices)
-                    self.indices.extend(subject_and_indices)
+                    subject_tables.append(subject_table)
+                    subject_indices.append(subject_idx)
+        self.indices = idx.IndexTable.concatenate(subject_tables, subject_indices)
+
+        if cache_key is not None:
+            self.index_cache.save(cache_key, self.indices)
 
     def set_transform(self, transform: tfm.Transform):
         """Set the transform.
@@ -111,11 +144,20 @@ class PymiaDatasource:
         Returns:
             list: All subject identifiers in the dataset.
         """
-        with rd.get_reader(self.dataset_path) as reader:
+        with self._open_reader() as reader:
             return reader.get_subjects()
 
+    @contextlib.contextmanager
+    def _open_reader(self):
+        # reuse the reader kept open, otherwise use a temporary one
+        if self.reader is not None:
+            yield self.reader
+        else:
+            with rd.get_reader(self.dataset_path, preload_meta=self.preload_meta) as reader:
+                yield reader
+
     def direct_extract(self, extractor: extr.Extractor, subject_index: int, index_expr: expr.IndexExpression = None,
-                       transform: tfm.Transform = None):
+                       transform: tfm.Transform = None, reader: rd.Reader = None):
         """Extract data directly, bypassing the extractors and transforms of the instance.
 
         The purpose of this method is to enable extraction of data that is not required for every data chunk
@@ -129,6 +171,8 @@ class PymiaDatasource:
                 Not required if only image related information (e.g., image shape, origin) should be extracted.
                 Needed when desiring a chunk of data (e.g., slice, patch, sub-volume).
             transform (.Transform): Transformation(s) to be applied to the extracted data.
+            reader (.Reader): An open reader to extract the data with (e.g., one reader per thread). If :code:`None`,
+                the reader of the instance is used.
 
         Returns:
             dict: Extracted data in a dictionary. Keys are defined by the used :class:`.Extractor`.
@@ -139,19 +183,109 @@ class PymiaDatasource:
         params = {defs.KEY_SUBJECT_INDEX: subject_index, defs.KEY_INDEX_EXPR: index_expr}
         extracted = {}
 
-        if not self.init_reader_once:
-            with rd.get_reader(self.dataset_path) as reader:
-                extractor.extract(reader, params, extracted)
+        if reader is not None:
+            extractor.extract(reader, params, extracted)
         else:
-            if self.reader is None:
-                self.reader = rd.get_reader(self.dataset_path, direct_open=True)
-            extractor.extract(self.reader, params, extracted)
+            with self._extraction_reader() as reader:
+                extractor.extract(reader, params, extracted)
 
         if transform:
             extracted = transform(extracted)
 
         return extracted
 
+    def get_batch(self, items: typing.Iterable[int], stack: bool = False, out: typing.Dict[str, np.ndarray] = None,
+                  reader: rd.Reader = None) -> typing.Union[typing.List[dict], dict]:
+        """Extract multiple samples at once.
+
+        Different from extracting the samples one by one (i.e., :code:`ds[i]`), the samples are passed to
+        :meth:`.Extractor.extract_batch`, which allows combining the reads of samples of the same subject
+        (e.g., neighbouring slices or patches) into one read.
+
+        Args:
+            items (iterable): The sample indices to extract.
+            stack (bool): Whether to return one dictionary with the samples stacked (see :func:`stack_samples`) instead
+                of a list of dictionaries.
+            out (dict): Preallocated (and reusable) batch arrays for the entries to stack (e.g.,
+                :code:`{defs.KEY_IMAGES: arr}`), whose first dimension is at least the number of items (see
+                :meth:`create_batch_buffer`). Without transform, :class:`.DataExtractor` and
+                :class:`.PadDataExtractor` read the data directly into these arrays. Otherwise, the extracted
+                (and transformed) data is copied into these arrays. Implies :code:`stack=True`.
+            reader (.Reader): An open reader to extract the data with (e.g., one reader per thread, see
+                :class:`.PatchQueue`). If :code:`None`, the reader of the instance is used.
+
+        Returns:
+            Union[list, dict]: The extracted samples as list or, if :code:`stack=True`, stacked in one dictionary. The
+            stacked entries of :obj:`out` are views of the arrays in :obj:`out`.
+        """
+        items = [int(item) for item in items]
+        out_views = [{key: arr[i] for key, arr in out.items()} for i in range(len(items))] if out is not None else None
+
+        params = []
+        for i, item in enumerate(items):
+            subject_index, index_expr = self.indices[item]
+            params.append({defs.KEY_SUBJECT_INDEX: subject_index, defs.KEY_INDEX_EXPR: index_expr})
+            if out is not None and not self.transform:
+                # reading directly into the arrays is only possible if no transform alters the extracted data
+                params[i][defs.KEY_OUT] = out_views[i]
+        batch = [{} for _ in items]
+
+        if reader is not None:
+            self.extractor.extract_batch(reader, params, batch)
+        else:
+            with self._extraction_reader() as reader:
+                self.extractor.extract_batch(reader, params, batch)
+
+        if self.transform:
+            batch = [self.transform(extracted) for extracted in batch]
+        for item, extracted in zip(items, batch):
+            extracted[defs.KEY_SAMPLE_INDEX] = item
+
+        if out is not None:
+            for extracted, views in zip(batch, out_views):
+                for key, view in views.items():
+                    if extracted[key] is not view:
+                        view[...] = extracted[key]
+                    del extracted[key]
+            stacked = stack_samples(batch)
+            stacked.update({key: arr[:len(items)] for key, arr in out.items()})
+            return stacked
+
+        if stack:
+            return stack_samples(batch)
+        return batch
+
+    def create_batch_buffer(self, batch_size: int, keys: tuple = (defs.KEY_IMAGES, )) -> typing.Dict[str, np.ndarray]:
+        """Allocates batch arrays to be reused by :meth:`get_batch`.
+
+        The shapes and types of the arrays correspond to the first sample, i.e., all samples need to be of equal shape.
+
+        Args:
+            batch_size (int): The (maximal) number of samples per batch.
+            keys (tuple): The keys of the extracted entries to allocate the arrays for (e.g., the categories).
+
+        Returns:
+            dict: The allocated batch arrays, to be passed as :code:`out` to :meth:`get_batch`.
+        """
+        sample = self[0]
+        return {key: np.empty((batch_size, ) + sample[key].shape, sample[key].dtype) for key in keys}
+
+    @contextlib.contextmanager
+    def _extraction_reader(self):
+        if not self.init_reader_once:
+            with rd.get_reader(self.dataset_path, **self._get_reader_kwargs(preload_meta=False)) as reader:
+                yield reader
+        else:
+            if self.reader is None:
+                self.reader = rd.get_reader(self.dataset_path, direct_open=True, **self._get_reader_kwargs())
+            yield self.reader
+
+    def _get_reader_kwargs(self, preload_meta: bool = None):
+        kwargs = {'preload_meta': self.preload_meta if preload_meta is None else preload_meta}
+        if self.volume_cache is not None:
+            kwargs['volume_cache'] = self.volume_cache
+        return kwargs
+
     def __len__(self):
         return len(self.indices)
 
@@ -161,5 +295,38 @@ class PymiaDatasource:
         extracted[defs.KEY_SAMPLE_INDEX] = item
         return extracted
 
+    def __getstate__(self):
+        # the open reader cannot be pickled (e.g., for multiprocessing), it is re-opened on the next extraction
+        state = self.__dict__.copy()
+        state['reader'] = None
+        return state
+
     def __del__(self):
         self.close_reader()
+
+
+def stack_samples(samples: typing.List[dict]) -> dict:
+    """Stacks the entries of extracted samples.
+
+    Arrays of equal shape and numbers are stacked to a :class:`numpy.ndarray` with the samples along the first axis.
+    All other entries (e.g., index expressions, strings, or arrays of different shapes) are kept as list.
+
+    Args:
+        samples (list): The extracted samples (see :meth:`PymiaDatasource.get_batch`).
+
+    Returns:
+        dict: The stacked entries.
+    """
+    stacked = {}
+    if len(samples) == 0:
+        return stacked
+
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        if all(isinstance(v, np.ndarray) for v in values) and len({v.shape for v in values}) == 1:
+            stacked[key] = np.stack(values)
+        elif all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values):
+            stacked[key] = np.asarray(values)
+        else:
+            stacked[key] = values
+    return stacked
@@ -1,4 +1,5 @@
 import abc
+import copy
 import pickle
 import typing
 import os
@@ -26,6 +27,20 @@ class Extractor(abc.ABC):
         """
         pass
 
+    def extract_batch(self, reader: rd.Reader, params: typing.List[dict], extracted: typing.List[dict]) -> None:
+        """Extract the data of multiple samples from the dataset.
+
+        The default implementation calls :meth:`extract` for every sample. Extractors reading data chunks can override
+        this method in order to combine the reads of the samples (e.g., see :class:`.DataExtractor`).
+
+        Args:
+            reader (.Reader): Reader instance that can read from dataset.
+            params (list): The extraction parameters of each sample (see :meth:`extract`).
+            extracted (list): The dictionaries to put the extracted data of each sample in.
+        """
+        for sample_params, sample_extracted in zip(params, extracted):
+            self.extract(reader, sample_params, sample_extracted)
+
 
 class ComposeExtractor(Extractor):
 
@@ -43,6 +58,11 @@ class ComposeExtractor(Extractor):
         for e in self.extractors:
             e.extract(reader, params, extracted)
 
+    def extract_batch(self, reader: rd.Reader, params: typing.List[dict], extracted: typing.List[dict]) -> None:
+        """see :meth:`.Extractor.extract_batch`"""
+        for e in self.extractors:
+            e.extract_batch(reader, params, extracted)
+
 
 class NamesExtractor(Extractor):
     def __init__(self, cache: bool = True, categories=(defs.KEY_IMAGES, defs.KEY_LABELS)) -> None:
@@ -134,33 +154,38 @@ class ImagePropertiesExtractor(Extractor):
 
         - :const:`pymia.data.definition.KEY_PROPERTIES` with :class:`.ImageProperties` content (or byte if :code:`do_pickle`)
 
+        The image properties are cached per subject, i.e. they are read only once from the dataset.
+
         Args:
             do_pickle (bool): whether to pickle the extracted :class:`.ImageProperties` instance.
                 This allows usage in multiprocessing environment.
         """
         super().__init__()
         self.do_pickle = do_pickle
+        self.cache = {}
 
     def extract(self, reader: rd.Reader, params: dict, extracted: dict) -> None:
         """see :meth:`.Extractor.extract`"""
-        subject_index_expr = expr.IndexExpression(params[defs.KEY_SUBJECT_INDEX])
-
-        shape = reader.read(defs.LOC_IMGPROP_SHAPE, subject_index_expr).tolist()
-        direction = reader.read(defs.LOC_IMGPROP_DIRECTION, subject_index_expr).tolist()
-        spacing = reader.read(defs.LOC_IMGPROP_SPACING, subject_index_expr).tolist()
-        origin = reader.read(defs.LOC_IMGPROP_ORIGIN, subject_index_expr).tolist()
-
-        # todo: everything in memory?
-        image = sitk.Image(shape, sitk.sitkUInt8)
-        image.SetDirection(direction)
-        image.SetSpacing(spacing)
-        image.SetOrigin(origin)
-        # todo number_of_components_per_pixel and pixel_id
-
-        img_properties = conv.ImageProperties(image)
-        if self.do_pickle:
-            # pickle to prevent from problems since own class
-            img_properties = pickle.dumps(img_properties)
+        subject_index = params[defs.KEY_SUBJECT_INDEX]
+        key = (reader.file_path, subject_index)
+        if key not in self.cache:
+            subject_index_expr = expr.IndexExpression(subject_index)
+
+            shape = reader.read(defs.LOC_IMGPROP_SHAPE, subject_index_expr).tolist()
+            direction = reader.read(defs.LOC_IMGPROP_DIRECTION, subject_index_expr).tolist()
+            spacing = reader.read(defs.LOC_IMGPROP_SPACING, subject_index_expr).tolist()
+            origin = reader.read(defs.LOC_IMGPROP_ORIGIN, subject_index_expr).tolist()
+            # todo number_of_components_per_pixel and pixel_id
+
+            img_properties = conv.ImageProperties.from_values(shape, origin, spacing, direction)
+            if self.do_pickle:
+                # pickle to prevent from problems since own class
+                img_properties = pickle.dumps(img_properties)
+            self.cache[key] = img_properties
+
+        img_properties = self.cache[key]
+        if not self.do_pickle:
+            img_properties = copy.copy(img_properties)  # prevent modifications of the cached properties
         extracted[defs.KEY_PROPERTIES] = img_properties
 
 
@@ -335,6 +360,9 @@ class DataExtractor(Extractor):
 
         Adds :obj:`category` as key to :obj:`extracted`.
 
+        If the :obj:`params` contain preallocated arrays (:code:`params[defs.KEY_OUT][category]`), the data is directly
+        read into these arrays (see :meth:`.Reader.read_into`) instead of newly allocated ones.
+
         Args:
             categories (tuple): Categories for which to extract the names.
             ignore_indexing (bool): Whether to ignore the indexing in :obj:`params`. This is useful when extracting
@@ -355,11 +383,58 @@ class DataExtractor(Extractor):
 
         index_str = self.subject_entries[subject_index]
         for category in self.categories:
-            if self.ignore_indexing:
-                data = reader.read('{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str))
+            entry = '{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str)
+            if category in params.get(defs.KEY_OUT, {}):
+                self._read_into(reader, entry, params, category, extracted)
+            elif self.ignore_indexing:
+                extracted[category] = reader.read(entry)
             else:
-                data = reader.read('{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str), index_expr)
-            extracted[category] = data
+                extracted[category] = reader.read(entry, index_expr)
+
+    def _read_into(self, reader: rd.Reader, entry: str, params: dict, category: str, extracted: dict):
+        out = params[defs.KEY_OUT][category]
+        index_expr = None if self.ignore_indexing else params[defs.KEY_INDEX_EXPR]
+        reader.read_into(entry, out, index_expr, params.get(defs.KEY_OUT_INDEX_EXPR))
+        extracted[category] = out
+
+    def extract_batch(self, reader: rd.Reader, params: typing.List[dict], extracted: typing.List[dict]) -> None:
+        """see :meth:`.Extractor.extract_batch`
+
+        The samples are grouped by subject and contiguous or overlapping index expressions are combined into one read.
+        Samples with preallocated arrays are directly read into these arrays (see :class:`.DataExtractor`).
+        """
+        if self.subject_entries is None:
+            self.subject_entries = reader.get_subject_entries()
+
+        subject_positions = {}
+        for position, sample_params in enumerate(params):
+            subject_positions.setdefault(sample_params[defs.KEY_SUBJECT_INDEX], []).append(position)
+
+        for subject_index, all_positions in subject_positions.items():
+            index_str = self.subject_entries[subject_index]
+            for category in self.categories:
+                entry = '{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), index_str)
+
+                positions = []
+                for position in all_positions:
+                    if category in params[position].get(defs.KEY_OUT, {}):
+                        self._read_into(reader, entry, params[position], category, extracted[position])
+                    else:
+                        positions.append(position)
+
+                if self.ignore_indexing:
+                    index_exprs = [expr.IndexExpression() for _ in positions]
+                else:
+                    index_exprs = [params[position][defs.KEY_INDEX_EXPR] for position in positions]
+
+                for read_index_expr, samples in coalesce_index_expressions(index_exprs):
+                    data = reader.read(entry, None if self.ignore_indexing else read_index_expr)
+                    for sample_idx, local_expression in samples:
+                        if local_expression is None:
+                            extracted[positions[sample_idx]][category] = data
+                        else:
+                            # copy such that the samples do not share memory (e.g., for in-place transforms)
+                            extracted[positions[sample_idx]][category] = data[local_expression].copy()
 
 
 class PadDataExtractor(Extractor):
@@ -392,6 +467,21 @@ class PadDataExtractor(Extractor):
 
     def extract(self, reader: rd.Reader, params: dict, extracted: dict) -> None:
         """see :meth:`.Extractor.extract`"""
+        padded_params, padded_shape, sub_indexing = self._get_padded_params(reader, params)
+        self.extractor.extract(reader, padded_params, extracted)
+        self._pad(extracted, padded_shape, sub_indexing)
+
+    def extract_batch(self, reader: rd.Reader, params: typing.List[dict], extracted: typing.List[dict]) -> None:
+        """see :meth:`.Extractor.extract_batch`"""
+        padded = [self._get_padded_params(reader, sample_params) for sample_params in params]
+        self.extractor.extract_batch(reader, [padded_params for padded_params, _, _ in padded], extracted)
+        for sample_extracted, (_, padded_shape, sub_indexing) in zip(extracted, padded):
+            self._pad(sample_extracted, padded_shape, sub_indexing)
+
+    def _get_categories(self):
+        return self.extractor.categories if hasattr(self.extractor, 'categories') else [self.extractor.category]
+
+    def _get_padded_params(self, reader: rd.Reader, params: dict):
         index_expr = params[defs.KEY_INDEX_EXPR]  # type: expr.IndexExpression
 
         # Make sure all indexing is done with slices (Example: (16,) will be changed to (slice(16, 17, None),) which
@@ -411,11 +501,31 @@ class PadDataExtractor(Extractor):
 
         padded_params = params.copy()
         padded_params[defs.KEY_INDEX_EXPR] = padded_index_expr
-        self.extractor.extract(reader, padded_params, extracted)
-
-        categories = self.extractor.categories if hasattr(self.extractor, 'categories') else [self.extractor.category]
-
-        for category in categories:
+        if defs.KEY_OUT in params:
+            self._set_out_region(reader, padded_params, padded_indexing, padded_shape, sub_indexing)
+        return padded_params, padded_shape, sub_indexing
+
+    def _set_out_region(self, reader: rd.Reader, padded_params: dict, padded_indexing: np.ndarray, padded_shape: tuple,
+                        sub_indexing: np.ndarray):
+        # the preallocated arrays can only be filled in place for zero padding, otherwise they are filled by the caller
+        if self.pad_fn is not PadDataExtractor.zero_pad:
+            del padded_params[defs.KEY_OUT]
+            return
+
+        # the region in the padded arrays, where the data will be read into (without the zero padding)
+        shape = reader.get_shape(padded_params[defs.KEY_SUBJECT_INDEX])[:padded_indexing.shape[0]]
+        read_lengths = np.maximum(np.minimum(padded_indexing[:, 1], shape) - padded_indexing[:, 0], 0)
+        out_indexing = sub_indexing.copy()
+        out_indexing[:, 1] = out_indexing[:, 0] + read_lengths
+        padded_params[defs.KEY_OUT_INDEX_EXPR] = expr.IndexExpression(out_indexing.tolist())
+
+        if out_indexing[:, 0].any() or (out_indexing[:, 1] != padded_shape).any():
+            for category in self._get_categories():
+                if category in padded_params[defs.KEY_OUT]:
+                    padded_params[defs.KEY_OUT][category].fill(0)
+
+    def _pad(self, extracted: dict, padded_shape: tuple, sub_indexing: np.ndarray):
+        for category in self._get_categories():
             data = extracted[category]
 
             full_pad_shape = padded_shape + data.shape[len(padded_shape):]
@@ -481,3 +591,89 @@ class FilesystemDataExtractor(Extractor):
             if not self.ignore_indexing:
                 data = data[index_expr.expression]
             extracted[category] = data
+
+
+def coalesce_index_expressions(index_exprs: typing.List[expr.IndexExpression]) \
+        -> typing.List[typing.Tuple[expr.IndexExpression, typing.List[typing.Tuple[int, typing.Union[tuple, None]]]]]:
+    """Combines contiguous or overlapping index expressions such that they can be read at once.
+
+    Index expressions are combined as long as their bounding box is not larger than their summed size, i.e., no (or
+    only overlapping) data is read in addition. Only expressions with equal integer-indexed and entirely sliced axes
+    are combined; expressions with steps, negative or open-ended slices are read individually.
+
+    Args:
+        index_exprs (list): The :class:`.IndexExpression` instances (of one subject).
+
+    Returns:
+        list: Tuples of the index expression to read and the samples that are contained in the read. Each sample is
+        a tuple of the position in :obj:`index_exprs` and the expression to slice the sample from the read data
+        (:code:`None` if the read data corresponds to the sample).
+    """
+    reads = []
+    groups = {}
+    for position, index_expr in enumerate(index_exprs):
+        ranges = _get_ranges(index_expr)
+        if ranges is None:
+            reads.append((index_expr, [(position, None)]))
+            continue
+        signature = tuple(None if r is None else r[2] for r in ranges)
+        groups.setdefault(signature, []).append((position, ranges))
+
+    for members in groups.values():
+        members.sort(key=lambda member: tuple(0 if r is None else r[0] for r in member[1]))
+
+        clusters = []  # entries are [bounding box, summed size, members]
+        for position, ranges in members:
+            size = _get_size(ranges)
+            if clusters:
+                bbox = tuple(None if r is None else (min(r[0], b[0]), max(r[1], b[1]), r[2])
+                             for r, b in zip(ranges, clusters[-1][0]))
+                if _get_size(bbox) <= clusters[-1][1] + size:
+                    clusters[-1][0] = bbox
+                    clusters[-1][1] += size
+                    clusters[-1][2].append((position, ranges))
+                    continue
+            clusters.append([ranges, size, [(position, ranges)]])
+
+        for bbox, _, cluster_members in clusters:
+            if len(cluster_members) == 1:
+                position = cluster_members[0][0]
+                reads.append((index_exprs[position], [(position, None)]))
+                continue
+
+            read_index_expr = expr.IndexExpression()
+            if len(bbox) > 0:
+                read_index_expr = expr.IndexExpression([slice(None) if b is None else slice(b[0], b[1]) for b in bbox])
+
+            samples = []
+            for position, ranges in cluster_members:
+                local_expression = tuple(slice(None) if r is None else
+                                         (r[0] - b[0] if r[2] else slice(r[0] - b[0], r[1] - b[0]))
+                                         for r, b in zip(ranges, bbox))
+                samples.append((position, local_expression))
+            reads.append((read_index_expr, samples))
+    return reads
+
+
+def _get_ranges(index_expr: expr.IndexExpression):
+    # converts the expression to (start, stop, is_integer_index) per axis, None for entirely sliced axes
+    expression = index_expr.expression
+    if not isinstance(expression, tuple):
+        return () if expression == slice(None) else None
+
+    ranges = []
+    for entry in expression:
+        if isinstance(entry, (int, np.integer)) and entry >= 0:
+            ranges.append((int(entry), int(entry) + 1, True))
+        elif isinstance(entry, slice) and entry == slice(None):
+            ranges.append(None)
+        elif isinstance(entry, slice) and entry.step is None and entry.start is not None and entry.stop is not None \
+                and 0 <= entry.start <= entry.stop:
+            ranges.append((entry.start, entry.stop, False))
+        else:
+            return None
+    return tuple(ranges)
+
+
+def _get_size(ranges) -> int:
+    return int(np.prod([r[1] - r[0] for r in ranges if r is not None]))
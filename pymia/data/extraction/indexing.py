@@ -1,11 +1,293 @@
 import abc
+import hashlib
+import os
 import typing
+import warnings
 
+import h5py
 import numpy as np
 
 import pymia.data.indexexpression as expr
 
 
+class IndexTable:
+
+    _INDEX = np.iinfo(np.int32).min  # stop marker of an integer index
+    _OPEN = _INDEX + 1  # stop marker of a slice without stop (slice(None) if start is 0)
+
+    def __init__(self, starts: np.ndarray, stops: np.ndarray, ndims: np.ndarray, subject_indices: np.ndarray = None):
+        """Compact, array-backed table of sample indices.
+
+        Instead of holding an :class:`.IndexExpression` instance per sample, the table stores the start and stop of every
+        axis in arrays and builds the :class:`.IndexExpression` instances on access. Access follows the list semantics,
+        i.e., :code:`table[i]` returns the tuple :code:`(subject_index, index_expression)`.
+
+        Args:
+            starts (np.ndarray): The starts of shape (N, A), where N is the number of samples and A the maximum number of
+                indexed axes. Integer indexes are stored as start.
+            stops (np.ndarray): The stops of shape (N, A). Integer indexes are marked by :attr:`IndexTable._INDEX` and
+                slices without stop by :attr:`IndexTable._OPEN`.
+            ndims (np.ndarray): The number of indexed axes (N,) of each sample. 0 refers to the entire data.
+            subject_indices (np.ndarray): The subject index (N,) of each sample. If :code:`None`, all samples belong to
+                the subject with index 0.
+        """
+        self.starts = np.asarray(starts, dtype=np.int32)
+        self.stops = np.asarray(stops, dtype=np.int32)
+        self.ndims = np.asarray(ndims, dtype=np.int8)
+        if subject_indices is None:
+            subject_indices = np.zeros(len(self.ndims), dtype=np.uint8)
+        self.subject_indices = np.asarray(subject_indices)
+
+    @classmethod
+    def empty(cls) -> 'IndexTable':
+        """Creates an empty table.
+
+        Returns:
+            IndexTable: The table without any sample.
+        """
+        return cls(np.zeros((0, 0)), np.zeros((0, 0)), np.zeros(0))
+
+    @classmethod
+    def from_expressions(cls, index_expressions: typing.List[expr.IndexExpression], subject_index: int = 0) -> 'IndexTable':
+        """Creates a table from :class:`.IndexExpression` instances.
+
+        Args:
+            index_expressions (list): The :class:`.IndexExpression` instances. Only integer indexing and slicing
+                without step are supported.
+            subject_index (int): The subject index of all samples.
+
+        Returns:
+            IndexTable: The table holding the index expressions.
+        """
+        expressions = [e.expression if isinstance(e.expression, tuple) else () for e in index_expressions]
+        ndims = np.array([len(e) for e in expressions], dtype=np.int8)
+        max_ndim = int(ndims.max()) if len(ndims) > 0 else 0
+
+        starts = np.zeros((len(expressions), max_ndim), dtype=np.int32)
+        stops = np.full((len(expressions), max_ndim), cls._OPEN, dtype=np.int32)
+        for i, expression in enumerate(expressions):
+            for axis, entry in enumerate(expression):
+                if isinstance(entry, (int, np.integer)):
+                    starts[i, axis] = entry
+                    stops[i, axis] = cls._INDEX
+                elif isinstance(entry, slice) and entry.step is None:
+                    starts[i, axis] = 0 if entry.start is None else entry.start
+                    if entry.stop is not None:
+                        stops[i, axis] = entry.stop
+                else:
+                    raise ValueError('Unsupported index "{}" in index expression'.format(entry))
+
+        subject_indices = np.full(len(expressions), subject_index, dtype=np.min_scalar_type(subject_index))
+        return cls(starts, stops, ndims, subject_indices)
+
+    @staticmethod
+    def concatenate(tables: typing.List['IndexTable'], subject_indices: typing.List[int] = None) -> 'IndexTable':
+        """Concatenates tables.
+
+        Args:
+            tables (list): The :class:`.IndexTable` instances to concatenate.
+            subject_indices (list): The subject index of each table. If :code:`None`, the subject indices of the tables
+                are kept.
+
+        Returns:
+            IndexTable: The concatenated table.
+        """
+        if len(tables) == 0:
+            return IndexTable.empty()
+
+        max_ndim = max(t.starts.shape[1] for t in tables)
+
+        def pad(arr: np.ndarray, value):
+            if arr.shape[1] == max_ndim:
+                return arr
+            return np.pad(arr, ((0, 0), (0, max_ndim - arr.shape[1])), constant_values=value)
+
+        starts = np.concatenate([pad(t.starts, 0) for t in tables])
+        stops = np.concatenate([pad(t.stops, IndexTable._OPEN) for t in tables])
+        ndims = np.concatenate([t.ndims for t in tables])
+        if subject_indices is None:
+            subject_column = np.concatenate([t.subject_indices for t in tables])
+        else:
+            dtype = np.min_scalar_type(max(subject_indices)) if len(subject_indices) > 0 else np.uint8
+            subject_column = np.repeat(np.asarray(subject_indices, dtype=dtype), [len(t) for t in tables])
+        return IndexTable(starts, stops, ndims, subject_column)
+
+    def get_index_expression(self, item: int) -> expr.IndexExpression:
+        """Builds the index expression of a sample.
+
+        Args:
+            item (int): The sample index.
+
+        Returns:
+            .IndexExpression: A new index expression instance.
+        """
+        index_expr = expr.IndexExpression()
+        ndim = self.ndims[item]
+        if ndim == 0:
+            return index_expr
+
+        expression = []
+        for start, stop in zip(self.starts[item, :ndim].tolist(), self.stops[item, :ndim].tolist()):
+            if stop == self._INDEX:
+                expression.append(start)
+            elif stop == self._OPEN:
+                expression.append(slice(None) if start == 0 else slice(start, None))
+            else:
+                expression.append(slice(start, stop))
+        index_expr.expression = tuple(expression)
+        return index_expr
+
+    def get_integer_indexing(self, items: np.ndarray) -> typing.Union[typing.Tuple[int, np.ndarray], None]:
+        """Get the integer indices of samples that are indexed by integers along the same adjacent axes (e.g., slices or
+        voxels) and entirely along all other axes. This allows to index all samples at once by advanced indexing.
+
+        Args:
+            items (np.ndarray): The sample indices.
+
+        Returns:
+            tuple: The first integer-indexed axis and the integer indices of shape (N, K), where K is the number of
+            integer-indexed axes. :code:`None` if the samples are not indexed this way (e.g., patches).
+        """
+        items = np.asarray(items, dtype=np.intp)
+        if len(items) == 0:
+            return None
+        ndims = self.ndims[items]
+        ndim = int(ndims[0])
+        if ndim == 0 or (ndims != ndim).any():
+            return None
+
+        starts = self.starts[items, :ndim]
+        stops = self.stops[items, :ndim]
+        index_axes = (stops == self._INDEX).all(axis=0)
+        entire_axes = ((stops == self._OPEN) & (starts == 0)).all(axis=0)
+        if not index_axes.any() or not (index_axes | entire_axes).all():
+            return None
+        axes = np.flatnonzero(index_axes)
+        if axes[-1] - axes[0] + 1 != len(axes):
+            return None
+        return int(axes[0]), starts[:, axes]
+
+    def __len__(self) -> int:
+        return len(self.ndims)
+
+    def __getitem__(self, item: int) -> typing.Tuple[int, expr.IndexExpression]:
+        item = int(item)
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('sample index {} out of range'.format(item))
+        return int(self.subject_indices[item]), self.get_index_expression(item)
+
+    def __iter__(self):
+        for item in range(len(self)):
+            yield self[item]
+
+
+class IndexCache:
+
+    def __init__(self, file_path: str) -> None:
+        """Persists :class:`.IndexTable` instances in a (sidecar) file such that the sample indices of a dataset need to be
+        computed only once.
+
+        Entries are identified by a key (see :meth:`IndexCache.get_key`) consisting of the indexing strategy's
+        representation, the subject subset, the absolute path, and a fingerprint of the dataset file. Entries of a
+        modified dataset are therefore not reused. A cache file can be shared by multiple datasets (e.g., training and
+        validation).
+
+        Args:
+            file_path (str): The path to the cache file (HDF5 format), which is created if it does not exist.
+        """
+        self.file_path = file_path
+
+    @staticmethod
+    def get_key(indexing_strategy: 'IndexingStrategy', subject_subset: list, dataset_path: str) -> str:
+        """Get the key identifying the indices of a dataset.
+
+        Args:
+            indexing_strategy (.IndexingStrategy): The indexing strategy. Its representation must uniquely define the
+                strategy (see :meth:`.IndexingStrategy.__repr__`).
+            subject_subset (list): The subject subset or :code:`None` for all subjects.
+            dataset_path (str): The path to the dataset.
+
+        Returns:
+            str: The key.
+        """
+        subset = 'all' if subject_subset is None else ','.join(sorted(str(s) for s in subject_subset))
+        return '{}|{}|{}|{}'.format(repr(indexing_strategy), subset, os.path.abspath(dataset_path),
+                                    IndexCache.get_fingerprint(dataset_path))
+
+    @staticmethod
+    def get_fingerprint(dataset_path: str) -> str:
+        """Get the fingerprint of a dataset file, which changes when the file is modified.
+
+        Args:
+            dataset_path (str): The path to the dataset.
+
+        Returns:
+            str: The fingerprint.
+        """
+        stat = os.stat(dataset_path)
+        return '{}-{}'.format(stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def _get_dataset(key: str) -> tuple:
+        # the dataset path and fingerprint of a key
+        parts = key.rsplit('|', 2)
+        return tuple(parts[-2:]) if len(parts) == 3 else (None, parts[-1])
+
+    @staticmethod
+    def _get_entry(key: str) -> str:
+        return 'indices/{}'.format(hashlib.sha1(key.encode()).hexdigest())
+
+    def load(self, key: str) -> typing.Union[IndexTable, None]:
+        """Load an index table.
+
+        Args:
+            key (str): The key of the entry.
+
+        Returns:
+            IndexTable: The index table or :code:`None` if no entry exists for the key.
+        """
+        if not os.path.isfile(self.file_path):
+            return None
+        entry = self._get_entry(key)
+        try:
+            with h5py.File(self.file_path, mode='r') as h5:
+                if entry not in h5 or h5[entry].attrs['key'] != key:
+                    return None
+                group = h5[entry]
+                return IndexTable(group['starts'][()], group['stops'][()], group['ndims'][()],
+                                  group['subject_indices'][()])
+        except OSError as e:
+            warnings.warn('Unable to load indices from cache "{}": {}'.format(self.file_path, e))
+            return None
+
+    def save(self, key: str, table: IndexTable):
+        """Save an index table. Entries of the same dataset with an outdated fingerprint are removed.
+
+        Args:
+            key (str): The key of the entry.
+            table (IndexTable): The index table.
+        """
+        dataset_path, fingerprint = self._get_dataset(key)
+        entry = self._get_entry(key)
+        try:
+            with h5py.File(self.file_path, mode='a') as h5:
+                for name in list(h5.get('indices', {}).keys()):
+                    other_path, other_fingerprint = self._get_dataset(h5['indices'][name].attrs['key'])
+                    if (other_path == dataset_path and other_fingerprint != fingerprint) or \
+                            'indices/{}'.format(name) == entry:
+                        del h5['indices'][name]
+                group = h5.create_group(entry)
+                group.attrs['key'] = key
+                group.create_dataset('starts', data=table.starts)
+                group.create_dataset('stops', data=table.stops)
+                group.create_dataset('ndims', data=table.ndims)
+                group.create_dataset('subject_indices', data=table.subject_indices)
+        except OSError as e:
+            warnings.warn('Unable to save indices to cache "{}": {}'.format(self.file_path, e))
+
+
 class IndexingStrategy(abc.ABC):
     """Interface for indexing strategies that can be applied to images.
 
@@ -32,6 +314,34 @@ class IndexingStrategy(abc.ABC):
         """
         return self.__class__.__name__
 
+    def get_index_table(self, shape: tuple) -> IndexTable:
+        """Calculate the indexes for a given shape in the compact :class:`.IndexTable` format.
+
+        The default implementation converts the result of :meth:`__call__`. Strategies generating many indexes should
+        override this method in order to not create an :class:`.IndexExpression` instance per index.
+
+        Args:
+            shape (tuple): The shape to determine the indexes for.
+
+        Returns:
+            IndexTable: The table of indexes for an image shape.
+        """
+        return IndexTable.from_expressions(self(shape))
+
+    def get_chunk_shape(self, shape: tuple) -> typing.Union[tuple, None]:
+        """Get the storage chunk shape matching the indexing (see :class:`.WriteDataCallback`).
+
+        Storing the data in chunks that align with the indexes allows reading an index by only accessing (and
+        decompressing) the chunks it overlaps.
+
+        Args:
+            shape (tuple): The shape of the data to be stored.
+
+        Returns:
+            tuple: The chunk shape, or :code:`None` if the strategy does not favor a specific chunking.
+        """
+        return None
+
 
 class EmptyIndexing(IndexingStrategy):
     """An empty indexing strategy. This is useful when a strategy is required but entire images should be extracted."""
@@ -39,6 +349,12 @@ class EmptyIndexing(IndexingStrategy):
     def __call__(self, shape) -> typing.List[expr.IndexExpression]:
         return [expr.IndexExpression()]
 
+    def get_index_table(self, shape: tuple) -> IndexTable:
+        return IndexTable(np.zeros((1, 0)), np.zeros((1, 0)), np.zeros(1))
+
+    def get_chunk_shape(self, shape: tuple) -> typing.Union[tuple, None]:
+        return tuple(shape)
+
 
 class SliceIndexing(IndexingStrategy):
 
@@ -58,6 +374,23 @@ class SliceIndexing(IndexingStrategy):
             indexing.extend(expr.IndexExpression(i, axis) for i in range(shape[axis]))
         return indexing
 
+    def get_index_table(self, shape: tuple) -> IndexTable:
+        tables = []
+        for axis in self.slice_axis:
+            starts = np.zeros((shape[axis], axis + 1))
+            starts[:, axis] = np.arange(shape[axis])
+            stops = np.full((shape[axis], axis + 1), IndexTable._OPEN)
+            stops[:, axis] = IndexTable._INDEX
+            tables.append(IndexTable(starts, stops, np.full(shape[axis], axis + 1)))
+        return IndexTable.concatenate(tables)
+
+    def get_chunk_shape(self, shape: tuple) -> typing.Union[tuple, None]:
+        if len(self.slice_axis) > 1:
+            return None  # no chunking fits slices along multiple axes
+        chunk_shape = list(shape)
+        chunk_shape[self.slice_axis[0]] = 1
+        return tuple(chunk_shape)
+
     def __repr__(self) -> str:
         return '{} ({})'.format(self.__class__.__name__, self.slice_axis)
 
@@ -86,21 +419,38 @@ class VoxelWiseIndexing(IndexingStrategy):
         self.indexing = [expr.IndexExpression(idx.tolist()) for idx in indices]
         return self.indexing
 
+    def get_index_table(self, shape: tuple) -> IndexTable:
+        shape_without_voxel = shape[0:self.image_dimension]
+        starts = np.indices(shape_without_voxel, dtype=np.int32).reshape((len(shape_without_voxel), -1)).T
+        stops = np.full_like(starts, IndexTable._INDEX)
+        return IndexTable(starts, stops, np.full(len(starts), len(shape_without_voxel)))
+
+    def __repr__(self) -> str:
+        return '{} ({})'.format(self.__class__.__name__, self.image_dimension)
+
 
 class PatchWiseIndexing(IndexingStrategy):
 
-    def __init__(self, patch_shape: tuple, ignore_incomplete=True) -> None:
+    def __init__(self, patch_shape: tuple, ignore_incomplete=True, stride: tuple = None) -> None:
         """Strategy to generate indices for patches (sub-volumes) of an image.
 
         Args:
             patch_shape (tuple): The patch shape.
             ignore_incomplete (bool): If even division of image by patch shape ignore incomplete patch on True.
                 Boundary condition.
+            stride (tuple): The distance between the patches in each dimension. A stride smaller than the patch shape
+                results in overlapping patches (e.g., for sliding-window inference, see :class:`.SubjectAssembler`).
+                If :code:`None`, the stride equals the patch shape, i.e. the patches do not overlap.
         """
         super().__init__()
         self.patch_shape = patch_shape
         self.image_dimension = len(patch_shape)
         self.ignore_incomplete = ignore_incomplete
+        if stride is None:
+            stride = patch_shape
+        if len(stride) != self.image_dimension or any(s < 1 for s in stride):
+            raise ValueError('stride must be positive and of same length as the patch shape')
+        self.stride = tuple(stride)
         self.prev_shape = None
         self.prev_indexing = None
 
@@ -108,21 +458,39 @@ class PatchWiseIndexing(IndexingStrategy):
         if shape == self.prev_shape:
             return self.prev_indexing
 
-        shape_without_voxel = shape[:self.image_dimension]
-        index_count = np.divide(shape_without_voxel, self.patch_shape)
-        index_count = np.floor(index_count) if self.ignore_incomplete else np.ceil(index_count)
-        index_count = index_count.astype('int')
-
-        indices = np.indices(index_count).reshape(index_count.size, -1).T
-        index_ranges = np.stack([indices, indices + 1], axis=-1)
-        index_ranges *= np.asarray(self.patch_shape)[np.newaxis, :, np.newaxis]
+        index_ranges = self._get_index_ranges(shape)
         indexing = [expr.IndexExpression(idx.tolist()) for idx in index_ranges]
 
         self.prev_indexing = indexing
         self.prev_shape = shape
         return indexing
 
+    def get_index_table(self, shape: tuple) -> IndexTable:
+        index_ranges = self._get_index_ranges(shape)
+        return IndexTable(index_ranges[..., 0], index_ranges[..., 1], np.full(len(index_ranges), self.image_dimension))
+
+    def _get_index_ranges(self, shape) -> np.ndarray:
+        shape_without_voxel = np.asarray(shape[:self.image_dimension])
+        patch_shape = np.asarray(self.patch_shape)
+        stride = np.asarray(self.stride)
+
+        # number of patches starting at multiples of the stride, which are entirely inside the image or, if not
+        # ignore_incomplete, which are required to cover the entire image
+        index_count = np.divide(shape_without_voxel - patch_shape, stride)
+        index_count = np.floor(index_count) + 1 if self.ignore_incomplete else np.ceil(index_count) + 1
+        index_count = np.maximum(index_count, 0 if self.ignore_incomplete else 1).astype('int')
+        index_count[shape_without_voxel == 0] = 0
+
+        indices = np.indices(index_count).reshape(index_count.size, -1).T
+        starts = indices * stride
+        return np.stack([starts, starts + patch_shape], axis=-1)
+
+    def get_chunk_shape(self, shape: tuple) -> typing.Union[tuple, None]:
+        patch_shape = tuple(min(p, s) for p, s in zip(self.patch_shape, shape))
+        return patch_shape + tuple(shape[len(patch_shape):])
+
     def __repr__(self) -> str:
-        return '{} (patch shape={}, ignore incomplete={})'.format(self.__class__.__name__,
-                                                                  self.patch_shape,
-                                                                  self.ignore_incomplete)
+        return '{} (patch shape={}, ignore incomplete={}, stride={})'.format(self.__class__.__name__,
+                                                                             self.patch_shape,
+                                                                             self.ignore_incomplete,
+                                                                             self.stride)
@@ -1,5 +1,8 @@
 import abc
+import collections
 import os
+import threading
+import typing
 
 import h5py
 import numpy as np
@@ -72,6 +75,22 @@ class Reader(abc.ABC):
         """
         pass
 
+    def read_into(self, entry: str, out: np.ndarray, index: expr.IndexExpression = None,
+                  out_index: expr.IndexExpression = None) -> None:
+        """Read a dataset entry into a preallocated array.
+
+        The default implementation copies the result of :meth:`read` into :obj:`out`.
+
+        Args:
+            entry(str): The dataset entry.
+            out(np.ndarray): The array to read the data into. Its size must correspond to the size of the read data.
+            index(expr.IndexExpression): The slicing expression.
+            out_index(expr.IndexExpression): The slicing expression of the region in :obj:`out` to read the data into.
+                If :code:`None`, the data is read into the entire :obj:`out`.
+        """
+        destination = out if out_index is None else out[out_index.expression]
+        destination[...] = np.reshape(self.read(entry, index), destination.shape)
+
     @abc.abstractmethod
     def has(self, entry: str) -> bool:
         """Check whether a dataset entry exists.
@@ -95,19 +114,109 @@ class Reader(abc.ABC):
         pass
 
 
+class VolumeCache:
+
+    def __init__(self, max_bytes: int) -> None:
+        """Least recently used (LRU) cache of entire data volumes (e.g., the images of a subject).
+
+        The cache is shared by the readers of a :class:`.PymiaDatasource` (see :code:`volume_cache_size`). Once a
+        volume is read, all subsequent reads (e.g., slices or patches) are copied from the cached volume in memory.
+        The least recently used volumes are evicted when exceeding :obj:`max_bytes`.
+
+        Args:
+            max_bytes (int): The memory budget in bytes. Volumes larger than the budget are not cached.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        """int: The number of bytes of the cached volumes."""
+        self.hits = 0
+        """int: The number of reads served from the cache."""
+        self.misses = 0
+        """int: The number of reads that needed to load the volume."""
+        self.evictions = 0
+        """int: The number of evicted volumes."""
+        self._volumes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load_fn: typing.Callable[[], np.ndarray]) -> np.ndarray:
+        """Get a cached volume or load and cache it.
+
+        Args:
+            key: The key of the volume (e.g., the file path and the dataset entry).
+            load_fn (callable): Function loading the entire volume.
+
+        Returns:
+            np.ndarray: The read-only volume. Copy the volume (or parts of it) before modifications.
+        """
+        with self._lock:
+            volume = self._volumes.get(key)
+            if volume is not None:
+                self._volumes.move_to_end(key)
+                self.hits += 1
+                return volume
+            self.misses += 1
+
+        volume = load_fn()
+        volume.flags.writeable = False
+        if volume.nbytes > self.max_bytes:
+            return volume
+
+        with self._lock:
+            if key not in self._volumes:
+                self._volumes[key] = volume
+                self.nbytes += volume.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._volumes.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+        return volume
+
+    def clear(self):
+        """Clears the cached volumes and the statistics."""
+        with self._lock:
+            self._volumes.clear()
+            self.nbytes = self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._volumes)
+
+    def __repr__(self):
+        return 'VolumeCache({} volumes, {}/{} bytes, hits={}, misses={}, evictions={})'.format(
+            len(self), self.nbytes, self.max_bytes, self.hits, self.misses, self.evictions)
+
+    def __getstate__(self):
+        # the cached volumes are not transferred (e.g., to worker processes), every process has its own cache
+        return {'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['max_bytes'])
+
+
 class Hdf5Reader(Reader):
     """Represents the dataset reader for HDF5 files."""
 
-    def __init__(self, file_path: str, category=defs.KEY_IMAGES) -> None:
+    def __init__(self, file_path: str, category=defs.KEY_IMAGES, preload_meta: bool = False,
+                 volume_cache: VolumeCache = None) -> None:
         """Initializes a new instance.
 
         Args:
             file_path(str): The path to the dataset file.
             category(str): The category of an entry that defines the shape request
+            preload_meta(bool): Whether to read all meta-data entries (e.g., shapes, subjects, names, image properties,
+                files) at once when opening the reader. Subsequent reads of meta-data entries are answered from memory,
+                which avoids many small reads of the file.
+            volume_cache(VolumeCache): Cache of the entire data volumes. Reads of data entries are served from this
+                cache (see :class:`VolumeCache`), except for volumes larger than the memory budget of the cache. If
+                :code:`None`, data is always read from the file.
         """
         super().__init__(file_path)
         self.h5 = None  # type: h5py.File
         self.category = category
+        self.preload_meta = preload_meta
+        self.volume_cache = volume_cache
+        self.meta = {}
+        """dict: The preloaded meta-data entries (empty if not :code:`preload_meta`)."""
+        self._cacheable = {}  # whether the data entries fit into the volume cache
 
     def get_subject_entries(self) -> list:
         """see :meth:`.Reader.get_subject_entries`"""
@@ -124,38 +233,113 @@ class Hdf5Reader(Reader):
 
     def read(self, entry: str, index: expr.IndexExpression = None):
         """see :meth:`.Reader.read`"""
-        if index is None:
+        if entry in self.meta:
+            data = self.meta[entry]
+            if index is not None:
+                data = data[index.expression]
+            if isinstance(data, np.ndarray):
+                data = data.copy()  # prevent modifications of the preloaded data
+        elif self._is_cached(entry):
+            data = self._get_cached(entry)
+            # copy, the cached volume is read-only and extracted data might be modified in place (e.g., by transforms)
+            data = data.copy() if index is None else data[index.expression].copy()
+        elif index is None:
             data = self.h5[entry][()]  # need () instead of util.IndexExpression(None) [which is equal to slice(None)]
         else:
             data = self.h5[entry][index.expression]
 
+        if isinstance(data, bytes):
+            return data.decode()  # h5py >= 3 reads variable-length strings as bytes
         if isinstance(data, np.ndarray) and data.dtype == np.object:
-            return data.tolist()
+            return _decode_bytes(data.tolist())
         # if h5py.check_dtype(vlen=self.h5[entry].dtype) == str and not isinstance(data, str):
         #     return data.tolist()
         return data
 
+    def read_into(self, entry: str, out: np.ndarray, index: expr.IndexExpression = None,
+                  out_index: expr.IndexExpression = None) -> None:
+        """see :meth:`.Reader.read_into`
+
+        The data is directly read into :obj:`out` (without intermediate array) if :obj:`out` is C-contiguous.
+        """
+        if self._is_cached(entry):
+            # copy directly from the cached volume
+            data = self._get_cached(entry)
+            if index is not None:
+                data = data[index.expression]
+            destination = out if out_index is None else out[out_index.expression]
+            destination[...] = np.reshape(data, destination.shape)
+            return
+        if entry in self.meta or not out.flags.c_contiguous:
+            super().read_into(entry, out, index, out_index)
+            return
+
+        self.h5[entry].read_direct(out, None if index is None else index.expression,
+                                   None if out_index is None else out_index.expression)
+
     def has(self, entry: str) -> bool:
         """see :meth:`.Reader.has`"""
         return entry in self.h5
 
+    def _is_cached(self, entry: str) -> bool:
+        if self.volume_cache is None or not entry.startswith(defs.LOC_DATA + '/'):
+            return False
+        if entry not in self._cacheable:
+            # volumes exceeding the budget are read partially from the file instead of entirely for every read
+            dataset = self.h5[entry]
+            self._cacheable[entry] = dataset.size * dataset.dtype.itemsize <= self.volume_cache.max_bytes
+        return self._cacheable[entry]
+
+    def _get_cached(self, entry: str) -> np.ndarray:
+        return self.volume_cache.get((os.path.abspath(self.file_path), entry), lambda: self.h5[entry][()])
+
     def open(self):
         """see :meth:`.Reader.open`"""
         self.h5 = h5py.File(self.file_path, mode='r', libver='latest')
+        if self.preload_meta:
+            self._preload_meta()
 
     def close(self):
         """see :meth:`.Reader.close`"""
         if self.h5 is not None:
             self.h5.close()
             self.h5 = None
+        self.meta = {}
+        self._cacheable = {}
+
+    def _preload_meta(self):
+        meta = {}
+
+        def load(name, obj):
+            if isinstance(obj, h5py.Dataset):
+                data = obj[()]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                elif isinstance(data, np.ndarray) and data.dtype == np.object:
+                    # decode once, indexing then returns str (or object arrays of str)
+                    decoded = np.empty(data.shape, dtype=object)
+                    decoded.ravel()[:] = _decode_bytes(data.ravel().tolist())
+                    data = decoded
+                meta['{}/{}'.format(defs.LOC_META, name)] = data
+
+        if defs.LOC_META in self.h5:
+            self.h5[defs.LOC_META].visititems(load)
+        self.meta = meta
+
+
+def _decode_bytes(data):
+    if isinstance(data, list):
+        return [_decode_bytes(d) for d in data]
+    return data.decode() if isinstance(data, bytes) else data
 
 
-def get_reader(file_path: str, direct_open: bool = False) -> Reader:
+def get_reader(file_path: str, direct_open: bool = False, **kwargs) -> Reader:
     """Get the dataset reader corresponding to the file extension.
 
     Args:
         file_path(str): The path to the dataset file.
         direct_open(bool): Whether the file should directly be opened.
+        **kwargs: Reader-specific arguments (e.g., :code:`preload_meta` of :class:`.Hdf5Reader`).
 
     Returns:
         Reader: Reader corresponding to dataset file extension.
@@ -165,7 +349,7 @@ def get_reader(file_path: str, direct_open: bool = False) -> Reader:
     if extension not in reader_registry:
         raise ValueError('unknown dataset file extension "{}"'.format(extension))
 
-    reader = reader_registry[extension](file_path)
+    reader = reader_registry[extension](file_path, **kwargs)
     if direct_open:
         reader.open()
     return reader
@@ -0,0 +1,152 @@
+import concurrent.futures as futures
+import threading
+import typing
+
+import numpy as np
+
+from . import datasource as ds
+from . import reader as rd
+
+
+class PatchQueue:
+
+    def __init__(self, datasource: ds.PymiaDatasource, samples_per_subject: int = None, max_subjects: int = 4,
+                 buffer_size: int = 128, shuffle: bool = True, num_workers: int = 2, seed: int = None) -> None:
+        """Queue-based sampling of the samples (e.g., patches) of a :class:`.PymiaDatasource`, subject by subject.
+
+        Sampling randomly from all samples requires reading from a different subject for nearly every sample. Instead,
+        the queue loads :obj:`max_subjects` subjects in the background, each entirely read once, and extracts
+        :obj:`samples_per_subject` samples of every loaded subject from memory. The samples of the loaded subjects are
+        mixed in a bounded shuffle buffer. Exhausted subjects are replaced by the next subjects until every subject
+        was loaded once (i.e., one epoch).
+
+        The samples are defined by the indexing strategy of the datasource and extracted with its extractor and
+        transform (see :meth:`.PymiaDatasource.get_batch`).
+
+        Args:
+            datasource (.PymiaDatasource): The datasource to sample from.
+            samples_per_subject (int): The number of samples to draw from each subject. If :code:`None` or larger than
+                the number of samples of a subject, all samples of the subject are drawn.
+            max_subjects (int): The number of subjects that are loaded (or loading) at the same time.
+            buffer_size (int): The size of the shuffle buffer. Larger sizes mix the samples of more subjects.
+            shuffle (bool): Whether to randomly order the subjects, draw random samples of each subject, and mix the
+                samples. If :code:`False`, the first :obj:`samples_per_subject` samples of each subject are returned
+                in order.
+            num_workers (int): The number of threads loading subjects.
+            seed (int): The seed of the random generator.
+
+        Examples:
+            >>> ds = PymiaDatasource(..., indexing_strategy=PatchWiseIndexing((32, 32, 32)))
+            >>> queue = PatchQueue(ds, samples_per_subject=16, max_subjects=8)
+            >>> for epoch in range(epochs):
+            >>>     for sample in queue:
+            >>>         ...
+        """
+        if max_subjects < 1:
+            raise ValueError('max_subjects must be positive')
+        self.datasource = datasource
+        self.samples_per_subject = samples_per_subject
+        self.max_subjects = max_subjects
+        self.buffer_size = buffer_size
+        self.shuffle = shuffle
+        self.num_workers = num_workers
+        self.random_state = np.random.RandomState(seed)
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+        subject_indices = np.asarray(datasource.indices.subject_indices)
+        order = np.argsort(subject_indices, kind='stable')
+        subjects, starts = np.unique(subject_indices[order], return_index=True)
+        self.subject_samples = dict(zip(subjects.tolist(), np.split(order, starts[1:])))
+        """dict: The sample indices of each subject index."""
+
+    def __len__(self):
+        return sum(self._get_number_of_samples(len(samples)) for samples in self.subject_samples.values())
+
+    def __iter__(self) -> typing.Iterator[dict]:
+        subjects = list(self.subject_samples.keys())
+        if self.shuffle:
+            self.random_state.shuffle(subjects)
+        selections = [(subject, self._select(subject)) for subject in subjects]
+
+        executor = futures.ThreadPoolExecutor(max_workers=self.num_workers)
+        loading = []  # futures of the loaded (or loading) subjects, in loading order
+        buffer = []
+        try:
+            while selections or loading:
+                while selections and len(loading) < self.max_subjects:
+                    loading.append(executor.submit(self._load, *selections.pop(0)))
+
+                if not self.shuffle:
+                    yield from reversed(loading.pop(0).result())
+                    continue
+
+                # draw from a loaded subject, wait for the earliest if none is loaded yet
+                loaded = [f for f in loading if f.done()] or [loading[0]]
+                future = loaded[self.random_state.randint(len(loaded))]
+                subject_samples = future.result()
+                if subject_samples:
+                    sample = subject_samples.pop()
+                    if len(buffer) < self.buffer_size:
+                        buffer.append(sample)
+                    else:
+                        i = self.random_state.randint(len(buffer))
+                        yield buffer[i]
+                        buffer[i] = sample
+                if not subject_samples:
+                    loading.remove(future)
+
+            self.random_state.shuffle(buffer)
+            yield from buffer
+        finally:
+            for future in loading:
+                future.cancel()
+            executor.shutdown(wait=True)
+            self._close_readers()
+
+    def _get_number_of_samples(self, available: int) -> int:
+        if self.samples_per_subject is None:
+            return available
+        return min(self.samples_per_subject, available)
+
+    def _select(self, subject: int) -> np.ndarray:
+        samples = self.subject_samples[subject]
+        nb_samples = self._get_number_of_samples(len(samples))
+        if self.shuffle:
+            return self.random_state.choice(samples, nb_samples, replace=False)
+        return samples[:nb_samples]
+
+    def _load(self, subject: int, selection: np.ndarray) -> typing.List[dict]:
+        # the volumes of the subject are read only once, and released after the samples are extracted
+        reader = self._get_reader()
+        reader.volume_cache = rd.VolumeCache(np.iinfo(np.int64).max)
+        try:
+            samples = self.datasource.get_batch(selection, reader=reader)
+        finally:
+            reader.volume_cache = None
+
+        for sample in samples:
+            for key, value in sample.items():
+                if isinstance(value, np.ndarray) and not value.flags.owndata:
+                    sample[key] = value.copy()  # views would keep the entire volumes in memory
+        samples.reverse()  # samples are popped from the end
+        return samples
+
+    def _get_reader(self) -> rd.Reader:
+        # each thread reads with its own reader, opened (and its meta-data preloaded) once per iteration
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            reader = rd.get_reader(self.datasource.dataset_path, direct_open=True,
+                                   preload_meta=self.datasource.preload_meta)
+            self._local.reader = reader
+            with self._readers_lock:
+                self._readers.append(reader)
+        return reader
+
+    def _close_readers(self):
+        with self._readers_lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+        self._local = threading.local()
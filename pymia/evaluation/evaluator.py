@@ -5,11 +5,17 @@ calling :meth:`pymia.evaluation.evaluator.Evaluator.evaluate`. The results can b
 :mod:`pymia.evaluation.writer` module.
 """
 import abc
+import collections
+import concurrent.futures as futures
+import copy
+import threading
 import typing
 
 import numpy as np
 import SimpleITK as sitk
 
+import pymia.data.assembler as assm
+import pymia.data.extraction as extr
 import pymia.evaluation.metric as pymia_metric
 
 
@@ -30,6 +36,105 @@ class Result:
         self.value = value
 
 
+class ResultTable:
+
+    def __init__(self, results: typing.Iterable[Result]):
+        """Represents results in columnar form, indexed by id, label, and metric.
+
+        The ids, labels, and metrics are stored as sorted categories and integer codes, such that the lookup of a result
+        (see :meth:`get`) and the aggregation of the results (see :meth:`aggregate`) do not scan all results.
+
+        Args:
+            results (iterable of Result): The results (e.g., :attr:`Evaluator.results`). If a result occurs multiple
+                times, the first is used.
+        """
+        results = list(results)
+        self.ids, self.id_codes, self._id_lookup = self._encode([r.id_ for r in results])
+        """list: The sorted unique ids."""
+        self.labels, self.label_codes, self._label_lookup = self._encode([r.label for r in results])
+        """list: The sorted unique labels."""
+        self.metrics, self.metric_codes, self._metric_lookup = self._encode([r.metric for r in results])
+        """list: The sorted unique metrics."""
+        self.values = np.empty(len(results), dtype=object)
+        self.values[:] = [r.value for r in results]
+
+        # the position of each (id, label, metric) in the columns, -1 if missing
+        self.index = np.full((len(self.ids), len(self.labels), len(self.metrics)), -1, dtype=np.intp)
+        keys = np.ravel_multi_index((self.id_codes, self.label_codes, self.metric_codes), self.index.shape)
+        keys, positions = np.unique(keys, return_index=True)  # the position of the first result of duplicates
+        self.index.flat[keys] = positions
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, id_: str, label: str, metric: str, default=None):
+        """Gets the value of a result.
+
+        Args:
+            id_ (str): The id.
+            label (str): The label.
+            metric (str): The metric.
+            default: The value if the result does not exist.
+
+        Returns:
+            The value of the result or :obj:`default`.
+        """
+        try:
+            position = self.index[self._id_lookup[id_], self._label_lookup[label], self._metric_lookup[metric]]
+        except KeyError:
+            return default
+        return self.values[position] if position >= 0 else default
+
+    def get_values(self, default=None) -> np.ndarray:
+        """Gets the values of all results.
+
+        Args:
+            default: The value of missing results.
+
+        Returns:
+            np.ndarray: The values (object array) of shape (ids, labels, metrics), ordered as :attr:`ids`,
+            :attr:`labels`, and :attr:`metrics`.
+        """
+        values = np.empty(self.index.shape, dtype=object)
+        values[...] = default
+        exists = self.index >= 0
+        values[exists] = self.values[self.index[exists]]
+        return values
+
+    def aggregate(self, functions: dict) -> typing.List[Result]:
+        """Aggregates the values of each label and metric over all ids (e.g., mean and standard deviation).
+
+        Args:
+            functions (dict): The functions (value) reducing an array of values to a number, and their identification
+                (key), which is the id of the aggregated results.
+
+        Returns:
+            list of Result: The aggregated results ordered by label, metric, and function.
+        """
+        if len(self) == 0:
+            return []
+
+        # group the values by label and metric
+        groups = self.label_codes * len(self.metrics) + self.metric_codes
+        order = np.argsort(groups, kind='stable')
+        counts = np.bincount(groups, minlength=len(self.labels) * len(self.metrics))
+        grouped_values = np.split(self.values[order], np.cumsum(counts)[:-1])
+
+        aggregated_results = []
+        for group, values in enumerate(grouped_values):
+            label, metric = self.labels[group // len(self.metrics)], self.metrics[group % len(self.metrics)]
+            values = values.astype(np.float64)
+            for fn_id, fn in functions.items():
+                aggregated_results.append(Result(fn_id, label, metric, float(fn(values))))
+        return aggregated_results
+
+    @staticmethod
+    def _encode(column: list) -> typing.Tuple[list, np.ndarray, dict]:
+        categories = sorted(set(column))
+        lookup = {category: code for code, category in enumerate(categories)}
+        return categories, np.fromiter((lookup[value] for value in column), dtype=np.intp, count=len(column)), lookup
+
+
 class Evaluator(abc.ABC):
 
     def __init__(self, metrics: typing.List[pymia_metric.Metric]):
@@ -40,6 +145,7 @@ class Evaluator(abc.ABC):
         """
         self.metrics = metrics
         self.results = []
+        self._submitted = []
 
     @abc.abstractmethod
     def evaluate(self,
@@ -55,22 +161,115 @@ class Evaluator(abc.ABC):
         """
         raise NotImplementedError
 
+    def submit(self, executor: futures.Executor,
+               prediction: typing.Union[sitk.Image, np.ndarray],
+               reference: typing.Union[sitk.Image, np.ndarray],
+               id_: str, **kwargs) -> futures.Future:
+        """Evaluates the metrics on the provided prediction and reference asynchronously (see :meth:`evaluate`).
+
+        The evaluation runs on a copy of the evaluator (with copies of the metrics). Call :meth:`wait` to add the
+        results to :attr:`results` in the order of submission, independent of the order of completion.
+
+        Args:
+            executor (concurrent.futures.Executor): The executor running the evaluation, e.g., a
+                :class:`concurrent.futures.ThreadPoolExecutor` (the SciPy and SimpleITK computations release the GIL)
+                or a :class:`concurrent.futures.ProcessPoolExecutor` (the evaluator and images must be picklable).
+            prediction (typing.Union[sitk.Image, np.ndarray]): The prediction.
+            reference (typing.Union[sitk.Image, np.ndarray]): The reference.
+            id_ (str): The identification of the case to evaluate.
+
+        Returns:
+            concurrent.futures.Future: The future of the results (list of :class:`Result`) of the case.
+        """
+        future = executor.submit(_evaluate, self._get_worker(), prediction, reference, id_, kwargs)
+        self._submitted.append(future)
+        return future
+
+    def wait(self):
+        """Waits for the submitted evaluations (see :meth:`submit`) and adds their results in the order of submission.
+
+        Raises:
+            Exception: The first error of the submitted evaluations. The results of all successful evaluations are
+                added nevertheless.
+        """
+        submitted, self._submitted = self._submitted, []
+        futures.wait(submitted)
+        error = None
+        for future in submitted:
+            if future.exception() is not None:
+                error = error or future.exception()
+            else:
+                self.results.extend(future.result())
+        if error is not None:
+            raise error
+
+    def evaluate_many(self, cases: typing.Iterable[tuple], executor: futures.Executor = None,
+                      num_workers: int = None):
+        """Evaluates the metrics on multiple cases in parallel.
+
+        The results are added to :attr:`results` in the order of the cases, i.e., equal to calling :meth:`evaluate` for
+        each case.
+
+        Args:
+            cases (iterable): The cases of tuples (prediction, reference, id_) or (prediction, reference, id_, kwargs),
+                where the dict kwargs contains the additional arguments of :meth:`evaluate` (e.g., the mask of the
+                :class:`RegressionEvaluator`).
+            executor (concurrent.futures.Executor): The executor running the evaluations (see :meth:`submit`). If
+                :code:`None`, a :class:`concurrent.futures.ThreadPoolExecutor` with :obj:`num_workers` threads.
+            num_workers (int): The number of threads if no :obj:`executor` is provided. Defaults to the number of
+                processors.
+        """
+        own_executor = executor is None
+        if own_executor:
+            executor = futures.ThreadPoolExecutor(max_workers=num_workers)
+        try:
+            for case in cases:
+                prediction, reference, id_ = case[:3]
+                kwargs = case[3] if len(case) > 3 else {}
+                self.submit(executor, prediction, reference, id_, **kwargs)
+            self.wait()
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+
     def clear(self):
         """Clears the results."""
         self.results = []
 
+    def _get_worker(self) -> 'Evaluator':
+        # the metrics store their inputs, i.e. each evaluation requires its own metrics
+        worker = copy.copy(self)
+        worker.metrics = [copy.copy(metric) for metric in self.metrics]
+        worker.results = []
+        worker._submitted = []
+        return worker
+
 
 class SegmentationEvaluator(Evaluator):
 
-    def __init__(self, metrics: typing.List[pymia_metric.Metric], labels: dict):
+    def __init__(self, metrics: typing.List[pymia_metric.Metric], labels: dict, reference_cache_size: int = 0,
+                 crop: bool = True):
         """Represents a segmentation evaluator, evaluating metrics on predictions against references.
 
         Args:
             metrics (list of pymia_metric.Metric): A list of metrics.
             labels (dict): A dictionary with labels (key of type int) and label descriptions (value of type string).
+            reference_cache_size (int): The number of reference surfaces (see :class:`.Surface`) kept for the
+                distance metrics, e.g., to evaluate the same references every epoch. The surfaces are identified by
+                the id, label, and spacing, and the least recently used surface is removed first. Use
+                :meth:`clear_reference_cache` if a reference of an id changes. No surfaces are kept if 0.
+            crop (bool): Whether to crop the binary images of each label to the bounding box of the prediction and
+                reference for the confusion matrix and the crop-invariant metrics (see
+                :attr:`.NumpyArrayMetric.crop_invariant`), which is faster for small structures in large images.
         """
         super().__init__(metrics)
         self.labels = labels
+        if reference_cache_size < 0:
+            raise ValueError('reference_cache_size must not be negative, got {}'.format(reference_cache_size))
+        self.reference_cache_size = reference_cache_size
+        self.crop = crop
+        self._reference_lock = threading.Lock()  # the reference surfaces are shared with the workers of submit
+        self._reference_surfaces = collections.OrderedDict()
 
     def add_label(self, label: typing.Union[tuple, int], description: str):
         """Adds a label with its description to the evaluation.
@@ -81,6 +280,29 @@ class SegmentationEvaluator(Evaluator):
         """
         self.labels[label] = description
 
+    def clear_reference_cache(self):
+        """Clears the cached reference surfaces (see :obj:`reference_cache_size`)."""
+        with self._reference_lock:
+            self._reference_surfaces.clear()
+
+    def _get_worker(self) -> 'SegmentationEvaluator':
+        worker = super()._get_worker()
+        # the threads share the reference surfaces
+        worker._reference_surfaces = self._reference_surfaces
+        worker._reference_lock = self._reference_lock
+        return worker
+
+    def __getstate__(self):
+        # the reference surfaces are not shared with other processes
+        state = self.__dict__.copy()
+        state['_reference_surfaces'] = collections.OrderedDict()
+        del state['_reference_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reference_lock = threading.Lock()
+
     def evaluate(self,
                  prediction: typing.Union[sitk.Image, np.ndarray],
                  reference: typing.Union[sitk.Image, np.ndarray],
@@ -108,40 +330,380 @@ class SegmentationEvaluator(Evaluator):
         prediction_array = sitk.GetArrayFromImage(prediction) if isinstance(prediction, sitk.Image) else prediction
         reference_array = sitk.GetArrayFromImage(reference) if isinstance(reference, sitk.Image) else reference
 
-        for label, label_str in self.labels.items():
-            # get only current label
-            prediction_of_label = np.in1d(prediction_array.ravel(), label, True).reshape(prediction_array.shape).astype(np.uint8)
-            reference_of_label = np.in1d(reference_array.ravel(), label, True).reshape(reference_array.shape).astype(np.uint8)
-
-            # calculate the confusion matrix for ConfusionMatrixMetric
-            confusion_matrix = pymia_metric.ConfusionMatrix(prediction_of_label, reference_of_label)
+        # the confusion matrices of all labels are derived from one contingency table if possible
+        contingency_table = None
+        if any(isinstance(metric, pymia_metric.ConfusionMatrixMetric) for metric in self.metrics):
+            try:
+                contingency_table = pymia_metric.ContingencyTable(prediction_array, reference_array)
+            except ValueError:
+                pass  # e.g., floating point images, use the binary images of each label
+
+        # spacing depends on SimpleITK image properties or an isotropic spacing as fallback
+        def get_spacing(intermediates):
+            if isinstance(prediction, sitk.Image):
+                return prediction.GetSpacing()[::-1]
+            else:
+                return (1.0,) * reference_array.ndim  # use isotropic spacing of 1 mm
 
-            # for distance metrics
-            distances = None
-
-            # spacing depends on SimpleITK image properties or an isotropic spacing as fallback
-            def get_spacing():
-                if isinstance(prediction, sitk.Image):
-                    return prediction.GetSpacing()[::-1]
-                else:
-                    return (1.0,) * reference_of_label.ndim  # use isotropic spacing of 1 mm
+        for label, label_str in self.labels.items():
+            # the intermediates of the current label are only computed if required by a metric
+            def get_images(intermediates, label=label):
+                return _get_label_array(prediction_array, label), _get_label_array(reference_array, label)
+
+            def get_cropped_images(intermediates):
+                # the binary images cropped to their joint bounding box for crop-invariant metrics
+                images = intermediates['images']
+                if not self.crop:
+                    return images
+                bbox = pymia_metric.get_bounding_box(*images)
+                if bbox is None:
+                    bbox = (slice(0, 0), ) * prediction_array.ndim
+                return tuple(image[bbox] for image in images)
+
+            def get_confusion_matrix(intermediates, label=label):
+                if contingency_table is not None:
+                    return contingency_table.get_confusion_matrix(label)
+                cropped = pymia_metric.ConfusionMatrix(*intermediates['cropped_images'])
+                # the cropped-away voxels are true negatives
+                return pymia_metric.ConfusionMatrix.from_counts(
+                    cropped.tp, cropped.tn + prediction_array.size - cropped.n, cropped.fp, cropped.fn)
+
+            def get_distances(intermediates, label=label):
+                return self._get_distances(id_, label, prediction_array, intermediates)
+
+            intermediates = pymia_metric.Intermediates({
+                'images': get_images,
+                'cropped_images': get_cropped_images,
+                'spacing': get_spacing,
+                'confusion_matrix': get_confusion_matrix,
+                'distances': get_distances
+            })
 
             # calculate the metrics
-            for param_index, metric in enumerate(self.metrics):
+            for metric in self.metrics:
                 if isinstance(metric, pymia_metric.ConfusionMatrixMetric):
-                    metric.confusion_matrix = confusion_matrix
+                    metric.confusion_matrix = intermediates['confusion_matrix']
                 # ensure this is checked before NumpyArrayMetric as SpacingMetric is itself a NumpyArrayMetric
                 elif isinstance(metric, pymia_metric.SpacingMetric):
-                    metric.reference = reference_of_label
-                    metric.prediction = prediction_of_label
-                    metric.spacing = get_spacing()
+                    metric.prediction, metric.reference = \
+                        intermediates['cropped_images' if metric.crop_invariant else 'images']
+                    metric.spacing = intermediates['spacing']
                 elif isinstance(metric, pymia_metric.NumpyArrayMetric):
-                    metric.reference = reference_of_label
-                    metric.prediction = prediction_of_label
+                    metric.prediction, metric.reference = \
+                        intermediates['cropped_images' if metric.crop_invariant else 'images']
                 elif isinstance(metric, pymia_metric.DistanceMetric):
-                    if distances is None:
-                        # calculate distances only once
-                        distances = pymia_metric.Distances(prediction_of_label, reference_of_label, get_spacing())
-                    metric.distances = distances
+                    metric.distances = intermediates['distances']
+
+                metric.intermediates = intermediates
+                try:
+                    self.results.append(Result(id_, label_str, metric.metric, metric.calculate()))
+                finally:
+                    metric.intermediates = None
+
+    def _get_distances(self, id_: str, label, prediction_array: np.ndarray,
+                       intermediates: pymia_metric.Intermediates) -> pymia_metric.Distances:
+        spacing = intermediates['spacing']
+        if self.reference_cache_size == 0:
+            return pymia_metric.Distances(*intermediates['images'], spacing)
+
+        key = (id_, label, tuple(float(s) for s in spacing), prediction_array.shape)
+        with self._reference_lock:
+            surface = self._reference_surfaces.get(key)
+            if surface is not None:
+                self._reference_surfaces.move_to_end(key)
+        if surface is None:
+            surface = pymia_metric.Surface(intermediates['images'][1], spacing)
+            surface.tree  # the search tree is reused by all subsequent evaluations
+            with self._reference_lock:
+                self._reference_surfaces[key] = surface
+                while len(self._reference_surfaces) > self.reference_cache_size:
+                    self._reference_surfaces.popitem(last=False)
+        # only the prediction's surface is computed
+        return pymia_metric.Distances(_get_label_array(prediction_array, label), None, spacing,
+                                      reference_surface=surface)
+
+
+class RegressionEvaluator(Evaluator):
+
+    def __init__(self, metrics: typing.List[pymia_metric.NumpyArrayMetric], label: str = 'ALL',
+                 chunk_size: int = 2 ** 20):
+        """Represents a regression evaluator, evaluating continuous metrics (e.g., of image reconstructions or
+        regressions) on predictions against references.
+
+        The metrics based on the residual (:class:`.MeanAbsoluteError`, :class:`.MeanSquaredError`,
+        :class:`.RootMeanSquaredError`, :class:`.NormalizedRootMeanSquaredError`, :class:`.CoefficientOfDetermination`,
+        and :class:`.PeakSignalToNoiseRatio`) are derived from the :class:`.ResidualStatistics` computed in one pass.
+        The :class:`.StructuralSimilarityIndexMeasure` is averaged over the mask, if provided.
+
+        Args:
+            metrics (list of pymia_metric.NumpyArrayMetric): A list of metrics.
+            label (str): The label of the results, i.e. the description of the evaluated region.
+            chunk_size (int): The number of voxels per chunk (see :class:`.ResidualStatistics`).
+
+        Raises:
+            ValueError: If a metric is a :class:`.ConfusionMatrixMetric` or :class:`.DistanceMetric`.
+        """
+        for metric in metrics:
+            if isinstance(metric, (pymia_metric.ConfusionMatrixMetric, pymia_metric.DistanceMetric)):
+                raise ValueError('Metric {} is not supported by the RegressionEvaluator'.format(metric))
+        super().__init__(metrics)
+        self.label = label
+        self.chunk_size = chunk_size
+
+    def evaluate(self,
+                 prediction: typing.Union[sitk.Image, np.ndarray],
+                 reference: typing.Union[sitk.Image, np.ndarray],
+                 id_: str, mask: typing.Union[sitk.Image, np.ndarray] = None, **kwargs):
+        """Evaluates the metrics on the provided prediction and reference image.
+
+        Args:
+            prediction (typing.Union[sitk.Image, np.ndarray]): The predicted image.
+            reference (typing.Union[sitk.Image, np.ndarray]): The reference image.
+            id_ (str): The identification of the case to evaluate.
+            mask (typing.Union[sitk.Image, np.ndarray]): The mask (region of interest) of the voxels considered by the
+                metrics based on the residual and the structural similarity. If :code:`None`, all voxels are
+                considered.
+        """
+        prediction_array = sitk.GetArrayFromImage(prediction) if isinstance(prediction, sitk.Image) else prediction
+        reference_array = sitk.GetArrayFromImage(reference) if isinstance(reference, sitk.Image) else reference
+        mask_array = sitk.GetArrayFromImage(mask) if isinstance(mask, sitk.Image) else mask
+
+        def get_spacing(intermediates):
+            if isinstance(prediction, sitk.Image):
+                return prediction.GetSpacing()[::-1]
+            else:
+                return (1.0,) * reference_array.ndim  # use isotropic spacing of 1 mm
+
+        def get_images(intermediates):
+            return prediction_array, reference_array
+
+        def get_residual_statistics(intermediates):
+            return pymia_metric.ResidualStatistics(prediction_array, reference_array, mask_array, self.chunk_size)
+
+        intermediates = pymia_metric.Intermediates({
+            'images': get_images,
+            'cropped_images': get_images,
+            'spacing': get_spacing,
+            'residual_statistics': get_residual_statistics,
+            'mask': lambda i: mask_array
+        })
+
+        for metric in self.metrics:
+            if isinstance(metric, pymia_metric.NumpyArrayMetric):
+                metric.prediction, metric.reference = intermediates['images']
+            if isinstance(metric, pymia_metric.SpacingMetric):
+                metric.spacing = intermediates['spacing']
+
+            metric.intermediates = intermediates
+            try:
+                self.results.append(Result(id_, self.label, metric.metric, metric.calculate()))
+            finally:
+                metric.intermediates = None
+
+
+class AccumulatingEvaluator(Evaluator):
+
+    def __init__(self, metrics: typing.List[pymia_metric.ConfusionMatrixMetric], labels: dict,
+                 datasource: extr.PymiaDatasource = None, sample_indices: typing.Iterable[int] = None):
+        """Represents an evaluator accumulating the confusion matrices of parts of the images (e.g., patches or
+        chunks), without holding the entire images in memory.
+
+        The parts are added by :meth:`add_batch` (samples of a datasource, like :meth:`.Assembler.add_batch`),
+        :meth:`evaluate_chunked` (e.g., images stored in HDF5 files), or :meth:`accumulate` and :meth:`finish`. Each
+        voxel must be added exactly once, i.e. the parts must not overlap (e.g., no :class:`.PatchWiseIndexing` with
+        a stride) nor contain padding.
+
+        Args:
+            metrics (list of pymia_metric.ConfusionMatrixMetric): A list of metrics based on the confusion matrix.
+            labels (dict): A dictionary with labels (key of type int) and label descriptions (value of type string).
+            datasource (.PymiaDatasource): The datasource of the samples added by :meth:`add_batch`.
+            sample_indices (iterable): The sample indices that will be added, if only a subset of the samples is
+                added (see :class:`.SampleCounter`). Otherwise, subjects with missing samples are only completed by the
+                last batch.
+
+        Raises:
+            ValueError: If a metric is not a :class:`.ConfusionMatrixMetric`.
+
+        Examples:
+            >>> evaluator = AccumulatingEvaluator([DiceCoefficient()], {1: 'WHITEMATTER'}, datasource)
+            >>> for batch in loader:
+            >>>     predictions = model(batch[defs.KEY_IMAGES])
+            >>>     evaluator.add_batch(predictions, batch[defs.KEY_LABELS], batch[defs.KEY_SAMPLE_INDEX])
+        """
+        for metric in metrics:
+            if not isinstance(metric, pymia_metric.ConfusionMatrixMetric):
+                raise ValueError('Metric {} is not a ConfusionMatrixMetric'.format(metric))
+        super().__init__(metrics)
+        self.labels = labels
+        self.datasource = datasource
+        self.sample_counter = assm.SampleCounter(datasource, sample_indices) if datasource is not None else None
+        self.counts = collections.OrderedDict()
+        """dict: The accumulated counts (tp, tn, fp, fn) of each label (array of shape (labels, 4)) of the open
+        cases."""
+        self._subjects = None
+
+    def accumulate(self, prediction: np.ndarray, reference: np.ndarray, id_: str):
+        """Accumulates the confusion matrices of a part of a case.
+
+        Args:
+            prediction (np.ndarray): The prediction of the part.
+            reference (np.ndarray): The reference of the part. The shapes of the prediction and reference may only
+                differ by trailing dimensions of size one (e.g., a channel dimension).
+            id_ (str): The identification of the case.
+
+        Raises:
+            ValueError: If the shapes of the prediction and reference differ.
+        """
+        prediction = np.asarray(prediction)
+        reference = np.asarray(reference)
+        if _squeeze_shape(prediction.shape) != _squeeze_shape(reference.shape):
+            raise ValueError('Shapes of prediction {} and reference {} differ'.format(prediction.shape,
+                                                                                     reference.shape))
+        prediction = prediction.reshape(reference.shape)
+
+        try:
+            table = pymia_metric.ContingencyTable(prediction, reference)
+            confusion_matrices = [table.get_confusion_matrix(label) for label in self.labels]
+        except ValueError:
+            confusion_matrices = [pymia_metric.ConfusionMatrix(_get_label_array(prediction, label),
+                                                               _get_label_array(reference, label))
+                                  for label in self.labels]
+        counts = np.array([[cm.tp, cm.tn, cm.fp, cm.fn] for cm in confusion_matrices], dtype=np.int64)
+
+        if id_ in self.counts:
+            self.counts[id_] += counts
+        else:
+            self.counts[id_] = counts
+
+    def finish(self, id_: str) -> typing.List[Result]:
+        """Evaluates the metrics on the accumulated confusion matrices of a case.
+
+        Args:
+            id_ (str): The identification of the case.
+
+        Returns:
+            list: The results of the case, which are also added to :attr:`results`.
+        """
+        counts = self.counts.pop(id_)
+        results = []
+        for (label, label_str), label_counts in zip(self.labels.items(), counts):
+            confusion_matrix = pymia_metric.ConfusionMatrix.from_counts(*label_counts)
+            for metric in self.metrics:
+                metric.confusion_matrix = confusion_matrix
+                results.append(Result(id_, label_str, metric.metric, metric.calculate()))
+        self.results.extend(results)
+        return results
+
+    def evaluate(self,
+                 prediction: typing.Union[sitk.Image, np.ndarray],
+                 reference: typing.Union[sitk.Image, np.ndarray],
+                 id_: str, **kwargs):
+        """see :meth:`Evaluator.evaluate`"""
+        prediction_array = sitk.GetArrayFromImage(prediction) if isinstance(prediction, sitk.Image) else prediction
+        reference_array = sitk.GetArrayFromImage(reference) if isinstance(reference, sitk.Image) else reference
+        self.accumulate(prediction_array, reference_array, id_)
+        self.finish(id_)
+
+    def evaluate_chunked(self, prediction, reference, id_: str, chunk_size: int = None) -> typing.List[Result]:
+        """Evaluates a case chunk by chunk along the first axis, e.g., images stored in HDF5 datasets or memory-mapped
+        files that do not fit into memory.
+
+        Args:
+            prediction: The prediction, an array-like supporting slicing (e.g., np.memmap or h5py.Dataset).
+            reference: The reference, an array-like supporting slicing. The shapes of the prediction and reference may
+                only differ by trailing dimensions of size one (e.g., a channel dimension).
+            id_ (str): The identification of the case.
+            chunk_size (int): The number of elements along the first axis per chunk. If :code:`None`, the chunk size
+                of the reference HDF5 dataset or 16.
+
+        Returns:
+            list: The results of the case, which are also added to :attr:`results`.
+
+        Examples:
+            >>> with h5py.File('predictions.h5', 'r') as predictions, h5py.File('dataset.h5', 'r') as dataset:
+            >>>     evaluator.evaluate_chunked(predictions['predictions/0/prediction'], dataset['data/labels/0'],
+            >>>                                'Subject_1')
+        """
+        if _squeeze_shape(prediction.shape) != _squeeze_shape(reference.shape):
+            raise ValueError('Shapes of prediction {} and reference {} differ'.format(prediction.shape,
+                                                                                     reference.shape))
+        if chunk_size is None:
+            chunks = getattr(reference, 'chunks', None)
+            chunk_size = chunks[0] if chunks else 16
+
+        for start in range(0, reference.shape[0], chunk_size):
+            reference_chunk = np.asarray(reference[start:start + chunk_size])
+            prediction_chunk = np.asarray(prediction[start:start + chunk_size])
+            self.accumulate(prediction_chunk, reference_chunk, id_)
+        if id_ not in self.counts:
+            self.accumulate(np.empty(0), np.empty(0), id_)  # empty images
+        return self.finish(id_)
+
+    def add_batch(self, prediction: np.ndarray, reference: np.ndarray, sample_indices: np.ndarray,
+                  last_batch=False) -> typing.List[Result]:
+        """Accumulates a batch of samples of the datasource and evaluates the subjects completed by the batch.
+
+        Args:
+            prediction (np.ndarray): The predictions of shape (B, ...) (see :meth:`.Assembler.add_batch`).
+            reference (np.ndarray): The references of shape (B, ...), e.g., :code:`batch[defs.KEY_LABELS]`. The shapes
+                may only differ by trailing dimensions of size one (see :meth:`accumulate`).
+            sample_indices (np.ndarray): The indices of the samples in the datasource.
+            last_batch (bool): Whether this is the last batch, which completes all subjects.
+
+        Returns:
+            list: The results of the completed subjects (identified by their name), which are also added to
+            :attr:`results`.
+
+        Raises:
+            ValueError: If no datasource is defined.
+        """
+        if self.datasource is None:
+            raise ValueError('add_batch requires a datasource')
+        if self._subjects is None:
+            self._subjects = self.datasource.get_subjects()
+
+        sample_indices = np.asarray(sample_indices, dtype=np.intp).reshape(-1)
+        subject_indices = self.datasource.indices.subject_indices[sample_indices]
+        for subject_index in np.unique(subject_indices).tolist():
+            batch_indices = np.flatnonzero(subject_indices == subject_index)
+            self.accumulate(prediction[batch_indices], reference[batch_indices], self._subjects[subject_index])
+
+        completed = sorted(self.sample_counter.add(subject_indices))
+        for subject_index in completed:
+            self.sample_counter.reset(subject_index)
+        completed = [self._subjects[subject_index] for subject_index in completed]
+        if last_batch:
+            # to complete the subjects with missing samples
+            completed += [id_ for id_ in self.counts if id_ not in completed]
+            self.sample_counter = assm.SampleCounter(self.datasource, self.sample_counter.sample_indices)
+
+        results = []
+        for id_ in completed:
+            results.extend(self.finish(id_))
+        return results
+
+    def clear(self):
+        """Clears the results and the accumulated confusion matrices."""
+        super().clear()
+        self.counts.clear()
+        if self.sample_counter is not None:
+            self.sample_counter = assm.SampleCounter(self.datasource, self.sample_counter.sample_indices)
+
+
+def _squeeze_shape(shape) -> tuple:
+    # the shape without trailing dimensions of size one
+    shape = tuple(shape)
+    while len(shape) > 1 and shape[-1] == 1:
+        shape = shape[:-1]
+    return shape
+
+
+def _get_label_array(array: np.ndarray, label: typing.Union[tuple, int]) -> np.ndarray:
+    # the binary image of a label or of merged labels
+    return np.in1d(array.ravel(), label, True).reshape(array.shape).astype(np.uint8)
+
 
-                self.results.append(Result(id_, label_str, metric.metric, metric.calculate()))
+def _evaluate(evaluator: Evaluator, prediction, reference, id_: str, kwargs: dict) -> list:
+    # runs on a worker (see Evaluator.submit)
+    evaluator.evaluate(prediction, reference, id_, **kwargs)
+    return evaluator.results
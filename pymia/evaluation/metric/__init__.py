@@ -1,5 +1,6 @@
-from .base import (ConfusionMatrix, Distances, Metric, ConfusionMatrixMetric, DistanceMetric,
-                   NumpyArrayMetric, SpacingMetric, Information, NotComputableMetricWarning)
+from .base import (ConfusionMatrix, ContingencyTable, Distances, Surface, Metric, ConfusionMatrixMetric,
+                   DistanceMetric, NumpyArrayMetric, SpacingMetric, Information, NotComputableMetricWarning,
+                   Intermediates, ResidualStatistics, get_bounding_box)
 from .metric import (get_segmentation_metrics, get_regression_metrics, get_overlap_metrics,
                      get_distance_metrics, get_classical_metrics)
 from .categorical import (Accuracy, AdjustedRandIndex, AreaUnderCurve, AverageDistance, CohenKappaCoefficient,
@@ -1,8 +1,12 @@
 """The base module provides metric base classes."""
 import abc
+import functools
+import itertools
+import typing
 
 import numpy as np
 import scipy.ndimage as ndimage
+import scipy.spatial as spatial
 
 
 class NotComputableMetricWarning(RuntimeWarning):
@@ -30,16 +34,477 @@ class ConfusionMatrix:
 
         self.n = prediction.size
 
+    @classmethod
+    def from_counts(cls, tp, tn, fp, fn):
+        """Creates a confusion matrix from the counts, e.g., derived from a :class:`ContingencyTable`.
+
+        Args:
+            tp (int): The number of true positives.
+            tn (int): The number of true negatives.
+            fp (int): The number of false positives.
+            fn (int): The number of false negatives.
+
+        Returns:
+            ConfusionMatrix: The confusion matrix.
+        """
+        confusion_matrix = cls.__new__(cls)
+        confusion_matrix.tp = tp
+        confusion_matrix.tn = tn
+        confusion_matrix.fp = fp
+        confusion_matrix.fn = fn
+        confusion_matrix.n = tp + tn + fp + fn
+        return confusion_matrix
+
+
+class ContingencyTable:
+
+    max_labels = 2048
+    """int: The maximum range of label values (i.e., the maximum minus the minimum label plus one) supported."""
+
+    def __init__(self, prediction: np.ndarray, reference: np.ndarray):
+        """Represents the contingency table of a multi-label prediction and reference, i.e., the number of voxels of
+        every pair of predicted and reference label.
+
+        The table is computed in one pass over the images, from which the confusion matrices of all labels (and merged
+        labels) are derived (see :meth:`get_confusion_matrix`), instead of comparing binary images per label.
+
+        Args:
+            prediction (np.ndarray): The prediction label array (integer or boolean).
+            reference (np.ndarray): The reference label array (integer or boolean) of the same shape.
+
+        Raises:
+            ValueError: If the arrays are not integer or boolean arrays of equal shape, or the range of the label values
+                exceeds :attr:`max_labels`.
+        """
+        prediction = np.asarray(prediction)
+        reference = np.asarray(reference)
+        if prediction.shape != reference.shape:
+            raise ValueError('Shapes of prediction {} and reference {} differ'.format(prediction.shape,
+                                                                                     reference.shape))
+        for arr in (prediction, reference):
+            if not (np.issubdtype(arr.dtype, np.integer) or arr.dtype == np.bool_):
+                raise ValueError('Contingency table requires integer or boolean arrays, got {}'.format(arr.dtype))
+
+        self.n = prediction.size
+        self.offset = 0
+        self.nb_labels = 1
+        if self.n > 0:
+            self.offset = int(min(prediction.min(), reference.min()))
+            self.nb_labels = int(max(prediction.max(), reference.max())) - self.offset + 1
+        if self.nb_labels > self.max_labels:
+            raise ValueError('Contingency table supports at most {} labels, got a range of {}'
+                             .format(self.max_labels, self.nb_labels))
+
+        # encode each voxel as (predicted label, reference label) pair
+        codes = prediction.astype(np.intp).ravel()
+        codes *= self.nb_labels
+        np.add(codes, reference.ravel(), out=codes, casting='unsafe')
+        if self.offset != 0:
+            codes -= self.offset * (self.nb_labels + 1)
+        self.table = np.bincount(codes, minlength=self.nb_labels ** 2).reshape(self.nb_labels, self.nb_labels)
+        """np.ndarray: The number of voxels with predicted label (first axis) and reference label (second axis)."""
+
+    def get_confusion_matrix(self, label) -> ConfusionMatrix:
+        """Gets the confusion matrix of a label, equivalent to the :class:`ConfusionMatrix` of the binary images of
+        the label.
+
+        Args:
+            label (Union[int, tuple]): The label or a tuple of labels that are merged.
+
+        Returns:
+            ConfusionMatrix: The confusion matrix of the label.
+        """
+        labels = np.asarray(label if isinstance(label, (tuple, list)) else (label, ), dtype=np.int64) - self.offset
+        labels = np.unique(labels[(labels >= 0) & (labels < self.nb_labels)])
+
+        tp = self.table[np.ix_(labels, labels)].sum()
+        fp = self.table[labels].sum() - tp
+        fn = self.table[:, labels].sum() - tp
+        tn = np.int64(self.n) - tp - fp - fn
+        return ConfusionMatrix.from_counts(tp, tn, fp, fn)
+
+
+# the surface normals of each neighbour code (2x2x2 local binary pattern), see Distances
+_neighbour_code_to_normals = [
+    [[0, 0, 0]],
+    [[0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
+    [[0.125, -0.125, 0.125]],
+    [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
+    [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
+    [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125]],
+    [[-0.5, 0.0, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[0.5, 0.0, 0.0], [0.5, 0.0, 0.0]],
+    [[0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.5, 0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, 0.0, -0.5], [0.25, 0.25, 0.25], [-0.125, -0.125, -0.125]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.125, -0.125, -0.125]],
+    [[0.125, 0.125, 0.125], [0.375, 0.375, 0.375], [0.0, -0.25, 0.25], [-0.25, 0.0, 0.25]],
+    [[0.125, -0.125, -0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.375, 0.375, 0.375], [0.0, 0.25, -0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
+    [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.125, 0.125, 0.125]],
+    [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25]],
+    [[0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
+    [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25]],
+    [[0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
+    [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[-0.375, -0.375, 0.375], [-0.0, 0.25, 0.25], [0.125, 0.125, -0.125], [-0.25, -0.0, -0.25]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.25, 0.25, -0.25], [0.25, 0.25, -0.25], [0.125, 0.125, -0.125], [-0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125], [0.125, -0.125, 0.125]],
+    [[0.0, 0.25, -0.25], [0.375, -0.375, -0.375], [-0.125, 0.125, 0.125], [0.25, 0.25, 0.0]],
+    [[-0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
+    [[0.0, 0.5, 0.0], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[0.0, 0.5, 0.0], [0.125, -0.125, 0.125], [-0.25, 0.25, -0.25]],
+    [[0.0, 0.5, 0.0], [0.0, -0.5, 0.0]],
+    [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.125, -0.125, 0.125]],
+    [[-0.375, -0.375, -0.375], [-0.25, 0.0, 0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
+    [[0.125, 0.125, 0.125], [0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
+    [[0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
+    [[-0.125, 0.125, 0.125], [0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
+    [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.375, 0.375, -0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
+    [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
+    [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
+    [[-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25]],
+    [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.375, -0.375, 0.375], [0.0, -0.25, -0.25], [-0.125, 0.125, -0.125], [0.25, 0.25, 0.0]],
+    [[-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
+    [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[-0.25, 0.25, -0.25], [-0.25, 0.25, -0.25], [-0.125, 0.125, -0.125], [-0.125, 0.125, -0.125]],
+    [[-0.25, 0.0, -0.25], [0.375, -0.375, -0.375], [0.0, 0.25, -0.25], [-0.125, 0.125, 0.125]],
+    [[0.5, 0.0, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
+    [[-0.0, 0.0, 0.5], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
+    [[-0.25, -0.0, -0.25], [-0.375, 0.375, 0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, 0.125]],
+    [[0.0, 0.0, -0.5], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [0.0, 0.0, 0.5]],
+    [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25], [-0.125, 0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
+    [[0.125, -0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[0.25, 0.0, 0.25], [-0.375, -0.375, 0.375], [-0.25, 0.25, 0.0], [-0.125, -0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
+    [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
+    [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.5, 0.0, -0.0], [0.25, -0.25, -0.25], [0.125, -0.125, -0.125]],
+    [[-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[0.375, -0.375, 0.375], [0.0, 0.25, 0.25], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
+    [[0.0, -0.5, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[-0.375, -0.375, 0.375], [0.25, -0.25, 0.0], [0.0, 0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[0.125, 0.125, 0.125], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
+    [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
+    [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
+    [[0.125, 0.125, 0.125], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
+    [[-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[-0.375, -0.375, 0.375], [0.25, -0.25, 0.0], [0.0, 0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.0, -0.5, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[0.375, -0.375, 0.375], [0.0, 0.25, 0.25], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
+    [[-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[0.5, 0.0, -0.0], [0.25, -0.25, -0.25], [0.125, -0.125, -0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
+    [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[0.125, 0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.25, 0.0, 0.25], [-0.375, -0.375, 0.375], [-0.25, 0.25, 0.0], [-0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
+    [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25], [-0.125, 0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
+    [[-0.0, 0.0, 0.5], [0.0, 0.0, 0.5]],
+    [[0.0, 0.0, -0.5], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[-0.25, -0.0, -0.25], [-0.375, 0.375, 0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
+    [[-0.0, 0.0, 0.5], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
+    [[0.5, 0.0, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[-0.25, 0.0, -0.25], [0.375, -0.375, -0.375], [0.0, 0.25, -0.25], [-0.125, 0.125, 0.125]],
+    [[-0.25, 0.25, -0.25], [-0.25, 0.25, -0.25], [-0.125, 0.125, -0.125], [-0.125, 0.125, -0.125]],
+    [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[0.375, -0.375, 0.375], [0.0, -0.25, -0.25], [-0.125, 0.125, -0.125], [0.25, 0.25, 0.0]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
+    [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25]],
+    [[-0.125, -0.125, 0.125], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
+    [[-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
+    [[0.125, 0.125, 0.125], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
+    [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
+    [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
+    [[-0.375, 0.375, -0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
+    [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
+    [[0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
+    [[0.125, 0.125, 0.125], [0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
+    [[-0.375, -0.375, -0.375], [-0.25, 0.0, 0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
+    [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.125, -0.125, 0.125]],
+    [[0.0, 0.5, 0.0], [0.0, -0.5, 0.0]],
+    [[0.0, 0.5, 0.0], [0.125, -0.125, 0.125], [-0.25, 0.25, -0.25]],
+    [[0.0, 0.5, 0.0], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
+    [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
+    [[-0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.0, 0.25, -0.25], [0.375, -0.375, -0.375], [-0.125, 0.125, 0.125], [0.25, 0.25, 0.0]],
+    [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125], [0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.25, 0.25, -0.25], [0.25, 0.25, -0.25], [0.125, 0.125, -0.125], [-0.125, -0.125, 0.125]],
+    [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[-0.375, -0.375, 0.375], [-0.0, 0.25, 0.25], [0.125, 0.125, -0.125], [-0.25, -0.0, -0.25]],
+    [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25], [0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
+    [[0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25]],
+    [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
+    [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
+    [[0.125, -0.125, 0.125]],
+    [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25]],
+    [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.125, 0.125, 0.125]],
+    [[0.375, 0.375, 0.375], [0.0, 0.25, -0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
+    [[0.125, -0.125, -0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.125, 0.125, 0.125], [0.375, 0.375, 0.375], [0.0, -0.25, 0.25], [-0.25, 0.0, 0.25]],
+    [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, 0.0, -0.5], [0.25, 0.25, 0.25], [-0.125, -0.125, -0.125]],
+    [[0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.5, 0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
+    [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25]],
+    [[0.125, -0.125, -0.125]],
+    [[0.5, 0.0, 0.0], [0.5, 0.0, 0.0]],
+    [[-0.5, 0.0, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
+    [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125]],
+    [[0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
+    [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
+    [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
+    [[0.125, 0.125, 0.125], [-0.125, 0.125, 0.125]],
+    [[-0.125, 0.125, 0.125]],
+    [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
+    [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
+    [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
+    [[0.125, -0.125, 0.125]],
+    [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
+    [[-0.125, -0.125, 0.125]],
+    [[0.125, 0.125, 0.125]],
+    [[0, 0, 0]]]
+
+
+def get_bounding_box(*masks: np.ndarray) -> typing.Optional[tuple]:
+    """Gets the joint bounding box of the non-zero elements of one or more arrays.
+
+    Args:
+        *masks (np.ndarray): The arrays of the same shape.
+
+    Returns:
+        tuple: The bounding box as tuple of slices, or :code:`None` if all elements are zero.
+    """
+    bbox = []
+    for axis in range(masks[0].ndim):
+        other_axes = tuple(a for a in range(masks[0].ndim) if a != axis)
+        projection = np.any(masks[0], axis=other_axes)
+        for mask in masks[1:]:
+            projection |= np.any(mask, axis=other_axes)
+        indices = np.flatnonzero(projection)
+        if len(indices) == 0:
+            return None
+        bbox.append(slice(indices[0], indices[-1] + 1))
+    return tuple(bbox)
+
+
+class Surface:
+
+    def __init__(self, mask: np.ndarray, spacing: tuple):
+        """Represents the surface of a binary mask, i.e., the surface elements (surfels) at the voxel corners and their
+        areas (see :class:`Distances`).
+
+        The surface can be reused to compute the distances to multiple masks, e.g., the surface of a reference that is
+        evaluated against the predictions of every epoch (see :class:`.SegmentationEvaluator`).
+
+        Args:
+            mask (np.ndarray): The binary array (2-D or 3-D).
+            spacing (tuple): The spacing in mm of each dimension.
+        """
+        spacing = tuple(float(s) for s in spacing)
+        if mask.ndim == 2 and len(spacing) == 2:
+            # the implementation works only for 3-D images, therefore, convert 2-D images to 3-D
+            # with 3rd dimension being of value 1
+            mask = np.expand_dims(mask, -1)
+            spacing = spacing + (1., )
+        self.shape = mask.shape
+        self.spacing = spacing
+        self._tree = None
+
+        # crop the mask to the smallest possible processing subvolume
+        bbox = get_bounding_box(mask)
+        if bbox is None:
+            self.points = np.empty((0, mask.ndim), np.intp)
+            """np.ndarray: The corner indices of the surfels (N, 3), shifted by minus half a voxel."""
+            self.areas = np.empty(0)
+            """np.ndarray: The areas of the surfels (N, )."""
+            return
+
+        # compute the neighbour code (local binary pattern) for each voxel
+        # the points are located at the corners of the original voxels
+        neighbour_code_map = _get_neighbour_code_map(mask[bbox])
+        borders = (neighbour_code_map != 0) & (neighbour_code_map != 255)
+
+        self.points = np.argwhere(borders) + np.array([b.start for b in bbox])
+        self.areas = _get_neighbour_code_to_surface_area(spacing)[neighbour_code_map[borders]]
+
+    @property
+    def tree(self) -> spatial.cKDTree:
+        """scipy.spatial.cKDTree: The search tree of the (physical) surfel positions, built on first use."""
+        if self._tree is None:
+            self._tree = spatial.cKDTree(self.points * np.asarray(self.spacing), balanced_tree=False,
+                                         compact_nodes=False)
+        return self._tree
+
+    @property
+    def nbytes(self) -> int:
+        """int: The approximate memory (in bytes) of the surface, including its search tree."""
+        nbytes = self.points.nbytes + self.areas.nbytes
+        if self._tree is not None:
+            nbytes += self.points.size * 8 + self.points.shape[0] * np.dtype(np.intp).itemsize
+        return nbytes
+
+    def get_distances(self, points: np.ndarray) -> np.ndarray:
+        """Gets the distance of points to the closest surfel.
+
+        Args:
+            points (np.ndarray): The corner indices of the points (N, 3), e.g., :attr:`points` of another surface.
+
+        Returns:
+            np.ndarray: The distances in mm (N, ), :code:`inf` if the surface is empty.
+        """
+        if len(points) == 0:
+            return np.empty(0)
+        if len(self.points) == 0:
+            return np.full(len(points), np.inf)
+
+        spacing = np.asarray(self.spacing, dtype=np.float64)
+        if self._tree is None:
+            origin = np.minimum(self.points.min(axis=0), points.min(axis=0))
+            shape = np.maximum(self.points.max(axis=0), points.max(axis=0)) - origin + 1
+            if len(self.points) * 16 > np.prod(shape):
+                # dense surface, the distance transform is faster than the nearest neighbour search
+                borders = np.zeros(shape, bool)
+                borders[tuple((self.points - origin).T)] = True
+                distance_map = ndimage.distance_transform_edt(~borders, sampling=self.spacing)
+                return distance_map[tuple((points - origin).T)]
+
+        # the distance is computed as by the distance transform
+        _, nearest = self.tree.query(points * spacing)
+        delta = (self.points[nearest] - points).astype(np.float64) * spacing
+        return np.sqrt(np.sum(delta * delta, axis=1))
+
 
 class Distances:
 
-    def __init__(self, prediction: np.ndarray, reference: np.ndarray, spacing: tuple):
+    def __init__(self, prediction: np.ndarray, reference: np.ndarray, spacing: tuple,
+                 reference_surface: Surface = None):
         """Represents distances for distance metrics.
 
         Args:
             prediction (np.ndarray): The prediction binary array.
             reference (np.ndarray): The reference binary array.
             spacing (tuple): The spacing in mm of each dimension.
+            reference_surface (Surface): The (cached) surface of the reference. If :code:`None`, it is computed from
+                :obj:`reference`.
 
         See Also:
             - Nikolov, S., Blackwell, S., Mendes, R., De Fauw, J., Meyer, C., Hughes, C., … Ronneberger, O. (2018). Deep learning to achieve clinically applicable segmentation of head and neck anatomy for radiotherapy. http://arxiv.org/abs/1809.04430
@@ -51,394 +516,190 @@ class Distances:
         self.surfel_areas_gt = None
         self.surfel_areas_pred = None
 
-        self._neighbour_code_to_normals = [
-            [[0, 0, 0]],
-            [[0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
-            [[0.125, -0.125, 0.125]],
-            [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
-            [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
-            [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125]],
-            [[-0.5, 0.0, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[0.5, 0.0, 0.0], [0.5, 0.0, 0.0]],
-            [[0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.5, 0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, 0.0, -0.5], [0.25, 0.25, 0.25], [-0.125, -0.125, -0.125]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.125, -0.125, -0.125]],
-            [[0.125, 0.125, 0.125], [0.375, 0.375, 0.375], [0.0, -0.25, 0.25], [-0.25, 0.0, 0.25]],
-            [[0.125, -0.125, -0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.375, 0.375, 0.375], [0.0, 0.25, -0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
-            [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.125, 0.125, 0.125]],
-            [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25]],
-            [[0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
-            [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25]],
-            [[0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
-            [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[-0.375, -0.375, 0.375], [-0.0, 0.25, 0.25], [0.125, 0.125, -0.125], [-0.25, -0.0, -0.25]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.25, 0.25, -0.25], [0.25, 0.25, -0.25], [0.125, 0.125, -0.125], [-0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125], [0.125, -0.125, 0.125]],
-            [[0.0, 0.25, -0.25], [0.375, -0.375, -0.375], [-0.125, 0.125, 0.125], [0.25, 0.25, 0.0]],
-            [[-0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
-            [[0.0, 0.5, 0.0], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[0.0, 0.5, 0.0], [0.125, -0.125, 0.125], [-0.25, 0.25, -0.25]],
-            [[0.0, 0.5, 0.0], [0.0, -0.5, 0.0]],
-            [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.125, -0.125, 0.125]],
-            [[-0.375, -0.375, -0.375], [-0.25, 0.0, 0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
-            [[0.125, 0.125, 0.125], [0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
-            [[0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
-            [[-0.125, 0.125, 0.125], [0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
-            [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.375, 0.375, -0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
-            [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
-            [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
-            [[-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25]],
-            [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.375, -0.375, 0.375], [0.0, -0.25, -0.25], [-0.125, 0.125, -0.125], [0.25, 0.25, 0.0]],
-            [[-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
-            [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[-0.25, 0.25, -0.25], [-0.25, 0.25, -0.25], [-0.125, 0.125, -0.125], [-0.125, 0.125, -0.125]],
-            [[-0.25, 0.0, -0.25], [0.375, -0.375, -0.375], [0.0, 0.25, -0.25], [-0.125, 0.125, 0.125]],
-            [[0.5, 0.0, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
-            [[-0.0, 0.0, 0.5], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
-            [[-0.25, -0.0, -0.25], [-0.375, 0.375, 0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, 0.125]],
-            [[0.0, 0.0, -0.5], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [0.0, 0.0, 0.5]],
-            [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25], [-0.125, 0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
-            [[0.125, -0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[0.25, 0.0, 0.25], [-0.375, -0.375, 0.375], [-0.25, 0.25, 0.0], [-0.125, -0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
-            [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
-            [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.5, 0.0, -0.0], [0.25, -0.25, -0.25], [0.125, -0.125, -0.125]],
-            [[-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[0.375, -0.375, 0.375], [0.0, 0.25, 0.25], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
-            [[0.0, -0.5, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[-0.375, -0.375, 0.375], [0.25, -0.25, 0.0], [0.0, 0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[0.125, 0.125, 0.125], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
-            [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
-            [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
-            [[0.125, 0.125, 0.125], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
-            [[-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[-0.375, -0.375, 0.375], [0.25, -0.25, 0.0], [0.0, 0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.0, -0.5, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[0.375, -0.375, 0.375], [0.0, 0.25, 0.25], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
-            [[-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[0.5, 0.0, -0.0], [0.25, -0.25, -0.25], [0.125, -0.125, -0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25], [0.0, 0.25, 0.25]],
-            [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[0.125, 0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.25, 0.0, 0.25], [-0.375, -0.375, 0.375], [-0.25, 0.25, 0.0], [-0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25], [0.25, 0.0, 0.25]],
-            [[-0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25], [-0.125, 0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[0.125, 0.125, 0.125], [0.125, 0.125, 0.125], [0.25, 0.25, 0.25], [0.0, 0.0, 0.5]],
-            [[-0.0, 0.0, 0.5], [0.0, 0.0, 0.5]],
-            [[0.0, 0.0, -0.5], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[-0.25, -0.0, -0.25], [-0.375, 0.375, 0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
-            [[-0.0, 0.0, 0.5], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [0.25, 0.0, -0.25]],
-            [[0.5, 0.0, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[-0.25, 0.0, -0.25], [0.375, -0.375, -0.375], [0.0, 0.25, -0.25], [-0.125, 0.125, 0.125]],
-            [[-0.25, 0.25, -0.25], [-0.25, 0.25, -0.25], [-0.125, 0.125, -0.125], [-0.125, 0.125, -0.125]],
-            [[-0.0, 0.5, 0.0], [-0.25, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[0.375, -0.375, 0.375], [0.0, -0.25, -0.25], [-0.125, 0.125, -0.125], [0.25, 0.25, 0.0]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.0, 0.0, 0.5], [0.25, -0.25, 0.25], [0.125, -0.125, 0.125]],
-            [[0.0, -0.25, 0.25], [0.0, -0.25, 0.25]],
-            [[-0.125, -0.125, 0.125], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
-            [[-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
-            [[0.125, 0.125, 0.125], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0]],
-            [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
-            [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125]],
-            [[-0.375, 0.375, -0.375], [-0.25, -0.25, 0.0], [-0.125, 0.125, -0.125], [-0.25, 0.0, 0.25]],
-            [[0.0, 0.5, 0.0], [0.25, 0.25, -0.25], [-0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
-            [[0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
-            [[0.125, 0.125, 0.125], [0.0, -0.5, 0.0], [-0.25, -0.25, -0.25], [-0.125, -0.125, -0.125]],
-            [[-0.375, -0.375, -0.375], [-0.25, 0.0, 0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
-            [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0], [0.125, -0.125, 0.125]],
-            [[0.0, 0.5, 0.0], [0.0, -0.5, 0.0]],
-            [[0.0, 0.5, 0.0], [0.125, -0.125, 0.125], [-0.25, 0.25, -0.25]],
-            [[0.0, 0.5, 0.0], [-0.25, 0.25, 0.25], [0.125, -0.125, -0.125]],
-            [[0.25, -0.25, 0.0], [-0.25, 0.25, 0.0]],
-            [[-0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.0, 0.25, -0.25], [0.375, -0.375, -0.375], [-0.125, 0.125, 0.125], [0.25, 0.25, 0.0]],
-            [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125], [0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.25, 0.25, -0.25], [0.25, 0.25, -0.25], [0.125, 0.125, -0.125], [-0.125, -0.125, 0.125]],
-            [[-0.0, 0.0, 0.5], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[-0.375, -0.375, 0.375], [-0.0, 0.25, 0.25], [0.125, 0.125, -0.125], [-0.25, -0.0, -0.25]],
-            [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25], [0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
-            [[0.125, -0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.0, -0.5, 0.0], [0.125, 0.125, -0.125], [0.25, 0.25, -0.25]],
-            [[0.0, -0.25, 0.25], [0.0, 0.25, -0.25]],
-            [[0.125, 0.125, 0.125], [0.125, -0.125, 0.125]],
-            [[0.125, -0.125, 0.125]],
-            [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25]],
-            [[-0.5, 0.0, 0.0], [-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.125, 0.125, 0.125]],
-            [[0.375, 0.375, 0.375], [0.0, 0.25, -0.25], [-0.125, -0.125, -0.125], [-0.25, 0.25, 0.0]],
-            [[0.125, -0.125, -0.125], [0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.125, 0.125, 0.125], [0.375, 0.375, 0.375], [0.0, -0.25, 0.25], [-0.25, 0.0, 0.25]],
-            [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[-0.125, -0.125, -0.125], [-0.25, -0.25, -0.25], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, 0.0, -0.5], [0.25, 0.25, 0.25], [-0.125, -0.125, -0.125]],
-            [[0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.5, 0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[-0.125, -0.125, 0.125], [0.125, -0.125, -0.125]],
-            [[0.0, -0.25, -0.25], [0.0, 0.25, 0.25]],
-            [[0.125, -0.125, -0.125]],
-            [[0.5, 0.0, 0.0], [0.5, 0.0, 0.0]],
-            [[-0.5, 0.0, 0.0], [-0.25, 0.25, 0.25], [-0.125, 0.125, 0.125]],
-            [[0.5, 0.0, 0.0], [0.25, -0.25, 0.25], [-0.125, 0.125, -0.125]],
-            [[0.25, -0.25, 0.0], [0.25, -0.25, 0.0]],
-            [[0.5, 0.0, 0.0], [-0.25, -0.25, 0.25], [-0.125, -0.125, 0.125]],
-            [[-0.25, 0.0, 0.25], [-0.25, 0.0, 0.25]],
-            [[0.125, 0.125, 0.125], [-0.125, 0.125, 0.125]],
-            [[-0.125, 0.125, 0.125]],
-            [[0.5, 0.0, -0.0], [0.25, 0.25, 0.25], [0.125, 0.125, 0.125]],
-            [[0.125, -0.125, 0.125], [-0.125, -0.125, 0.125]],
-            [[-0.25, -0.0, -0.25], [0.25, 0.0, 0.25]],
-            [[0.125, -0.125, 0.125]],
-            [[-0.25, -0.25, 0.0], [0.25, 0.25, -0.0]],
-            [[-0.125, -0.125, 0.125]],
-            [[0.125, 0.125, 0.125]],
-            [[0, 0, 0]]]
-
-        self._calculate(prediction, reference, spacing)
-
-    def _calculate(self, segmentation_arr, ground_truth_arr, spacing):
-        if segmentation_arr.ndim == 2 and ground_truth_arr.ndim == 2 and len(spacing) == 2:
-            # the implementation works only for 3-D images, therefore, convert 2-D images to 3-D
-            # with 3rd dimension being of value 1
-            segmentation_arr = np.expand_dims(segmentation_arr, -1)
-            ground_truth_arr = np.expand_dims(ground_truth_arr, -1)
-            spacing = spacing + (1., )
+        if reference_surface is None:
+            reference_surface = Surface(reference, spacing)
+        self._calculate(Surface(prediction, spacing), reference_surface)
 
-        # calculate distances
-        neighbour_code_to_surface_area = np.zeros([256])
-        for code in range(256):
-            normals = np.array(self._neighbour_code_to_normals[code])
-            sum_area = 0
-            for normal_idx in range(normals.shape[0]):
-                # normal vector
-                n = np.zeros([3])
-                n[0] = normals[normal_idx, 0] * spacing[1] * spacing[2]
-                n[1] = normals[normal_idx, 1] * spacing[0] * spacing[2]
-                n[2] = normals[normal_idx, 2] * spacing[0] * spacing[1]
-                area = np.linalg.norm(n)
-                sum_area += area
-            neighbour_code_to_surface_area[code] = sum_area
-
-        # compute the bounding box of the masks to trim
-        # the volume to the smallest possible processing subvolume
-        mask_all = ground_truth_arr | segmentation_arr
-        bbox_min = np.zeros(3, np.int64)
-        bbox_max = np.zeros(3, np.int64)
-
-        # max projection to the x0-axis
-        proj_0 = np.max(np.max(mask_all, axis=2), axis=1)
-        idx_nonzero_0 = np.nonzero(proj_0)[0]
-        if len(idx_nonzero_0) == 0:  # pylint: disable=g-explicit-length-test
-            return {"distances_gt_to_pred": np.array([]),
-                    "distances_pred_to_gt": np.array([]),
-                    "surfel_areas_gt": np.array([]),
-                    "surfel_areas_pred": np.array([])}
-
-        bbox_min[0] = np.min(idx_nonzero_0)
-        bbox_max[0] = np.max(idx_nonzero_0)
-
-        # max projection to the x1-axis
-        proj_1 = np.max(np.max(mask_all, axis=2), axis=0)
-        idx_nonzero_1 = np.nonzero(proj_1)[0]
-        bbox_min[1] = np.min(idx_nonzero_1)
-        bbox_max[1] = np.max(idx_nonzero_1)
-
-        # max projection to the x2-axis
-        proj_2 = np.max(np.max(mask_all, axis=1), axis=0)
-        idx_nonzero_2 = np.nonzero(proj_2)[0]
-        bbox_min[2] = np.min(idx_nonzero_2)
-        bbox_max[2] = np.max(idx_nonzero_2)
-
-        # crop the processing subvolume.
-        # we need to zeropad the cropped region with 1 voxel at the lower,
-        # the right and the back side. This is required to obtain the "full"
-        # convolution result with the 2x2x2 kernel
-        cropmask_gt = np.zeros((bbox_max - bbox_min) + 2, np.uint8)
-        cropmask_pred = np.zeros((bbox_max - bbox_min) + 2, np.uint8)
-
-        cropmask_gt[0:-1, 0:-1, 0:-1] = ground_truth_arr[bbox_min[0]:bbox_max[0] + 1,
-                                                         bbox_min[1]:bbox_max[1] + 1,
-                                                         bbox_min[2]:bbox_max[2] + 1]
-
-        cropmask_pred[0:-1, 0:-1, 0:-1] = segmentation_arr[bbox_min[0]:bbox_max[0] + 1,
-                                                           bbox_min[1]:bbox_max[1] + 1,
-                                                           bbox_min[2]:bbox_max[2] + 1]
+    def _calculate(self, surface_pred: Surface, surface_gt: Surface):
+        if len(surface_pred.points) == 0 and len(surface_gt.points) == 0:
+            return
 
-        # compute the neighbour code (local binary pattern) for each voxel
-        # the resulting arrays are spacially shifted by minus half a voxel in each
-        # axis.
-        # i.e. the points are located at the corners of the original voxels
-        kernel = np.array([[[128, 64],
-                            [32, 16]],
-                           [[8, 4],
-                            [2, 1]]])
-        neighbour_code_map_gt = ndimage.filters.correlate(
-            cropmask_gt.astype(np.uint8), kernel, mode="constant", cval=0)
-        neighbour_code_map_pred = ndimage.filters.correlate(
-            cropmask_pred.astype(np.uint8), kernel, mode="constant", cval=0)
-
-        # create masks with the surface voxels
-        borders_gt = ((neighbour_code_map_gt != 0) & (neighbour_code_map_gt != 255))
-        borders_pred = ((neighbour_code_map_pred != 0) &
-                        (neighbour_code_map_pred != 255))
-
-        # compute the distance transform (closest distance of each voxel to the
-        # surface voxels)
-        if borders_gt.any():
-            distmap_gt = ndimage.morphology.distance_transform_edt(
-                ~borders_gt, sampling=spacing)
-        else:
-            distmap_gt = np.Inf * np.ones(borders_gt.shape)
-
-        if borders_pred.any():
-            distmap_pred = ndimage.morphology.distance_transform_edt(
-                ~borders_pred, sampling=spacing)
-        else:
-            distmap_pred = np.Inf * np.ones(borders_pred.shape)
-
-        # compute the area of each surface element
-        surface_area_map_gt = neighbour_code_to_surface_area[neighbour_code_map_gt]
-        surface_area_map_pred = neighbour_code_to_surface_area[
-            neighbour_code_map_pred]
-
-        # create a list of all surface elements with distance and area
-        distances_gt_to_pred = distmap_pred[borders_gt]
-        distances_pred_to_gt = distmap_gt[borders_pred]
-        surfel_areas_gt = surface_area_map_gt[borders_gt]
-        surfel_areas_pred = surface_area_map_pred[borders_pred]
-
-        # sort them by distance
-        if distances_gt_to_pred.shape != (0,):
-            sorted_surfels_gt = np.array(
-                sorted(zip(distances_gt_to_pred, surfel_areas_gt)))
-            distances_gt_to_pred = sorted_surfels_gt[:, 0]
-            surfel_areas_gt = sorted_surfels_gt[:, 1]
-
-        if distances_pred_to_gt.shape != (0,):
-            sorted_surfels_pred = np.array(
-                sorted(zip(distances_pred_to_gt, surfel_areas_pred)))
-            distances_pred_to_gt = sorted_surfels_pred[:, 0]
-            surfel_areas_pred = sorted_surfels_pred[:, 1]
-
-        self.distances_gt_to_pred = distances_gt_to_pred
-        self.distances_pred_to_gt = distances_pred_to_gt
-        self.surfel_areas_gt = surfel_areas_gt
-        self.surfel_areas_pred = surfel_areas_pred
+        # the distances of the surfels to the closest surfel of the other surface
+        distances_gt_to_pred = surface_pred.get_distances(surface_gt.points)
+        distances_pred_to_gt = surface_gt.get_distances(surface_pred.points)
+
+        # sort the surface elements by distance (and area)
+        order_gt = np.lexsort((surface_gt.areas, distances_gt_to_pred))
+        order_pred = np.lexsort((surface_pred.areas, distances_pred_to_gt))
+
+        self.distances_gt_to_pred = distances_gt_to_pred[order_gt]
+        self.distances_pred_to_gt = distances_pred_to_gt[order_pred]
+        self.surfel_areas_gt = surface_gt.areas[order_gt]
+        self.surfel_areas_pred = surface_pred.areas[order_pred]
+
+
+def _get_neighbour_code_map(mask: np.ndarray) -> np.ndarray:
+    # equivalent to the correlation with the 2x2x2 kernel [[[128, 64], [32, 16]], [[8, 4], [2, 1]]] of the mask
+    # zero-padded by one voxel on each side (the "full" correlation), i.e. the map is shifted by minus half a voxel
+    shape = tuple(s + 1 for s in mask.shape)
+    padded = np.zeros(tuple(s + 2 for s in mask.shape), np.uint8)
+    padded[1:-1, 1:-1, 1:-1] = mask != 0
+
+    code_map = np.zeros(shape, np.uint8)
+    for bit, (i, j, k) in enumerate(itertools.product((1, 0), repeat=3)):
+        code_map |= padded[i:i + shape[0], j:j + shape[1], k:k + shape[2]] << bit
+    return code_map
+
+
+@functools.lru_cache(maxsize=32)
+def _get_neighbour_code_to_surface_area(spacing: tuple) -> np.ndarray:
+    # the surface area of each neighbour code, cached per spacing
+    normals = np.zeros((256, max(len(n) for n in _neighbour_code_to_normals), 3))
+    for code, code_normals in enumerate(_neighbour_code_to_normals):
+        normals[code, :len(code_normals)] = code_normals
+    scale = np.array([spacing[1] * spacing[2], spacing[0] * spacing[2], spacing[0] * spacing[1]])
+    areas = np.linalg.norm(normals * scale, axis=-1).sum(axis=-1)
+    areas.flags.writeable = False
+    return areas
+
+
+class ResidualStatistics:
+
+    def __init__(self, prediction: np.ndarray, reference: np.ndarray, mask: np.ndarray = None,
+                 chunk_size: int = 2 ** 20):
+        """Represents the statistics of the residual (reference minus prediction) and the reference, from which the
+        continuous metrics are derived (e.g., :class:`.MeanSquaredError`).
+
+        The statistics are computed in one pass over chunks of the flattened images. The residual is computed in
+        float32, and the sums are accumulated in float64.
+
+        Args:
+            prediction (np.ndarray): The prediction.
+            reference (np.ndarray): The reference of the same shape.
+            mask (np.ndarray): The mask (boolean array of the same shape) of the voxels to consider. If :code:`None`,
+                all voxels are considered.
+            chunk_size (int): The number of voxels per chunk.
+
+        Raises:
+            ValueError: If the shapes of the prediction, reference, and mask differ.
+        """
+        if prediction.shape != reference.shape or (mask is not None and mask.shape != reference.shape):
+            raise ValueError('Shapes of prediction {}, reference {}, and mask {} differ'.format(
+                prediction.shape, reference.shape, None if mask is None else mask.shape))
+
+        self.n = 0
+        """int: The number of voxels."""
+        self.sum_absolute = 0.0
+        """float: The sum of the absolute residuals."""
+        self.sum_squared = 0.0
+        """float: The sum of the squared residuals."""
+        self.reference_mean = 0.0
+        """float: The mean of the reference."""
+        self.reference_m2 = 0.0
+        """float: The sum of the squared deviations of the reference from its mean."""
+        self.reference_min = np.inf
+        """float: The minimum of the reference."""
+        self.reference_max = -np.inf
+        """float: The maximum of the reference."""
+
+        prediction = prediction.reshape(-1)
+        reference = reference.reshape(-1)
+        if mask is not None:
+            mask = mask.reshape(-1)
+        for start in range(0, reference.size, chunk_size):
+            reference_chunk = reference[start:start + chunk_size].astype(np.float32)
+            prediction_chunk = prediction[start:start + chunk_size].astype(np.float32)
+            if mask is not None:
+                mask_chunk = mask[start:start + chunk_size] != 0
+                reference_chunk = reference_chunk[mask_chunk]
+                prediction_chunk = prediction_chunk[mask_chunk]
+            self._add(prediction_chunk, reference_chunk)
+
+    def _add(self, prediction: np.ndarray, reference: np.ndarray):
+        n = reference.size
+        if n == 0:
+            return
+        residual = reference - prediction
+        self.sum_absolute += float(np.sum(np.abs(residual), dtype=np.float64))
+        self.sum_squared += float(np.sum(np.square(residual), dtype=np.float64))
+        self.reference_min = min(self.reference_min, float(reference.min()))
+        self.reference_max = max(self.reference_max, float(reference.max()))
+
+        # merge the mean and squared deviations of the chunk (Chan et al.)
+        mean = float(np.mean(reference, dtype=np.float64))
+        m2 = float(np.sum(np.square(reference - np.float32(mean)), dtype=np.float64))
+        delta = mean - self.reference_mean
+        total = self.n + n
+        self.reference_mean += delta * n / total
+        self.reference_m2 += m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    @property
+    def mae(self) -> float:
+        """float: The mean absolute error (NaN if no voxels)."""
+        return self.sum_absolute / self.n if self.n > 0 else float('nan')
+
+    @property
+    def mse(self) -> float:
+        """float: The mean squared error (NaN if no voxels)."""
+        return self.sum_squared / self.n if self.n > 0 else float('nan')
+
+
+class Intermediates:
+
+    def __init__(self, providers: dict):
+        """Represents the intermediates of the metrics of a label, e.g., the binary images, the confusion matrix, or
+        the distances, which are computed at most once and only if a metric requires them.
+
+        An intermediate is computed by its provider, a function receiving the intermediates to get the intermediates
+        it depends on. In addition to the :obj:`providers`, the following intermediates are derived from the
+        intermediate :code:`'cropped_images'` (the tuple of the binary prediction and reference, possibly cropped to
+        their bounding box):
+
+        - :code:`'prediction_count'` and :code:`'reference_count'`: the number of foreground voxels
+        - :code:`'prediction_moments'` and :code:`'reference_moments'`: the mean and covariance of the foreground
+          voxel coordinates (relative to the cropped images)
+
+        And from the intermediate :code:`'images'` (the tuple of the prediction and reference):
+
+        - :code:`'residual_statistics'`: the :class:`ResidualStatistics` of all voxels
+
+        And the intermediate :code:`'mask'` (the region of interest of the continuous metrics), :code:`None` by default.
+
+        Args:
+            providers (dict): The providers (value) of the intermediates (key).
+
+        Examples:
+            >>> intermediates = Intermediates({'cropped_images': lambda i: (prediction, reference)})
+            >>> intermediates['reference_count']  # computes the count
+            >>> intermediates['reference_count']  # returns the computed count
+        """
+        self.providers = dict(_default_providers)
+        self.providers.update(providers)
+        self._values = {}
+
+    def __contains__(self, name: str):
+        return name in self.providers
+
+    def __getitem__(self, name: str):
+        if name not in self._values:
+            self._values[name] = self.providers[name](self)
+        return self._values[name]
+
+
+def _get_moments(image: np.ndarray) -> tuple:
+    coordinates = np.flip(np.where(image == 1), axis=0)
+    return coordinates.mean(axis=1), np.cov(coordinates)
+
+
+_default_providers = {
+    'prediction_count': lambda i: np.count_nonzero(i['cropped_images'][0]),
+    'reference_count': lambda i: np.count_nonzero(i['cropped_images'][1]),
+    'prediction_moments': lambda i: _get_moments(i['cropped_images'][0]),
+    'reference_moments': lambda i: _get_moments(i['cropped_images'][1]),
+    'residual_statistics': lambda i: ResidualStatistics(*i['images']),
+    'mask': lambda i: None,
+}
 
 
 class Metric(abc.ABC):
@@ -450,6 +711,7 @@ class Metric(abc.ABC):
             metric (str): The identification string of the metric.
         """
         self.metric = metric
+        self.intermediates = None  # Intermediates, shared with the other metrics by the evaluator
 
     @abc.abstractmethod
     def calculate(self):
@@ -491,6 +753,10 @@ class DistanceMetric(Metric, abc.ABC):
 
 class NumpyArrayMetric(Metric, abc.ABC):
 
+    crop_invariant = False
+    """bool: Whether the metric is invariant to cropping the arrays to the bounding box of the prediction and reference,
+    in which case the :class:`.SegmentationEvaluator` passes the cropped arrays."""
+
     def __init__(self, metric: str = 'NumpyArrayMetric'):
         """Represents a metric based on numpy arrays.
 
@@ -501,6 +767,13 @@ class NumpyArrayMetric(Metric, abc.ABC):
         self.reference = None  # np.ndarray
         self.prediction = None  # np.ndarray
 
+    def _get_intermediate(self, name: str):
+        # the intermediate shared by the evaluator or, without evaluator, derived from the images of the metric
+        if self.intermediates is not None:
+            return self.intermediates[name]
+        images = (self.prediction, self.reference)
+        return Intermediates({'images': lambda i: images, 'cropped_images': lambda i: images})[name]
+
 
 class SpacingMetric(NumpyArrayMetric, abc.ABC):
 
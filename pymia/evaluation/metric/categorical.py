@@ -39,6 +39,8 @@ class AreaMetric(SpacingMetric, abc.ABC):
 
 class VolumeMetric(SpacingMetric, abc.ABC):
 
+    crop_invariant = True
+
     def __init__(self, metric: str = 'VOL'):
         """Represents a volume metric base class.
 
@@ -153,6 +155,8 @@ class AreaUnderCurve(ConfusionMatrixMetric):
 
 class AverageDistance(SpacingMetric):
 
+    crop_invariant = True
+
     def __init__(self, metric: str = 'AVGDIST'):
         """Represents an average (Hausdorff) distance metric.
 
@@ -174,11 +178,11 @@ class AverageDistance(SpacingMetric):
     def calculate(self):
         """Calculates the average (Hausdorff) distance."""
 
-        if np.count_nonzero(self.reference) == 0:
+        if self._get_intermediate('reference_count') == 0:
             warnings.warn('Unable to compute average distance due to empty reference mask, returning inf',
                           NotComputableMetricWarning)
             return float('inf')
-        if np.count_nonzero(self.prediction) == 0:
+        if self._get_intermediate('prediction_count') == 0:
             warnings.warn('Unable to compute average distance due to empty prediction mask, returning inf',
                           NotComputableMetricWarning)
             return float('inf')
@@ -497,6 +501,8 @@ class JaccardCoefficient(ConfusionMatrixMetric):
 
 class MahalanobisDistance(NumpyArrayMetric):
 
+    crop_invariant = True
+
     def __init__(self, metric: str = 'MAHLNBS'):
         """Represents a Mahalanobis distance metric.
 
@@ -508,8 +514,8 @@ class MahalanobisDistance(NumpyArrayMetric):
     def calculate(self):
         """Calculates the Mahalanobis distance."""
 
-        gt_n = np.count_nonzero(self.reference)
-        seg_n = np.count_nonzero(self.prediction)
+        gt_n = self._get_intermediate('reference_count')
+        seg_n = self._get_intermediate('prediction_count')
 
         if gt_n == 0:
             warnings.warn('Unable to compute Mahalanobis distance due to empty reference mask, returning inf',
@@ -520,13 +526,8 @@ class MahalanobisDistance(NumpyArrayMetric):
                           NotComputableMetricWarning)
             return float('inf')
 
-        gt_indices = np.flip(np.where(self.reference == 1), axis=0)
-        gt_mean = gt_indices.mean(axis=1)
-        gt_cov = np.cov(gt_indices)
-
-        seg_indices = np.flip(np.where(self.prediction == 1), axis=0)
-        seg_mean = seg_indices.mean(axis=1)
-        seg_cov = np.cov(seg_indices)
+        gt_mean, gt_cov = self._get_intermediate('reference_moments')
+        seg_mean, seg_cov = self._get_intermediate('prediction_moments')
 
         # calculate common covariance matrix
         common_cov = (gt_n * gt_cov + seg_n * seg_cov) / (gt_n + seg_n)
@@ -2,8 +2,9 @@
 import warnings
 
 import numpy as np
-import skimage.metrics
+import scipy.ndimage as ndimage
 
+from . import base as pm_base
 from .base import (NumpyArrayMetric, NotComputableMetricWarning)
 
 
@@ -19,8 +20,12 @@ class MeanAbsoluteError(NumpyArrayMetric):
 
     def calculate(self):
         """Calculates the mean absolute error."""
-
-        return np.mean(np.abs(self.reference - self.prediction))
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute mean absolute error due to empty mask, returning inf',
+                          NotComputableMetricWarning)
+            return float('inf')
+        return statistics.mae
 
 
 class MeanSquaredError(NumpyArrayMetric):
@@ -35,8 +40,12 @@ class MeanSquaredError(NumpyArrayMetric):
 
     def calculate(self):
         """Calculates the mean squared error."""
-
-        return np.mean(np.square(self.reference - self.prediction))
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute mean squared error due to empty mask, returning inf',
+                          NotComputableMetricWarning)
+            return float('inf')
+        return statistics.mse
 
 
 class RootMeanSquaredError(NumpyArrayMetric):
@@ -51,8 +60,12 @@ class RootMeanSquaredError(NumpyArrayMetric):
 
     def calculate(self):
         """Calculates the root mean squared error."""
-
-        return np.sqrt(np.mean(np.square(self.reference - self.prediction)))
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute root mean squared error due to empty mask, returning inf',
+                          NotComputableMetricWarning)
+            return float('inf')
+        return np.sqrt(statistics.mse)
 
 
 class NormalizedRootMeanSquaredError(NumpyArrayMetric):
@@ -67,9 +80,16 @@ class NormalizedRootMeanSquaredError(NumpyArrayMetric):
 
     def calculate(self):
         """Calculates the normalized root mean squared error."""
-
-        rmse = np.sqrt(np.mean(np.square(self.reference - self.prediction)))
-        return rmse / (self.reference.max() - self.reference.min())
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute normalized root mean squared error due to empty mask, returning inf',
+                          NotComputableMetricWarning)
+            return float('inf')
+        if statistics.reference_max == statistics.reference_min:
+            warnings.warn('Unable to compute normalized root mean squared error due to constant reference, '
+                          'returning inf', NotComputableMetricWarning)
+            return float('inf')
+        return np.sqrt(statistics.mse) / (statistics.reference_max - statistics.reference_min)
 
 
 class CoefficientOfDetermination(NumpyArrayMetric):
@@ -88,11 +108,17 @@ class CoefficientOfDetermination(NumpyArrayMetric):
         See Also:
             https://stackoverflow.com/a/45538060
         """
-        y_true = self.reference.flatten()
-        y_predicted = self.prediction.flatten()
-
-        sse = sum((y_true - y_predicted) ** 2)
-        tse = (len(y_true) - 1) * np.var(y_true, ddof=1)
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute coefficient of determination due to empty mask, returning -inf',
+                          NotComputableMetricWarning)
+            return float('-inf')
+        if statistics.reference_m2 == 0:
+            warnings.warn('Unable to compute coefficient of determination due to constant reference, returning -inf',
+                          NotComputableMetricWarning)
+            return float('-inf')
+        sse = statistics.sum_squared
+        tse = statistics.reference_m2
         r2_score = 1 - (sse / tse)
         return r2_score
 
@@ -109,29 +135,183 @@ class PeakSignalToNoiseRatio(NumpyArrayMetric):
 
     def calculate(self):
         """Calculates the peak signal to noise ratio."""
-        psnr = skimage.metrics.peak_signal_noise_ratio(self.reference, self.prediction, data_range=self.reference.max())
+        statistics = self._get_intermediate('residual_statistics')
+        if statistics.n == 0:
+            warnings.warn('Unable to compute peak signal to noise ratio due to empty mask, returning -inf',
+                          NotComputableMetricWarning)
+            return float('-inf')
+        # equal to skimage.metrics.peak_signal_noise_ratio with the maximum of the reference as data range
+        with np.errstate(divide='ignore'):
+            psnr = 10 * np.log10(statistics.reference_max ** 2 / np.float64(statistics.mse))
         return psnr
 
 
 class StructuralSimilarityIndexMeasure(NumpyArrayMetric):
 
-    def __init__(self, metric: str = 'SSIM'):
+    def __init__(self, metric: str = 'SSIM', win_size: int = None, gaussian_weights: bool = False, sigma: float = 1.5,
+                 use_sample_covariance: bool = True, chunk_size: int = None):
         """Represents a structural similarity index measure metric.
 
+        The mean structural similarity of 2-D or 3-D images, equal to :func:`skimage.metrics.structural_similarity`
+        with the maximum of the reference as data range. The local statistics are computed with separable filters in
+        float32, chunk by chunk along the first axis. If a mask is provided (e.g., by the :class:`.RegressionEvaluator`),
+        the mean is taken over the voxels of the mask (apart from the image border of half the window size), and only
+        the bounding box of the mask is processed.
+
         Args:
             metric (str): The identification string of the metric.
+            win_size (int): The (odd) side length of the sliding window. If :code:`None`, 7 for uniform weights and
+                the size of the Gaussian filter for Gaussian weights.
+            gaussian_weights (bool): Whether to weight the window with a Gaussian (see :obj:`sigma`), otherwise
+                uniformly.
+            sigma (float): The standard deviation of the Gaussian.
+            use_sample_covariance (bool): Whether to normalize the covariances by N-1 instead of N, where N is the
+                number of voxels of the window.
+            chunk_size (int): The number of slices along the first axis per chunk. If :code:`None`, chunks of about
+                :code:`2 ** 22` voxels.
         """
         super().__init__(metric)
+        self.win_size = win_size
+        self.gaussian_weights = gaussian_weights
+        self.sigma = sigma
+        self.use_sample_covariance = use_sample_covariance
+        self.chunk_size = chunk_size
 
     def calculate(self):
         """Calculates the structural similarity index measure."""
-        if self.reference.ndim == 2:
-            ssim = skimage.metrics.structural_similarity(self.reference, self.prediction, data_range=self.reference.max())
-        elif self.reference.ndim == 3:
-            ssim = skimage.metrics.structural_similarity(self.reference, self.prediction, data_range=self.reference.max(),
-                                                         multichannelbool=True)
-        else:
+        if self.reference.ndim not in (2, 3):
             warnings.warn('Unable to compute StructuralSimilarityIndexMeasure for images of dimension other than 2 or 3.',
                           NotComputableMetricWarning)
-            ssim = float('-inf')
+            return float('-inf')
+
+        ssim = _structural_similarity(self.reference, self.prediction, float(self.reference.max()),
+                                      self._get_intermediate('mask'), self.win_size, self.gaussian_weights, self.sigma,
+                                      self.use_sample_covariance, self.chunk_size)
+        if np.isnan(ssim):
+            warnings.warn('Unable to compute StructuralSimilarityIndexMeasure due to no mask voxels apart from the '
+                          'image border, returning -inf', NotComputableMetricWarning)
+            return float('-inf')
         return ssim
+
+
+def _structural_similarity(reference: np.ndarray, prediction: np.ndarray, data_range: float, mask: np.ndarray = None,
+                           win_size: int = None, gaussian_weights: bool = False, sigma: float = 1.5,
+                           use_sample_covariance: bool = True, chunk_size: int = None,
+                           k1: float = 0.01, k2: float = 0.03) -> float:
+    truncate = 3.5
+    radius = int(truncate * sigma + 0.5)  # of the Gaussian filter
+    if win_size is None:
+        win_size = 2 * radius + 1 if gaussian_weights else 7
+    if win_size % 2 != 1:
+        raise ValueError('Window size must be odd, got {}'.format(win_size))
+    if any(s < win_size for s in reference.shape):
+        raise ValueError('Window size {} exceeds the image shape {}'.format(win_size, reference.shape))
+    if prediction.shape != reference.shape:
+        raise ValueError('Shapes of prediction {} and reference {} differ'.format(prediction.shape, reference.shape))
+    if mask is not None and mask.shape != reference.shape:
+        raise ValueError('Shapes of mask {} and reference {} differ'.format(mask.shape, reference.shape))
+
+    if gaussian_weights:
+        weights = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+        weights /= weights.sum()
+        filter_axes = ndimage.gaussian_filter
+        other_axes = (0,) + (sigma,) * (reference.ndim - 1)
+        kwargs = {'mode': 'reflect', 'truncate': truncate}
+    else:
+        radius = (win_size - 1) // 2
+        weights = np.full(win_size, 1 / win_size)
+        filter_axes = ndimage.uniform_filter
+        other_axes = (1,) + (win_size,) * (reference.ndim - 1)
+        kwargs = {'mode': 'reflect'}
+
+    nb_window = win_size ** reference.ndim
+    cov_norm = nb_window / (nb_window - 1) if use_sample_covariance else 1.0
+    c1 = (k1 * data_range) ** 2
+    c2 = (k2 * data_range) ** 2
+    # the images are shifted by the reference mean to reduce the cancellation of the float32 (co)variances
+    shift = np.float32(np.mean(reference, dtype=np.float64))
+
+    # the structural similarity is averaged over the image without a border of half the window size
+    pad = (win_size - 1) // 2
+    region = [[pad, s - pad] for s in reference.shape]
+    if mask is not None:
+        bbox = pm_base.get_bounding_box(mask)
+        if bbox is None:
+            return float('nan')
+        region = [[max(start, s.start), min(stop, s.stop)] for (start, stop), s in zip(region, bbox)]
+    if any(start >= stop for start, stop in region):
+        return float('nan')
+
+    if chunk_size is None:
+        chunk_size = max(1, 2 ** 22 // int(np.prod([stop - start + 2 * radius for start, stop in region[1:]])))
+
+    total, count = 0.0, 0
+    for chunk_start in range(region[0][0], region[0][1], chunk_size):
+        chunk_region = [[chunk_start, min(chunk_start + chunk_size, region[0][1])]] + region[1:]
+        # the chunk with a halo of the filter radius, the filters reflect at the image border as on the entire image
+        block = tuple(slice(max(start - radius, 0), min(stop + radius, s))
+                      for (start, stop), s in zip(chunk_region, reference.shape))
+        inner = tuple(slice(start - b.start, stop - b.start) for (start, stop), b in zip(chunk_region, block))
+
+        def filter_fn(image):
+            # the separable filter, of which only the planes of the chunk are computed along the first axis
+            image = filter_axes(image, other_axes, output=np.float32, **kwargs)
+            return _correlate_first_axis(image, weights, inner[0].start, inner[0].stop)[(slice(None),) + inner[1:]]
+
+        x = reference[block].astype(np.float32) - shift
+        y = prediction[block].astype(np.float32) - shift
+        ux, uy = filter_fn(x), filter_fn(y)
+        vx = filter_fn(x * x) - ux * ux
+        vy = filter_fn(y * y) - uy * uy
+        vxy = filter_fn(x * y) - ux * uy
+        ux += shift
+        uy += shift
+
+        # ((2 ux uy + c1) (2 vxy + c2)) / ((ux^2 + uy^2 + c1) (vx + vy + c2)) with the covariances normalized
+        vxy *= 2 * cov_norm
+        vxy += c2
+        vx += vy
+        vx *= cov_norm
+        vx += c2
+        ssim = 2 * ux * uy
+        ssim += c1
+        ssim *= vxy
+        ux *= ux
+        uy *= uy
+        ux += uy
+        ux += c1
+        ux *= vx
+        ssim /= ux
+        if mask is not None:
+            chunk_mask = mask[tuple(slice(start, stop) for start, stop in chunk_region)] != 0
+            ssim = ssim[chunk_mask]
+        total += float(np.sum(ssim, dtype=np.float64))
+        count += ssim.size
+    return total / count if count > 0 else float('nan')
+
+
+def _correlate_first_axis(image: np.ndarray, weights: np.ndarray, start: int, stop: int,
+                          slab_size: int = 8) -> np.ndarray:
+    # correlates the planes [start, stop) along the first axis (reflected at the border) with symmetric weights by
+    # weighted sums of shifted slabs, which is faster than the strided access of ndimage.correlate1d along this axis
+    radius = len(weights) // 2
+    lower, upper = start - radius, stop + radius
+    if lower < 0 or upper > image.shape[0]:
+        pad_width = [(max(-lower, 0), max(upper - image.shape[0], 0))] + [(0, 0)] * (image.ndim - 1)
+        source = np.pad(image[max(lower, 0):upper], pad_width, mode='symmetric')
+    else:
+        source = image[lower:upper]
+
+    weights = weights.astype(np.float32)
+    out = np.empty((stop - start,) + image.shape[1:], np.float32)
+    tmp = np.empty((min(slab_size, len(out)),) + image.shape[1:], np.float32)
+    for slab_start in range(0, len(out), slab_size):
+        slab_stop = min(slab_start + slab_size, len(out))
+        slab, slab_tmp = out[slab_start:slab_stop], tmp[:slab_stop - slab_start]
+        np.multiply(source[slab_start + radius:slab_stop + radius], weights[radius], out=slab)
+        for k in range(radius):
+            np.add(source[slab_start + k:slab_stop + k], source[slab_start + 2 * radius - k:slab_stop + 2 * radius - k],
+                   out=slab_tmp)
+            slab_tmp *= weights[k]
+            slab += slab_tmp
+    return out
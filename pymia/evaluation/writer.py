@@ -20,11 +20,11 @@ class Writer(abc.ABC):
     """Represents an evaluation results writer base class."""
 
     @abc.abstractmethod
-    def write(self, results: typing.List[evaluator.Result], **kwargs):
+    def write(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable], **kwargs):
         """Writes the evaluation results.
 
         Args:
-            results (list of evaluator.Result): The evaluation results.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The evaluation results.
         """
         raise NotImplementedError
 
@@ -74,36 +74,17 @@ class StatisticsAggregator:
             functions = {'MEAN': np.mean, 'STD': np.std}
         self.functions = functions
 
-    def calculate(self, results: typing.List[evaluator.Result]) -> typing.List[evaluator.Result]:
+    def calculate(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]) \
+            -> typing.List[evaluator.Result]:
         """Calculates aggregated results (e.g., mean and standard deviation of a metric over all cases).
 
         Args:
-            results (typing.List[evaluator.Result]): The results to aggregate.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The results to aggregate.
 
         Returns:
             typing.List[evaluator.Result]: The aggregated results.
         """
-
-        # get unique labels and metrics
-        labels = sorted({result.label for result in results})
-        metrics = sorted({result.metric for result in results})
-
-        aggregated_results = []
-
-        for label in labels:
-            for metric in metrics:
-                # search for results
-                values = [r.value for r in results if r.label == label and r.metric == metric]
-
-                for fn_id, fn in self.functions.items():
-                    aggregated_results.append(evaluator.Result(
-                        fn_id,
-                        label,
-                        metric,
-                        float(fn(values))
-                    ))
-
-        return aggregated_results
+        return _to_table(results).aggregate(self.functions)
 
 
 class CSVWriter(Writer):
@@ -123,32 +104,26 @@ class CSVWriter(Writer):
         if not self.path.lower().endswith('.csv'):
             self.path = os.path.join(self.path, '.csv')
 
-    def write(self, results: typing.List[evaluator.Result], **kwargs):
+    def write(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable], **kwargs):
         """Writes the evaluation results to a CSV file.
 
         Args:
-            results (typing.List[evaluator.Result]): The evaluation results.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The evaluation results.
         """
 
-        # get unique ids, labels, and metrics
-        ids = sorted({result.id_ for result in results})
-        labels = sorted({result.label for result in results})
-        metrics = sorted({result.metric for result in results})
+        table = _to_table(results)
+        values = table.get_values()
 
         with open(self.path, 'w', newline='') as file:  # creates (and overrides an existing) file
             writer = csv.writer(file, delimiter=self.delimiter)
 
             # write header
-            writer.writerow(['SUBJECT', 'LABEL'] + metrics)
+            writer.writerow(['SUBJECT', 'LABEL'] + table.metrics)
 
-            for id_ in ids:
-                for label in labels:
+            for id_idx, id_ in enumerate(table.ids):
+                for label_idx, label in enumerate(table.labels):
                     row = [id_, label]
-                    for metric in metrics:
-                        # search for result
-                        value = next(
-                            (r.value for r in results if r.id_ == id_ and r.label == label and r.metric == metric),
-                            None)
+                    for value in values[id_idx, label_idx]:
                         row.append(value if value is not None else 'n/a')
                     writer.writerow(row)
 
@@ -167,29 +142,23 @@ class ConsoleWriter(Writer):
         self.write_helper = ConsoleWriterHelper(use_logging)
         self.precision = precision
 
-    def write(self, results: typing.List[evaluator.Result], **kwargs):
+    def write(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable], **kwargs):
         """Writes the evaluation results.
 
         Args:
-            results (typing.List[evaluator.Result]): The evaluation results.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The evaluation results.
         """
 
-        # get unique ids, labels, and metrics
-        ids = sorted({result.id_ for result in results})
-        labels = sorted({result.label for result in results})
-        metrics = sorted({result.metric for result in results})
+        table = _to_table(results)
+        values = table.get_values()
 
         # header
-        lines = [['SUBJECT', 'LABEL'] + metrics]
+        lines = [['SUBJECT', 'LABEL'] + table.metrics]
 
-        for id_ in ids:
-            for label in labels:
+        for id_idx, id_ in enumerate(table.ids):
+            for label_idx, label in enumerate(table.labels):
                 row = [id_, label]
-                for metric in metrics:
-                    # search for result
-                    value = next(
-                        (r.value for r in results if r.id_ == id_ and r.label == label and r.metric == metric),
-                        None)
+                for value in values[id_idx, label_idx]:
                     if value is not None:
                         # format float with given precision
                         row.append(value if isinstance(value, str) else f'{value:.{self.precision}f}')
@@ -219,11 +188,11 @@ class CSVStatisticsWriter(Writer):
         if not self.path.lower().endswith('.csv'):
             self.path = os.path.join(self.path, '.csv')
 
-    def write(self, results: typing.List[evaluator.Result], **kwargs):
+    def write(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable], **kwargs):
         """Writes the evaluation statistic results (e.g., mean and standard deviation of a metric over all cases).
 
         Args:
-            results (typing.List[evaluator.Result]): The evaluation results.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The evaluation results.
         """
         aggregated_results = self.aggregator.calculate(results)
 
@@ -253,11 +222,11 @@ class ConsoleStatisticsWriter(Writer):
         self.write_helper = ConsoleWriterHelper(use_logging)
         self.precision = precision
 
-    def write(self, results: typing.List[evaluator.Result], **kwargs):
+    def write(self, results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable], **kwargs):
         """Writes the evaluation statistic results (e.g., mean and standard deviation of a metric over all cases).
 
         Args:
-            results (typing.List[evaluator.Result]): The evaluation results.
+            results (typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]): The evaluation results.
         """
         aggregated_results = self.aggregator.calculate(results)
 
@@ -269,3 +238,7 @@ class ConsoleStatisticsWriter(Writer):
                           result.value if isinstance(result.value, str) else f'{result.value:.{self.precision}f}'])
 
         self.write_helper.format_and_write(lines)
+
+
+def _to_table(results: typing.Union[typing.List[evaluator.Result], evaluator.ResultTable]) -> evaluator.ResultTable:
+    return results if isinstance(results, evaluator.ResultTable) else evaluator.ResultTable(results)
@@ -0,0 +1,177 @@
+import collections
+import concurrent.futures as futures
+import threading
+import typing
+
+import numpy as np
+
+import pymia.data.assembler as assm
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.evaluation.evaluator as eval_
+
+
+class InferencePipeline:
+
+    def __init__(self, datasource: extr.PymiaDatasource, model_fn,
+                 assembler: assm.Assembler = None, indexing_strategy: extr.IndexingStrategy = None,
+                 batch_size: int = 16, input_key: str = defs.KEY_IMAGES, num_workers: int = 2, prefetch: int = 4,
+                 sample_indices: typing.Iterable[int] = None, evaluator: eval_.Evaluator = None,
+                 reference_key: str = defs.KEY_LABELS) -> None:
+        """Runs a model on all samples of a datasource (e.g., sliding-window inference with patches) and assembles
+        the predictions of the subjects.
+
+        The batches are extracted on worker threads (each with its own reader) while the model runs on the previous
+        batches. The batches are passed to the model and assembled in order, and the subjects are returned as soon as
+        they are assembled. Optionally, the assembled subjects are evaluated on a background thread while the
+        inference continues.
+
+        Args:
+            datasource (.PymiaDatasource): The datasource to extract the samples from.
+            model_fn: The model, i.e. a function mapping the batch input to the network output.
+                Args: inputs: np.ndarray with the stacked entry :obj:`input_key` of the batch (B, ...), or the stacked
+                batch (dict) if :obj:`input_key` is :code:`None`.
+                Returns: A np.ndarray of shape (B, ..., C) or a dict of such arrays (see :class:`.SubjectAssembler`)
+            assembler (.Assembler): The assembler of the network output. If :code:`None`, a
+                :class:`.SubjectAssembler` of the datasource.
+            indexing_strategy (.IndexingStrategy): The indexing strategy of the samples (e.g.,
+                :class:`.PatchWiseIndexing` with a stride), which replaces the strategy of the datasource. If
+                :code:`None`, the strategy of the datasource is used.
+            batch_size (int): The number of samples per batch.
+            input_key (str): The entry of the batch passed to the model.
+            num_workers (int): The number of threads extracting the batches.
+            prefetch (int): The number of batches extracted ahead of the model.
+            sample_indices (iterable): The sample indices to run the model on. If :code:`None`, all samples.
+            evaluator (.Evaluator): Evaluates the assembled subjects against the reference :obj:`reference_key` of the
+                datasource (on a background thread). The model output must be a single array.
+            reference_key (str): The category of the reference (see :obj:`evaluator`).
+
+        Examples:
+            >>> ds = PymiaDatasource(..., extractor=DataExtractor(categories=(defs.KEY_IMAGES, )))
+            >>> pipeline = InferencePipeline(ds, model_fn, indexing_strategy=PatchWiseIndexing((64, 64, 64)),
+            >>>                              evaluator=SegmentationEvaluator(metrics, labels))
+            >>> for subject_index, prediction in pipeline:
+            >>>     ...
+            >>> print(pipeline.evaluator.results)
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive, got {}'.format(batch_size))
+        if num_workers < 1:
+            raise ValueError('num_workers must be positive, got {}'.format(num_workers))
+
+        if indexing_strategy is not None:
+            datasource.set_indexing_strategy(indexing_strategy, datasource.subject_subset)
+        if sample_indices is not None:
+            sample_indices = np.asarray(list(sample_indices), dtype=np.intp)
+        if assembler is None:
+            assembler = assm.SubjectAssembler(datasource, sample_indices=sample_indices)
+
+        self.datasource = datasource
+        self.model_fn = model_fn
+        self.assembler = assembler
+        self.batch_size = batch_size
+        self.input_key = input_key
+        self.num_workers = num_workers
+        self.prefetch = max(prefetch, 1)
+        self.sample_indices = sample_indices
+        self.evaluator = evaluator
+        self.reference_key = reference_key
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+    def __len__(self):
+        """The number of batches."""
+        nb_samples = len(self.datasource) if self.sample_indices is None else len(self.sample_indices)
+        return -(-nb_samples // self.batch_size)
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[int, typing.Any]]:
+        """Runs the model on all batches.
+
+        Yields:
+            tuple: The subject index and the assembled prediction of a subject (see
+            :meth:`.Assembler.get_assembled_subject`), as soon as the subject is assembled. The evaluation of the subjects
+            is finished once the iteration is finished.
+        """
+        sample_indices = self.sample_indices
+        if sample_indices is None:
+            sample_indices = np.arange(len(self.datasource))
+        batches = collections.deque(sample_indices[i:i + self.batch_size]
+                                    for i in range(0, len(sample_indices), self.batch_size))
+
+        executor = futures.ThreadPoolExecutor(max_workers=self.num_workers)
+        evaluation_executor = futures.ThreadPoolExecutor(max_workers=1) if self.evaluator is not None else None
+        loading = collections.deque()  # the futures of the batches being extracted, in order
+        evaluating = []
+        try:
+            while batches or loading:
+                while batches and len(loading) < self.prefetch:
+                    loading.append(executor.submit(self._load, batches.popleft()))
+
+                batch = loading.popleft().result()
+                inputs = batch if self.input_key is None else batch[self.input_key]
+                outputs = self.model_fn(inputs)
+                self.assembler.add_batch(outputs, batch[defs.KEY_SAMPLE_INDEX],
+                                         last_batch=not batches and not loading)
+
+                for subject_index in sorted(self.assembler.subjects_ready):
+                    prediction = self.assembler.get_assembled_subject(subject_index)
+                    if evaluation_executor is not None:
+                        evaluating.append(evaluation_executor.submit(self._evaluate, subject_index, prediction))
+                    yield subject_index, prediction
+
+                # raise evaluation errors early
+                for future in [f for f in evaluating if f.done()]:
+                    future.result()
+                    evaluating.remove(future)
+
+            for future in evaluating:
+                future.result()
+        finally:
+            for future in loading:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if evaluation_executor is not None:
+                evaluation_executor.shutdown(wait=True)
+            self._close_readers()
+
+    def run(self) -> dict:
+        """Runs the model on all batches (see :meth:`__iter__`).
+
+        Returns:
+            dict: The assembled predictions by subject index. Iterate over the pipeline instead to process the subjects
+            one by one without keeping all predictions in memory.
+        """
+        return dict(iter(self))
+
+    def _load(self, items: np.ndarray) -> dict:
+        return self.datasource.get_batch(items, stack=True, reader=self._get_reader())
+
+    def _evaluate(self, subject_index: int, prediction):
+        if isinstance(prediction, dict):
+            raise ValueError('Evaluation requires the model to output a single array, got keys {}'
+                             .format(list(prediction.keys())))
+        extractor = extr.ComposeExtractor([extr.SubjectExtractor(),
+                                           extr.DataExtractor(categories=(self.reference_key, ))])
+        extracted = self.datasource.direct_extract(extractor, subject_index, reader=self._get_reader())
+        self.evaluator.evaluate(prediction, extracted[self.reference_key], extracted[defs.KEY_SUBJECT])
+
+    def _get_reader(self) -> extr.Reader:
+        # each thread reads with its own reader
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            kwargs = {'preload_meta': self.datasource.preload_meta}
+            if self.datasource.volume_cache is not None:
+                kwargs['volume_cache'] = self.datasource.volume_cache
+            reader = extr.get_reader(self.datasource.dataset_path, direct_open=True, **kwargs)
+            self._local.reader = reader
+            with self._readers_lock:
+                self._readers.append(reader)
+        return reader
+
+    def _close_readers(self):
+        with self._readers_lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+        self._local = threading.local()
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import SimpleITK as sitk
+
+import pymia.data as data
+import pymia.data.creation as crt
+
+
+def create_dataset(dir_path: str, shapes: list, file_name: str = 'dataset.h5', seed: int = 0, **callback_kwargs) -> str:
+    """Creates a dataset with random images (two channels) and labels (one channel) of the given (numpy) shapes.
+
+    Args:
+        dir_path (str): The directory to write the image files and the dataset to.
+        shapes (list): The image shape (z, y, x) of every subject.
+        file_name (str): The file name of the dataset.
+        seed (int): The random seed.
+        **callback_kwargs: Arguments passed to :func:`.get_default_callbacks`.
+
+    Returns:
+        str: The path to the dataset.
+    """
+    rs = np.random.RandomState(seed)
+    subject_files = []
+    for i, shape in enumerate(shapes):
+        subject = 'Subject_{}'.format(i + 1)
+        files = {}
+        for id_ in ('T1', 'T2', 'GT'):
+            if id_ == 'GT':
+                arr = rs.randint(0, 4, shape).astype(np.uint8)
+            else:
+                arr = rs.rand(*shape).astype(np.float32)
+            image = sitk.GetImageFromArray(arr)
+            image.SetSpacing((1.0, 1.5, 2.0))
+            files[id_] = os.path.join(dir_path, '{}_{}.mha'.format(subject, id_))
+            sitk.WriteImage(image, files[id_])
+        subject_files.append(data.SubjectFile(subject, images={'T1': files['T1'], 'T2': files['T2']},
+                                              labels={'GT': files['GT']}))
+
+    dataset_path = os.path.join(dir_path, file_name)
+    with crt.get_writer(dataset_path) as writer:
+        callbacks = crt.get_default_callbacks(writer, **callback_kwargs)
+        crt.Traverser().traverse(subject_files, callback=callbacks)
+    return dataset_path
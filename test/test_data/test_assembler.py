@@ -0,0 +1,243 @@
+import os
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import pymia.data.assembler as assm
+import pymia.data.creation as crt
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+from . import helper
+
+
+class TestSubjectAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (4, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assemble(self, datasource, assembler, batch_size=4):
+        assembled = {}
+        for start in range(0, len(datasource), batch_size):
+            items = list(range(start, min(start + batch_size, len(datasource))))
+            batch = datasource.get_batch(items, stack=True)
+            assembler.add_batch(batch[defs.KEY_IMAGES], batch[defs.KEY_SAMPLE_INDEX],
+                                last_batch=items[-1] == len(datasource) - 1)
+            for subject_index in assembler.subjects_ready:
+                assembled[subject_index] = assembler.get_assembled_subject(subject_index)
+        return assembled
+
+    def test_unordered(self):
+        strategies = [extr.SliceIndexing(), extr.SliceIndexing(2), extr.VoxelWiseIndexing(),
+                      extr.PatchWiseIndexing((2, 3, 4), ignore_incomplete=False)]
+        images = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor())
+        for strategy in strategies:
+            with self.subTest(strategy=repr(strategy)):
+                datasource = extr.PymiaDatasource(self.dataset_path, strategy, extr.DataExtractor())
+                assembler = assm.SubjectAssembler(datasource)
+                order = np.random.RandomState(0).permutation(len(datasource))
+                subject_indices = datasource.indices.subject_indices[order]
+                retrieved = set()
+
+                for start in range(0, len(order), 5):
+                    items = order[start:start + 5]
+                    batch = datasource.get_batch(items, stack=True)
+                    assembler.add_batch(batch[defs.KEY_IMAGES], items)
+
+                    # a subject is ready as soon as all its samples are added
+                    completed = {s for s in (0, 1) if s not in subject_indices[start + 5:]}
+                    self.assertEqual(assembler.subjects_ready, completed - retrieved)
+                    for subject_index in assembler.subjects_ready:
+                        retrieved.add(subject_index)
+                        np.testing.assert_array_equal(assembler.get_assembled_subject(subject_index),
+                                                      images[subject_index][defs.KEY_IMAGES])
+                self.assertEqual(assembler.predictions, {})
+
+    def test_subset(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        sample_indices = [0, 2, 5]
+        assembler = assm.SubjectAssembler(datasource, sample_indices=sample_indices)
+        batch = datasource.get_batch([0, 2], stack=True)
+        assembler.add_batch(batch[defs.KEY_IMAGES], np.array([0, 2]))
+        self.assertEqual(assembler.subjects_ready, {0})
+
+    def test_weighted_overlapping_patches(self):
+        strategy = extr.PatchWiseIndexing((2, 4, 4), stride=(1, 2, 2))
+        datasource = extr.PymiaDatasource(self.dataset_path, strategy, extr.DataExtractor())
+        images = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor())
+
+        for weight_fn in (assm.uniform_weights, assm.gaussian_weights):
+            with self.subTest(weight_fn=weight_fn.__name__):
+                assembler = assm.SubjectAssembler(datasource, weight_fn=weight_fn)
+                assembled = self._assemble(datasource, assembler)
+                self.assertEqual(sorted(assembled), [0, 1])
+                for subject_index, prediction in assembled.items():
+                    np.testing.assert_allclose(prediction, images[subject_index][defs.KEY_IMAGES], rtol=1e-5)
+                self.assertEqual(assembler.weights, {})
+
+    def test_weights_accumulated(self):
+        strategy = extr.PatchWiseIndexing((2, 4, 4), stride=(2, 2, 4))
+        datasource = extr.PymiaDatasource(self.dataset_path, strategy, extr.DataExtractor())
+        assembler = assm.SubjectAssembler(datasource, weight_fn=assm.uniform_weights)
+        ones = np.ones((2, 2, 4, 4, 1))
+        assembler.add_batch(ones, np.array([0, 2]))  # overlapping patches along the second axis
+
+        weights = assembler.weights[0]['__prediction']
+        np.testing.assert_array_equal(weights[:2, 2:4, :4], 2)
+        np.testing.assert_array_equal(weights[:2, :2, :4], 1)
+        np.testing.assert_array_equal(weights[2:], 0)
+
+    def test_memmap(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        images = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor())
+        zero_fn = assm.MemmapZeros(os.path.join(self.tmp_dir.name, 'predictions'), dtype=np.float16)
+        assembled = self._assemble(datasource, assm.SubjectAssembler(datasource, zero_fn=zero_fn))
+
+        self.assertIsInstance(assembled[1], np.memmap)
+        self.assertEqual(assembled[1].dtype, np.float16)
+        stored = np.load(zero_fn.get_file_path('__prediction', 1), mmap_mode='r')
+        np.testing.assert_array_equal(stored, images[1][defs.KEY_IMAGES].astype(np.float16))
+
+    def test_hdf5(self):
+        strategy = extr.PatchWiseIndexing((2, 4, 4), stride=(1, 2, 2))
+        datasource = extr.PymiaDatasource(self.dataset_path, strategy, extr.DataExtractor())
+        images = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor())
+        with crt.get_writer(os.path.join(self.tmp_dir.name, 'predictions.h5')) as writer:
+            zero_fn = assm.Hdf5Zeros(writer)
+            assembler = assm.SubjectAssembler(datasource, zero_fn=zero_fn, weight_fn=assm.gaussian_weights)
+            assembled = self._assemble(datasource, assembler)
+            self.assertEqual(assembled[0].name, '/predictions/0/prediction')
+            np.testing.assert_allclose(assembled[0][()], images[0][defs.KEY_IMAGES], rtol=1e-5)
+
+    def test_quantize(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        images = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor())
+        zero_fn = assm.MemmapZeros(self.tmp_dir.name, dtype=np.uint8)
+        assembler = assm.SubjectAssembler(datasource, zero_fn=zero_fn, assemble_interaction_fn=assm.QuantizeInteractionFn())
+        assembled = self._assemble(datasource, assembler)
+        self.assertEqual(assembled[0].dtype, np.uint8)
+        np.testing.assert_allclose(assembled[0] / 255, images[0][defs.KEY_IMAGES], atol=0.5 / 255 + 1e-6)
+
+    def test_dtype(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        batch = datasource.get_batch([0, 1], stack=True)[defs.KEY_IMAGES].astype(np.float16)
+
+        assembler = assm.SubjectAssembler(datasource)
+        assembler.add_batch(batch, np.array([0, 1]))
+        self.assertEqual(assembler.predictions[0]['__prediction'].dtype, np.float16)  # inferred from the batch
+
+        assembler = assm.SubjectAssembler(datasource, dtype=np.float32)
+        assembler.add_batch(batch, np.array([0, 1]))
+        self.assertEqual(assembler.predictions[0]['__prediction'].dtype, np.float32)
+
+        assembler = assm.SubjectAssembler(datasource, weight_fn=assm.uniform_weights)
+        assembler.add_batch(batch.astype(np.uint8), np.array([0, 1]))
+        self.assertEqual(assembler.predictions[0]['__prediction'].dtype, np.float32)  # accumulated
+
+    def test_max_subjects(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        assembler = assm.SubjectAssembler(datasource, max_subjects=1)
+        batch = datasource.get_batch([0, 4], stack=True)[defs.KEY_IMAGES]
+
+        assembler.add_batch(batch[:1], np.array([0]))
+        self.assertTrue(assembler.can_add(batch[:1], np.array([1])))  # already open subject
+        self.assertFalse(assembler.can_add(batch[1:], np.array([4])))
+        with self.assertRaises(ValueError):
+            assembler.add_batch(batch[1:], np.array([4]))
+        self.assertEqual(assembler.open_subjects, {0})
+        self.assertFalse(assembler.wait_for_capacity(batch[1:], np.array([4]), timeout=0.01))
+
+        # backpressure, a consumer thread retrieves the open subject
+        timer = threading.Timer(0.05, assembler.get_assembled_subject, args=(0, ))
+        timer.start()
+        self.assertTrue(assembler.wait_for_capacity(batch[1:], np.array([4]), timeout=5))
+        timer.join()
+        assembler.add_batch(batch[1:], np.array([4]))
+        self.assertEqual(assembler.open_subjects, {1})
+
+    def test_max_bytes(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        batch = datasource.get_batch([0, 4], stack=True)[defs.KEY_IMAGES].astype(np.float32)
+        subject_nbytes = 4 * 6 * 8 * batch.shape[-1] * 4
+
+        assembler = assm.SubjectAssembler(datasource, max_bytes=2 * subject_nbytes - 1)
+        assembler.add_batch(batch[:1], np.array([0]))
+        self.assertEqual(assembler.nbytes, subject_nbytes)
+        self.assertFalse(assembler.can_add(batch[1:], np.array([4])))
+
+        assembler = assm.SubjectAssembler(datasource, max_bytes=2 * subject_nbytes)
+        assembler.add_batch(batch, np.array([0, 4]))
+        self.assertEqual(assembler.nbytes, 2 * subject_nbytes)
+
+    def test_gaussian_weights(self):
+        weights = assm.gaussian_weights((5, 8))
+        self.assertEqual(weights.shape, (5, 8))
+        self.assertEqual(weights.max(), 1)
+        self.assertGreater(weights.min(), 0)
+        self.assertEqual(weights[2, 3], weights[2, 4])
+        self.assertGreater(weights[2, 3], weights[0, 0])
+
+
+class TestPlaneSubjectAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (4, 6, 8)])
+        self.datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing((0, 1, 2)),
+                                               extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+
+    def tearDown(self):
+        self.datasource.close_reader()
+        self.tmp_dir.cleanup()
+
+    def test_assemble(self):
+        labels = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+        for running_merge in (False, True):
+            with self.subTest(running_merge=running_merge):
+                assembler = assm.PlaneSubjectAssembler(self.datasource, running_merge=running_merge)
+                order = np.random.RandomState(0).permutation(len(self.datasource))
+                assembled = {}
+                with unittest.mock.patch.object(self.datasource, 'direct_extract',
+                                                wraps=self.datasource.direct_extract) as direct_extract:
+                    for start in range(0, len(order), 8):
+                        items = order[start:start + 8]
+                        samples = self.datasource.get_batch(items)
+                        for sample in samples:
+                            assembler.add_batch(sample[defs.KEY_LABELS][np.newaxis].astype(np.float32),
+                                                np.array([sample[defs.KEY_SAMPLE_INDEX]]))
+                        for subject_index in assembler.subjects_ready:
+                            assembled[subject_index] = assembler.get_assembled_subject(subject_index)
+                    self.assertEqual(direct_extract.call_count, 2)  # the shape is extracted once per subject
+
+                self.assertEqual(sorted(assembled), [0, 1])
+                for subject_index, prediction in assembled.items():
+                    np.testing.assert_array_equal(prediction, labels[subject_index][defs.KEY_LABELS])
+                if running_merge:
+                    self.assertEqual(assembler.planes, {})
+
+    def test_size_correction(self):
+        assembler = assm.PlaneSubjectAssembler(self.datasource)
+        # predictions larger than the plane are center-cropped, smaller are zero-padded
+        sample_index = 4  # first slice along axis 1, i.e. a plane of shape (4, 8)
+        assembler.add_batch(np.ones((1, 6, 6, 1)), np.array([sample_index]), last_batch=True)
+        prediction = assembler.get_assembled_subject(0)
+        np.testing.assert_array_equal(prediction[:, 0, 1:7, 0], 1)
+        np.testing.assert_array_equal(prediction[:, 0, [0, 7], 0], 0)
+
+    def test_max_subjects(self):
+        assembler = assm.PlaneSubjectAssembler(self.datasource, max_subjects=1, running_merge=True)
+        sample = np.ones((1, 6, 8, 1), dtype=np.float16)
+        assembler.add_batch(sample, np.array([0]))
+        self.assertEqual(assembler.open_subjects, {0})
+        self.assertEqual(assembler.merged[0]['__prediction'].dtype, np.float32)
+        first_sample_of_subject_1 = int(np.flatnonzero(self.datasource.indices.subject_indices == 1)[0])
+        with self.assertRaises(ValueError):
+            assembler.add_batch(sample, np.array([first_sample_of_subject_1]))
+        assembler.get_assembled_subject(0)
+        self.assertTrue(assembler.can_add(sample, np.array([first_sample_of_subject_1])))
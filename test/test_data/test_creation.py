@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+from . import helper
+
+
+class TestWriteDataCallback(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _get_data_entry(self, h5: h5py.File, category: str):
+        return h5['{}/{}'.format(defs.LOC_DATA_PLACEHOLDER.format(category), '0')]
+
+    def test_default_contiguous(self):
+        dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8)])
+        with h5py.File(dataset_path, 'r') as h5:
+            entry = self._get_data_entry(h5, defs.KEY_IMAGES)
+            self.assertIsNone(entry.chunks)
+            self.assertIsNone(entry.compression)
+
+    def test_chunking_patch_strategy(self):
+        dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8)],
+                                             chunking=extr.PatchWiseIndexing((2, 3, 16)), compression='gzip',
+                                             compression_opts=4, shuffle=True)
+        with h5py.File(dataset_path, 'r') as h5:
+            entry = self._get_data_entry(h5, defs.KEY_IMAGES)
+            self.assertEqual(entry.chunks, (2, 3, 8, 2))
+            self.assertEqual(entry.compression, 'gzip')
+            self.assertEqual(entry.compression_opts, 4)
+            self.assertTrue(entry.shuffle)
+            self.assertEqual(self._get_data_entry(h5, defs.KEY_LABELS).chunks, (2, 3, 8, 1))
+
+    def test_chunking_slice_strategy(self):
+        dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8)], chunking=extr.SliceIndexing(1))
+        with h5py.File(dataset_path, 'r') as h5:
+            self.assertEqual(self._get_data_entry(h5, defs.KEY_IMAGES).chunks, (4, 1, 8, 2))
+
+    def test_chunking_explicit_data_unchanged(self):
+        dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8)], file_name='plain.h5')
+        chunked_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8)], file_name='chunked.h5',
+                                             chunking=(1, 2), compression='lzf')
+        with h5py.File(dataset_path, 'r') as h5, h5py.File(chunked_path, 'r') as h5_chunked:
+            entry = self._get_data_entry(h5_chunked, defs.KEY_IMAGES)
+            self.assertEqual(entry.chunks, (1, 2, 8, 2))
+            np.testing.assert_array_equal(entry[()], self._get_data_entry(h5, defs.KEY_IMAGES)[()])
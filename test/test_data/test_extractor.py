@@ -0,0 +1,144 @@
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.data.extraction.extractor as extractor
+import pymia.data.indexexpression as expr
+from . import helper
+
+
+class TestCoalesceIndexExpressions(unittest.TestCase):
+
+    def test_contiguous_slices(self):
+        index_exprs = [expr.IndexExpression(i) for i in (3, 1, 2)]
+        reads = extractor.coalesce_index_expressions(index_exprs)
+        self.assertEqual(len(reads), 1)
+        read_index_expr, samples = reads[0]
+        self.assertEqual(read_index_expr.expression, (slice(1, 4),))
+        self.assertEqual(sorted(samples), [(0, (2,)), (1, (0,)), (2, (1,))])
+
+    def test_gap_and_not_coalescable(self):
+        index_exprs = [expr.IndexExpression(0), expr.IndexExpression(5), expr.IndexExpression(-1)]
+        reads = extractor.coalesce_index_expressions(index_exprs)
+        self.assertEqual(len(reads), 3)
+        for read_index_expr, samples in reads:
+            self.assertEqual(len(samples), 1)
+            self.assertIs(read_index_expr, index_exprs[samples[0][0]])
+            self.assertIsNone(samples[0][1])
+
+    def test_overlapping_patches(self):
+        index_exprs = [expr.IndexExpression([(0, 4), (0, 4)]), expr.IndexExpression([(2, 6), (0, 4)])]
+        reads = extractor.coalesce_index_expressions(index_exprs)
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(reads[0][0].expression, (slice(0, 6), slice(0, 4)))
+
+
+class TestExtractBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (3, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assert_batch_equal(self, datasource, items):
+        batch = datasource.get_batch(items)
+        self.assertEqual(len(batch), len(items))
+        for item, extracted in zip(items, batch):
+            expected = datasource[item]
+            self.assertEqual(expected.keys(), extracted.keys())
+            for key in expected:
+                if isinstance(expected[key], np.ndarray):
+                    np.testing.assert_array_equal(expected[key], extracted[key])
+                elif isinstance(expected[key], expr.IndexExpression):
+                    self.assertEqual(expected[key].expression, extracted[key].expression)
+                else:
+                    self.assertEqual(expected[key], extracted[key])
+
+    def test_slices(self):
+        extractor_ = extr.ComposeExtractor([extr.DataExtractor(), extr.SubjectExtractor(), extr.IndexingExtractor()])
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor_)
+        self._assert_batch_equal(datasource, [0, 1, 2, 5, 4, 6, 3])
+
+        # the batch samples must not share memory
+        batch = datasource.get_batch([0, 1])
+        self.assertFalse(np.shares_memory(batch[0][defs.KEY_IMAGES], batch[1][defs.KEY_IMAGES]))
+
+    def test_padded_patches(self):
+        extractor_ = extr.PadDataExtractor((2, 2, 2), extr.DataExtractor(categories=(defs.KEY_LABELS,)))
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.PatchWiseIndexing((2, 3, 4)), extractor_)
+        self._assert_batch_equal(datasource, list(range(len(datasource))))
+
+    def test_stack(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        stacked = datasource.get_batch([1, 5, 2], stack=True)
+        self.assertEqual(stacked[defs.KEY_IMAGES].shape, (3, 6, 8, 2))
+        np.testing.assert_array_equal(stacked[defs.KEY_SAMPLE_INDEX], [1, 5, 2])
+        np.testing.assert_array_equal(stacked[defs.KEY_IMAGES][1], datasource[5][defs.KEY_IMAGES])
+
+    def test_out(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor())
+        out = datasource.create_batch_buffer(4)
+        self.assertEqual(out[defs.KEY_IMAGES].shape, (4, 6, 8, 2))
+
+        stacked = datasource.get_batch([1, 5, 2], out=out)
+        self.assertTrue(np.shares_memory(stacked[defs.KEY_IMAGES], out[defs.KEY_IMAGES]))
+        self.assertEqual(stacked[defs.KEY_IMAGES].shape, (3, 6, 8, 2))
+        for i, item in enumerate([1, 5, 2]):
+            np.testing.assert_array_equal(out[defs.KEY_IMAGES][i], datasource[item][defs.KEY_IMAGES])
+
+    def test_out_padded(self):
+        # a custom pad function cannot pad in place
+        for pad_fn in (None, lambda *args: extr.PadDataExtractor.zero_pad(*args)):
+            extractor_ = extr.PadDataExtractor((1, 2, 2), extr.DataExtractor(categories=(defs.KEY_IMAGES, defs.KEY_LABELS)),
+                                               pad_fn=pad_fn)
+            datasource = extr.PymiaDatasource(self.dataset_path, extr.PatchWiseIndexing((2, 3, 4)), extractor_)
+            out = datasource.create_batch_buffer(len(datasource), (defs.KEY_IMAGES, defs.KEY_LABELS))
+            out[defs.KEY_IMAGES].fill(-1)  # the padding must be overwritten
+            items = list(range(len(datasource)))
+            stacked = datasource.get_batch(items, out=out)
+            np.testing.assert_array_equal(stacked[defs.KEY_SAMPLE_INDEX], items)
+            for item in items:
+                expected = datasource[item]
+                np.testing.assert_array_equal(out[defs.KEY_IMAGES][item], expected[defs.KEY_IMAGES])
+                np.testing.assert_array_equal(out[defs.KEY_LABELS][item], expected[defs.KEY_LABELS])
+
+    def test_out_transform(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.DataExtractor(),
+                                          transform=lambda sample: {**sample, defs.KEY_IMAGES: sample[defs.KEY_IMAGES] * 2})
+        out = {defs.KEY_IMAGES: np.zeros((2, 6, 8, 2), np.float32)}
+        datasource.get_batch([0, 3], out=out)
+        np.testing.assert_array_equal(out[defs.KEY_IMAGES][1], datasource[3][defs.KEY_IMAGES])
+
+
+class TestImagePropertiesExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (3, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_extract(self):
+        datasource = extr.PymiaDatasource(self.dataset_path)
+        extractor_ = extr.ImagePropertiesExtractor()
+        properties = datasource.direct_extract(extractor_, 1)[defs.KEY_PROPERTIES]
+        self.assertEqual(properties.size, (8, 6, 3))
+        self.assertEqual(properties.spacing, (1.0, 1.5, 2.0))
+        self.assertEqual(properties.dimensions, 3)
+
+        # the second extraction is served from the cache
+        self.assertEqual(len(extractor_.cache), 1)
+        cached = datasource.direct_extract(extractor_, 1)[defs.KEY_PROPERTIES]
+        self.assertEqual(properties, cached)
+        self.assertIsNot(properties, cached)
+        self.assertEqual(len(extractor_.cache), 1)
+
+        pickled = datasource.direct_extract(extr.ImagePropertiesExtractor(do_pickle=True), 1)[defs.KEY_PROPERTIES]
+        self.assertEqual(pickle.loads(pickled), properties)
@@ -0,0 +1,155 @@
+import os
+import pickle
+import tempfile
+import unittest
+import unittest.mock
+
+import h5py
+import numpy as np
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.data.indexexpression as expr
+from . import helper
+
+
+class TestIndexTable(unittest.TestCase):
+
+    def _assert_equal_expressions(self, expected: list, table: extr.IndexTable):
+        self.assertEqual(len(expected), len(table))
+        for i, index_expr in enumerate(expected):
+            self.assertEqual(index_expr.expression, table[i][1].expression)
+
+    def test_strategies(self):
+        shape = (4, 5, 6, 2)
+        strategies = [extr.EmptyIndexing(), extr.SliceIndexing(), extr.SliceIndexing((0, 2)), extr.VoxelWiseIndexing(),
+                      extr.PatchWiseIndexing((2, 2, 3)), extr.PatchWiseIndexing((3, 2, 4), ignore_incomplete=False),
+                      extr.PatchWiseIndexing((2, 3, 4), stride=(1, 2, 2))]
+        for strategy in strategies:
+            with self.subTest(strategy=repr(strategy)):
+                self._assert_equal_expressions(strategy(shape), strategy.get_index_table(shape))
+
+    def test_patch_stride(self):
+        strategy = extr.PatchWiseIndexing((2, 3), stride=(1, 2))
+        starts = [e.get_indexing() for e in strategy((3, 6))]
+        self.assertEqual(starts, [[(0, 2), (0, 3)], [(0, 2), (2, 5)], [(1, 3), (0, 3)], [(1, 3), (2, 5)]])
+
+        # incomplete patches cover the entire shape
+        strategy = extr.PatchWiseIndexing((2, 3), ignore_incomplete=False, stride=(1, 2))
+        self.assertEqual(strategy((3, 6))[-1].get_indexing(), [(1, 3), (4, 7)])
+        self.assertEqual(len(strategy((3, 6))), 2 * 3)
+
+    def test_integer_indexing(self):
+        shape = (4, 5, 6, 2)
+        axis, indices = extr.SliceIndexing(1).get_index_table(shape).get_integer_indexing(np.array([3, 1]))
+        self.assertEqual(axis, 1)
+        np.testing.assert_array_equal(indices, [[3], [1]])
+
+        axis, indices = extr.VoxelWiseIndexing().get_index_table(shape).get_integer_indexing(np.array([7]))
+        self.assertEqual(axis, 0)
+        np.testing.assert_array_equal(indices, [[0, 1, 1]])
+
+        self.assertIsNone(extr.PatchWiseIndexing((2, 2, 3)).get_index_table(shape).get_integer_indexing([0, 1]))
+        self.assertIsNone(extr.SliceIndexing((0, 2)).get_index_table(shape).get_integer_indexing([0, 5]))
+
+    def test_from_expressions(self):
+        expressions = [expr.IndexExpression(), expr.IndexExpression(3, axis=1),
+                       expr.IndexExpression([(1, 4), slice(None), 2]), expr.IndexExpression([slice(2, None)])]
+        table = extr.IndexTable.from_expressions(expressions, subject_index=3)
+        self._assert_equal_expressions(expressions, table)
+        self.assertEqual(table[-1][0], 3)
+
+    def test_concatenate(self):
+        table = extr.SliceIndexing().get_index_table((3, 4))
+        concatenated = extr.IndexTable.concatenate([table, extr.EmptyIndexing().get_index_table((3, 4)), table],
+                                                   [0, 2, 5])
+        self.assertEqual(len(concatenated), 7)
+        self.assertEqual([s for s, _ in concatenated], [0, 0, 0, 2, 5, 5, 5])
+        self.assertEqual(concatenated[3][1].expression, slice(None))
+        self.assertEqual(concatenated[6][1].expression, (2,))
+        with self.assertRaises(IndexError):
+            concatenated[7]
+
+    def test_pickle(self):
+        table = extr.VoxelWiseIndexing().get_index_table((3, 4, 5))
+        unpickled = pickle.loads(pickle.dumps(table))
+        self.assertEqual(unpickled[17][1].expression, table[17][1].expression)
+
+
+class TestDatasourceIndices(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (4, 6, 8), (2, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_indices(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(),
+                                          extr.DataExtractor(categories=(defs.KEY_IMAGES,)),
+                                          subject_subset=['Subject_1', 'Subject_3'])
+        self.assertEqual(len(datasource), 6)
+        self.assertEqual([s for s, _ in datasource.indices], [0, 0, 0, 0, 2, 2])
+
+        sample = datasource[5]
+        self.assertEqual(sample[defs.KEY_IMAGES].shape, (6, 8, 2))
+        np.testing.assert_array_equal(sample[defs.KEY_IMAGES],
+                                      datasource.direct_extract(extr.DataExtractor(), 2)[defs.KEY_IMAGES][1])
+        datasource.close_reader()
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (2, 6, 8)])
+        self.cache_path = os.path.join(self.tmp_dir.name, 'indices.cache')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cache_hit(self):
+        strategy = extr.PatchWiseIndexing((2, 3, 4))
+        datasource = extr.PymiaDatasource(self.dataset_path, strategy, index_cache_path=self.cache_path)
+        self.assertTrue(os.path.isfile(self.cache_path))
+
+        with unittest.mock.patch.object(extr.Hdf5Reader, 'get_shape') as get_shape:
+            cached = extr.PymiaDatasource(self.dataset_path, strategy, index_cache_path=self.cache_path)
+            get_shape.assert_not_called()
+
+        self.assertEqual(len(cached), len(datasource))
+        for (s1, e1), (s2, e2) in zip(datasource.indices, cached.indices):
+            self.assertEqual(s1, s2)
+            self.assertEqual(e1.expression, e2.expression)
+
+    def test_cache_key(self):
+        cache = extr.IndexCache(self.cache_path)
+        key = cache.get_key(extr.SliceIndexing(), None, self.dataset_path)
+        self.assertNotEqual(key, cache.get_key(extr.SliceIndexing(1), None, self.dataset_path))
+        self.assertNotEqual(key, cache.get_key(extr.SliceIndexing(), ['Subject_1'], self.dataset_path))
+        self.assertEqual(cache.get_key(extr.SliceIndexing(), ['Subject_2', 'Subject_1'], self.dataset_path),
+                         cache.get_key(extr.SliceIndexing(), ['Subject_1', 'Subject_2'], self.dataset_path))
+
+        self.assertIsNone(cache.load(key))
+        cache.save(key, extr.SliceIndexing().get_index_table((4, 6, 8)))
+        self.assertEqual(len(cache.load(key)), 4)
+
+    def test_shared_cache(self):
+        # the indices of two datasets sharing the cache file must not evict each other
+        other_path = helper.create_dataset(self.tmp_dir.name, [(3, 6, 8)], file_name='other.h5')
+        strategy = extr.SliceIndexing()
+        for dataset_path in (self.dataset_path, other_path):
+            extr.PymiaDatasource(dataset_path, strategy, index_cache_path=self.cache_path)
+
+        cache = extr.IndexCache(self.cache_path)
+        self.assertEqual(len(cache.load(cache.get_key(strategy, None, self.dataset_path))), 6)
+        self.assertEqual(len(cache.load(cache.get_key(strategy, None, other_path))), 3)
+
+        # outdated entries of the same dataset are removed
+        outdated_key = cache.get_key(strategy, None, other_path)
+        os.utime(other_path, ns=(0, 0))
+        extr.PymiaDatasource(other_path, strategy, index_cache_path=self.cache_path)
+        self.assertIsNone(cache.load(outdated_key))
+        with h5py.File(self.cache_path, 'r') as h5:
+            self.assertEqual(len(h5['indices']), 2)
@@ -0,0 +1,140 @@
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.data.indexexpression as expr
+import pymia.data.transformation as tfm
+from . import helper
+
+
+class TestHdf5Reader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (2, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_preload_meta(self):
+        entries = [defs.LOC_SUBJECT, defs.LOC_FILES_ROOT, defs.LOC_IMGPROP_SPACING,
+                   defs.LOC_NAMES_PLACEHOLDER.format(defs.KEY_IMAGES), defs.LOC_FILES_PLACEHOLDER.format(defs.KEY_LABELS)]
+        with extr.Hdf5Reader(self.dataset_path) as reader, \
+                extr.Hdf5Reader(self.dataset_path, preload_meta=True) as preloaded:
+            self.assertIn(defs.LOC_SUBJECT, preloaded.meta)
+            self.assertEqual(reader.get_subjects(), preloaded.get_subjects())
+            self.assertEqual(reader.get_subject_entries(), preloaded.get_subject_entries())
+            self.assertEqual(reader.get_shape(1), preloaded.get_shape(1))
+            for entry in entries:
+                for index in (None, expr.IndexExpression(1)) if entry != defs.LOC_FILES_ROOT else (None,):
+                    expected, actual = reader.read(entry, index), preloaded.read(entry, index)
+                    if isinstance(expected, np.ndarray):
+                        np.testing.assert_array_equal(expected, actual)
+                    else:
+                        self.assertEqual(expected, actual)
+
+            # modifications of read data must not alter the preloaded data
+            shape = preloaded.read(defs.LOC_IMGPROP_SHAPE, expr.IndexExpression(0))
+            shape[0] = 0
+            self.assertNotEqual(preloaded.read(defs.LOC_IMGPROP_SHAPE, expr.IndexExpression(0))[0], 0)
+
+        self.assertEqual(preloaded.meta, {})
+
+    def test_datasource_pickle(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extr.SubjectExtractor())
+        self.assertEqual(datasource[4][defs.KEY_SUBJECT], 'Subject_2')
+        self.assertIsNotNone(datasource.reader)
+        self.assertEqual(datasource.get_subjects(), ['Subject_1', 'Subject_2'])
+
+        unpickled = pickle.loads(pickle.dumps(datasource))
+        self.assertIsNone(unpickled.reader)
+        self.assertEqual(unpickled[4][defs.KEY_SUBJECT], 'Subject_2')
+        datasource.close_reader()
+        unpickled.close_reader()
+
+
+class TestVolumeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (2, 6, 8)])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lru(self):
+        cache = extr.VolumeCache(250)
+        volumes = {key: np.zeros(100, np.uint8) for key in 'abc'}
+        for key in 'abac':
+            cache.get(key, lambda: volumes[key].copy())
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 3, 1))
+        self.assertEqual(cache.nbytes, 200)
+
+        # 'b' was least recently used and evicted
+        cache.get('a', lambda: self.fail('a is cached'))
+        cache.get('b', lambda: volumes['b'].copy())
+        self.assertEqual(cache.misses, 4)
+
+        # volumes exceeding the budget are not cached
+        cache.get('d', lambda: np.zeros(300, np.uint8))
+        self.assertEqual(len(cache), 2)
+
+        restored = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((len(restored), restored.max_bytes), (0, 250))
+
+    def test_datasource(self):
+        extractor = extr.DataExtractor(categories=(defs.KEY_IMAGES, defs.KEY_LABELS))
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor, volume_cache_size=10 ** 6)
+        uncached = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor)
+
+        for epoch in range(2):
+            for i in range(len(datasource)):
+                sample, expected = datasource[i], uncached[i]
+                np.testing.assert_array_equal(sample[defs.KEY_IMAGES], expected[defs.KEY_IMAGES])
+                np.testing.assert_array_equal(sample[defs.KEY_LABELS], expected[defs.KEY_LABELS])
+                self.assertTrue(sample[defs.KEY_IMAGES].flags.writeable)
+
+        cache = datasource.volume_cache
+        self.assertEqual(cache.misses, 4)  # two subjects, two categories
+        self.assertEqual(cache.hits, 2 * 2 * len(datasource) - 4)
+
+        out = datasource.create_batch_buffer(2, (defs.KEY_LABELS, ))
+        datasource.get_batch([4, 5], out=out)
+        np.testing.assert_array_equal(out[defs.KEY_LABELS][1], uncached[5][defs.KEY_LABELS])
+        datasource.close_reader()
+        uncached.close_reader()
+
+    def test_transform(self):
+        # in-place transforms must neither fail nor modify the cached volumes
+        extractor = extr.DataExtractor(categories=(defs.KEY_IMAGES, defs.KEY_LABELS))
+        transform = tfm.ComposeTransform([tfm.Relabel({1: 2}), tfm.ClipPercentile(90)])
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor, transform,
+                                          volume_cache_size=10 ** 6)
+        uncached = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor, transform)
+
+        for epoch in range(2):
+            for i in range(len(datasource)):
+                sample, expected = datasource[i], uncached[i]
+                np.testing.assert_array_equal(sample[defs.KEY_IMAGES], expected[defs.KEY_IMAGES])
+                np.testing.assert_array_equal(sample[defs.KEY_LABELS], expected[defs.KEY_LABELS])
+        self.assertGreater(datasource.volume_cache.hits, 0)
+        datasource.close_reader()
+        uncached.close_reader()
+
+    def test_too_large(self):
+        # the images (float32) exceed the budget and are read partially, the labels (uint8) are cached
+        extractor = extr.DataExtractor(categories=(defs.KEY_IMAGES, defs.KEY_LABELS))
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor, volume_cache_size=700)
+        uncached = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(), extractor)
+
+        for i in range(len(datasource)):
+            np.testing.assert_array_equal(datasource[i][defs.KEY_IMAGES], uncached[i][defs.KEY_IMAGES])
+        cache = datasource.volume_cache
+        self.assertEqual(cache.misses, 2)  # only the labels of the two subjects
+        self.assertEqual(len(cache), 2)
+        datasource.close_reader()
+        uncached.close_reader()
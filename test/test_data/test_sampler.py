@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+import unittest.mock as mock
+
+import numpy as np
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+from . import helper
+
+
+class TestPatchQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (4, 6, 8), (2, 6, 8)])
+        extractor = extr.ComposeExtractor([extr.DataExtractor(categories=(defs.KEY_IMAGES, defs.KEY_LABELS)),
+                                           extr.SubjectExtractor()])
+        self.datasource = extr.PymiaDatasource(self.dataset_path, extr.PatchWiseIndexing((2, 3, 4)), extractor)
+
+    def tearDown(self):
+        self.datasource.close_reader()
+        self.tmp_dir.cleanup()
+
+    def _assert_samples(self, samples):
+        for sample in samples:
+            expected = self.datasource[sample[defs.KEY_SAMPLE_INDEX]]
+            np.testing.assert_array_equal(sample[defs.KEY_IMAGES], expected[defs.KEY_IMAGES])
+            np.testing.assert_array_equal(sample[defs.KEY_LABELS], expected[defs.KEY_LABELS])
+            self.assertEqual(sample[defs.KEY_SUBJECT], expected[defs.KEY_SUBJECT])
+
+    def test_sequential(self):
+        queue = extr.PatchQueue(self.datasource, shuffle=False)
+        samples = list(queue)
+        self.assertEqual(len(queue), len(self.datasource))
+        self.assertEqual([s[defs.KEY_SAMPLE_INDEX] for s in samples], list(range(len(self.datasource))))
+        self._assert_samples(samples)
+
+    def test_shuffle(self):
+        queue = extr.PatchQueue(self.datasource, samples_per_subject=5, max_subjects=2, buffer_size=4, seed=1)
+        self.assertEqual(len(queue), 5 + 5 + 4)
+
+        for epoch in range(2):
+            samples = list(queue)
+            sample_indices = [s[defs.KEY_SAMPLE_INDEX] for s in samples]
+            self.assertEqual(len(samples), len(queue))
+            self.assertEqual(len(set(sample_indices)), len(samples))
+            subjects = [s[defs.KEY_SUBJECT] for s in samples]
+            self.assertEqual(sorted(set(subjects)), ['Subject_1', 'Subject_2', 'Subject_3'])
+            self.assertEqual(subjects.count('Subject_3'), 4)
+            self.assertNotEqual(sample_indices, sorted(sample_indices))
+            self._assert_samples(samples)
+
+    def test_subject_read_once(self):
+        queue = extr.PatchQueue(self.datasource, max_subjects=2, seed=0)
+        with mock.patch.object(extr.VolumeCache, 'get', autospec=True, side_effect=extr.VolumeCache.get) as get:
+            samples = list(queue)
+        self.assertEqual(len(samples), len(self.datasource))
+        caches = {call.args[0] for call in get.call_args_list}
+        self.assertEqual(len(caches), 3)  # one per subject
+        self.assertTrue(all(cache.misses == 2 for cache in caches))  # one read per category
+
+    def test_reader_per_thread(self):
+        # the readers (and their preloaded meta-data) are reused for the subjects loaded by the same thread
+        queue = extr.PatchQueue(self.datasource, max_subjects=3, num_workers=2, seed=0)
+        get_reader = extr.reader.get_reader
+        with mock.patch.object(extr.reader, 'get_reader', side_effect=get_reader) as patched:
+            samples = list(queue)
+        self.assertEqual(len(samples), len(self.datasource))
+        self.assertIn(patched.call_count, (1, 2))
+        self.assertEqual(queue._readers, [])  # closed after the iteration
@@ -0,0 +1,354 @@
+import concurrent.futures as futures
+import tempfile
+import unittest
+import unittest.mock
+import warnings
+
+import numpy as np
+import SimpleITK as sitk
+
+import h5py
+
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.evaluation.evaluator as eval_
+import pymia.evaluation.metric as metric
+from ..test_data import helper
+
+
+class TestContingencyTable(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.prediction = rs.randint(0, 5, (6, 7, 8)).astype(np.uint8)
+        self.reference = rs.randint(0, 5, (6, 7, 8)).astype(np.uint8)
+
+    def _assert_confusion_matrix(self, label, prediction, reference, table):
+        expected = metric.ConfusionMatrix(np.in1d(prediction.ravel(), label).astype(np.uint8),
+                                          np.in1d(reference.ravel(), label).astype(np.uint8))
+        actual = table.get_confusion_matrix(label)
+        self.assertEqual((actual.tp, actual.tn, actual.fp, actual.fn, actual.n),
+                         (expected.tp, expected.tn, expected.fp, expected.fn, expected.n))
+
+    def test_confusion_matrix(self):
+        table = metric.ContingencyTable(self.prediction, self.reference)
+        self.assertEqual(table.table.sum(), self.prediction.size)
+        for label in (0, 1, 4, 7, (1, 2), (0, 3, 4), (2, 9)):
+            with self.subTest(label=label):
+                self._assert_confusion_matrix(label, self.prediction, self.reference, table)
+
+    def test_offset_and_types(self):
+        prediction = self.prediction.astype(np.int16) - 2
+        reference = self.reference.astype(np.uint64)
+        table = metric.ContingencyTable(prediction, reference)
+        for label in (-2, 0, 2, (-1, 4)):
+            with self.subTest(label=label):
+                self._assert_confusion_matrix(label, prediction, reference, table)
+
+        table = metric.ContingencyTable(self.prediction > 2, self.reference > 2)
+        self._assert_confusion_matrix(1, self.prediction > 2, self.reference > 2, table)
+
+    def test_not_supported(self):
+        with self.assertRaises(ValueError):
+            metric.ContingencyTable(self.prediction.astype(np.float32), self.reference)
+        with self.assertRaises(ValueError):
+            metric.ContingencyTable(self.prediction.astype(np.int32) * 1000, self.reference)
+
+
+class TestSegmentationEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.reference = np.zeros((10, 12, 14), np.uint8)
+        self.reference[2:8, 3:9, 4:10] = 1
+        self.reference[4:6, 5:7, 6:8] = 2
+        self.prediction = self.reference.copy()
+        self.prediction[rs.rand(*self.reference.shape) < 0.05] = 3
+        self.labels = {1: 'ONE', 2: 'TWO', (1, 2): 'ONE_TWO'}
+
+    def _evaluate(self, prediction, reference, metrics):
+        evaluator = eval_.SegmentationEvaluator(metrics, dict(self.labels))
+        evaluator.evaluate(prediction, reference, 'subject')
+        return {(r.label, r.metric): r.value for r in evaluator.results}
+
+    def test_contingency_table_equivalent(self):
+        metrics = [metric.DiceCoefficient(), metric.TruePositive(), metric.TrueNegative(), metric.FalsePositive(),
+                   metric.FalseNegative(), metric.Accuracy(), metric.JaccardCoefficient(),
+                   metric.HausdorffDistance(percentile=95), metric.PredictionVolume()]
+        results = self._evaluate(self.prediction, self.reference, metrics)
+        # floating point images are evaluated with the binary images of each label
+        expected = self._evaluate(self.prediction.astype(np.float32), self.reference.astype(np.float32), metrics)
+        self.assertEqual(results.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(results[key], value, msg=key)
+
+    def test_crop_equivalent(self):
+        metrics = [metric.TrueNegative(), metric.Specificity(), metric.DiceCoefficient(), metric.AverageDistance(),
+                   metric.MahalanobisDistance(), metric.PredictionVolume(), metric.ReferenceVolume(),
+                   metric.PredictionArea(), metric.InterclassCorrelation()]
+        prediction = np.pad(self.prediction, 8).astype(np.float32)
+        reference = np.pad(self.reference, 8).astype(np.float32)
+        self.labels[4] = 'EMPTY'
+        for crop in (True, False):
+            evaluator = eval_.SegmentationEvaluator(metrics, dict(self.labels), crop=crop)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', metric.NotComputableMetricWarning)
+                evaluator.evaluate(prediction, reference, 'subject')
+            if crop:
+                results = {(r.label, r.metric): r.value for r in evaluator.results}
+            else:
+                expected = {(r.label, r.metric): r.value for r in evaluator.results}
+
+        self.assertEqual(results.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(results[key], value, msg=key)
+        self.assertEqual(results[('EMPTY', 'TN')], prediction.size)
+
+    def test_intermediates(self):
+        with unittest.mock.patch.object(eval_, '_get_label_array', wraps=eval_._get_label_array) as get_label_array:
+            self._evaluate(self.prediction, self.reference, [metric.DiceCoefficient(), metric.Accuracy()])
+            get_label_array.assert_not_called()  # derived from the contingency table
+
+            with unittest.mock.patch.object(metric.base, '_get_moments', wraps=metric.base._get_moments) as moments:
+                metrics = [metric.MahalanobisDistance(), metric.AverageDistance(), metric.MahalanobisDistance('M2')]
+                results = self._evaluate(self.prediction, self.reference, metrics)
+            # the binary images and the moments are computed once per label
+            self.assertEqual(get_label_array.call_count, 2 * len(self.labels))
+            self.assertEqual(moments.call_count, 2 * len(self.labels))
+        for m in metrics:
+            self.assertIsNone(m.intermediates)
+
+        # equal to the metric without evaluator
+        mahalanobis = metric.MahalanobisDistance()
+        mahalanobis.prediction = (self.prediction == 2).astype(np.uint8)
+        mahalanobis.reference = (self.reference == 2).astype(np.uint8)
+        self.assertAlmostEqual(results[('TWO', 'MAHLNBS')], mahalanobis.calculate())
+        self.assertEqual(results[('TWO', 'MAHLNBS')], results[('TWO', 'M2')])
+
+    def test_image(self):
+        image_prediction = sitk.GetImageFromArray(self.prediction)
+        image_reference = sitk.GetImageFromArray(self.reference)
+        results = self._evaluate(image_prediction, image_reference, [metric.DiceCoefficient()])
+        expected = self._evaluate(self.prediction, self.reference, [metric.DiceCoefficient()])
+        self.assertEqual(results, expected)
+
+    def test_reference_cache(self):
+        metrics = [metric.HausdorffDistance(percentile=95), metric.AverageDistance(), metric.SurfaceDiceOverlap()]
+        evaluator = eval_.SegmentationEvaluator(metrics, dict(self.labels), reference_cache_size=len(self.labels))
+        with unittest.mock.patch.object(metric.Surface, '__init__', autospec=True,
+                                        side_effect=metric.Surface.__init__) as init:
+            evaluator.evaluate(self.prediction, self.reference, 'subject')
+            self.assertEqual(init.call_count, 2 * len(self.labels))
+            # only the surfaces of the prediction are computed
+            evaluator.evaluate(self.prediction, self.reference, 'subject')
+            self.assertEqual(init.call_count, 3 * len(self.labels))
+
+        expected = self._evaluate(self.prediction, self.reference, metrics)
+        for result in evaluator.results:
+            self.assertEqual(result.value, expected[(result.label, result.metric)])
+
+        # the least recently used surfaces are removed
+        evaluator.evaluate(self.prediction, self.reference, 'other')
+        self.assertEqual({key[0] for key in evaluator._reference_surfaces}, {'other'})
+        evaluator.clear_reference_cache()
+        self.assertEqual(len(evaluator._reference_surfaces), 0)
+
+    def test_evaluate_many(self):
+        metrics = [metric.DiceCoefficient(), metric.HausdorffDistance(percentile=95), metric.PredictionVolume()]
+        rs = np.random.RandomState(1)
+        cases = []
+        for i in range(6):
+            prediction = self.reference.copy()
+            prediction[rs.rand(*self.reference.shape) < 0.1] = 0
+            cases.append((prediction, self.reference, 'subject{}'.format(i)))
+
+        expected = eval_.SegmentationEvaluator(metrics, dict(self.labels))
+        for case in cases:
+            expected.evaluate(*case)
+
+        evaluator = eval_.SegmentationEvaluator(metrics, dict(self.labels), reference_cache_size=2)
+        evaluator.evaluate_many(cases, num_workers=3)
+        self.assertEqual([(r.id_, r.label, r.metric, r.value) for r in evaluator.results],
+                         [(r.id_, r.label, r.metric, r.value) for r in expected.results])
+        self.assertEqual(len(evaluator._reference_surfaces), 2)  # shared with the threads
+
+        evaluator.clear()
+        with futures.ProcessPoolExecutor(max_workers=2) as executor:
+            for case in reversed(cases):
+                evaluator.submit(executor, *case)
+            evaluator.wait()
+        self.assertEqual([r.id_ for r in evaluator.results][::len(metrics) * len(self.labels)],
+                         ['subject{}'.format(i) for i in reversed(range(6))])
+
+    def test_submit_error(self):
+        evaluator = eval_.SegmentationEvaluator([metric.DiceCoefficient()], dict(self.labels))
+        with futures.ThreadPoolExecutor() as executor:
+            evaluator.submit(executor, self.prediction, self.reference[1:], 'error')
+            evaluator.submit(executor, self.prediction, self.reference, 'subject')
+            with self.assertRaises(ValueError):
+                evaluator.wait()
+        self.assertEqual({r.id_ for r in evaluator.results}, {'subject'})
+
+
+class TestAccumulatingEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (3, 6, 8)])
+        self.metrics = [metric.DiceCoefficient(), metric.TrueNegative(), metric.Specificity()]
+        self.labels = {1: 'ONE', 2: 'TWO', (1, 2): 'ONE_TWO'}
+
+        labels = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+        self.references = [labels[i][defs.KEY_LABELS] for i in range(2)]
+        self.predictions = [np.roll(reference, 1, axis=2) for reference in self.references]
+
+        expected = eval_.SegmentationEvaluator(self.metrics, dict(self.labels))
+        for i, subject in enumerate(('Subject_1', 'Subject_2')):
+            expected.evaluate(self.predictions[i], self.references[i], subject)
+        self.expected = [(r.id_, r.label, r.metric, r.value) for r in expected.results]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _assert_results(self, results):
+        self.assertEqual([(r.id_, r.label, r.metric) for r in results], [e[:3] for e in self.expected])
+        for result, expected in zip(results, self.expected):
+            self.assertAlmostEqual(result.value, expected[3])
+
+    def test_add_batch(self):
+        datasource = extr.PymiaDatasource(self.dataset_path, extr.PatchWiseIndexing((1, 3, 8)),
+                                          extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+        order = np.random.RandomState(0).permutation(len(datasource))
+        for channel in (True, False):
+            with self.subTest(channel=channel):
+                evaluator = eval_.AccumulatingEvaluator(self.metrics, dict(self.labels), datasource)
+                completed = []
+                for start in range(0, len(order), 5):
+                    items = order[start:start + 5]
+                    batch = datasource.get_batch(items, stack=True)
+                    predictions = np.stack([self.predictions[s][datasource.indices.get_index_expression(i).expression]
+                                            for s, i in zip(datasource.indices.subject_indices[items], items)])
+                    if not channel:
+                        predictions = predictions[..., 0]  # e.g., the argmax of the network output
+                    results = evaluator.add_batch(predictions, batch[defs.KEY_LABELS], items)
+                    completed.extend(sorted({r.id_ for r in results}))
+                    # a subject is completed as soon as all its samples are added
+                    self.assertEqual(len(results),
+                                     len(self.metrics) * len(self.labels) * len({r.id_ for r in results}))
+
+                self.assertEqual(sorted(completed), ['Subject_1', 'Subject_2'])
+                self.assertEqual(evaluator.counts, {})
+                self._assert_results(sorted(evaluator.results, key=lambda r: r.id_))
+
+    def test_chunked(self):
+        evaluator = eval_.AccumulatingEvaluator(self.metrics, dict(self.labels))
+        with h5py.File(self.dataset_path, 'r') as dataset:
+            for i, subject in enumerate(('Subject_1', 'Subject_2')):
+                # the prediction without channel dimension
+                evaluator.evaluate_chunked(self.predictions[i][..., 0], dataset['data/labels/{}'.format(i)], subject,
+                                           chunk_size=2)
+        self._assert_results(evaluator.results)
+
+    def test_not_supported(self):
+        with self.assertRaises(ValueError):
+            eval_.AccumulatingEvaluator([metric.HausdorffDistance()], dict(self.labels))
+        evaluator = eval_.AccumulatingEvaluator(self.metrics, dict(self.labels))
+        with self.assertRaises(ValueError):
+            evaluator.accumulate(self.predictions[0], self.references[0][1:], 'Subject_1')
+        with self.assertRaises(ValueError):
+            evaluator.add_batch(self.predictions[0], self.references[0], np.arange(4))
+
+
+class TestRegressionEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.reference = (rs.rand(10, 12, 14) * 100).astype(np.float32)
+        self.prediction = self.reference + rs.randn(10, 12, 14).astype(np.float32)
+        self.metrics = [metric.MeanAbsoluteError(), metric.MeanSquaredError(), metric.RootMeanSquaredError(),
+                        metric.NormalizedRootMeanSquaredError(), metric.CoefficientOfDetermination(),
+                        metric.PeakSignalToNoiseRatio()]
+
+    def _get_expected(self, prediction, reference):
+        prediction, reference = prediction.astype(np.float64), reference.astype(np.float64)
+        mse = np.mean(np.square(reference - prediction))
+        return {'MAE': np.mean(np.abs(reference - prediction)),
+                'MSE': mse,
+                'RMSE': np.sqrt(mse),
+                'NRMSE': np.sqrt(mse) / (reference.max() - reference.min()),
+                'R2': 1 - mse * reference.size / ((reference.size - 1) * np.var(reference, ddof=1)),
+                'PSNR': 10 * np.log10(reference.max() ** 2 / mse)}
+
+    def test_evaluate(self):
+        evaluator = eval_.RegressionEvaluator(self.metrics, chunk_size=100)
+        evaluator.evaluate(self.prediction, self.reference, 'subject')
+        expected = self._get_expected(self.prediction, self.reference)
+        self.assertEqual([r.metric for r in evaluator.results], list(expected.keys()))
+        for result in evaluator.results:
+            self.assertEqual(result.label, 'ALL')
+            self.assertAlmostEqual(result.value, expected[result.metric], delta=1e-5 * abs(expected[result.metric]))
+
+        # the metrics without evaluator
+        for m in self.metrics:
+            m.prediction, m.reference = self.prediction, self.reference
+            self.assertAlmostEqual(m.calculate(), expected[m.metric], delta=1e-5 * abs(expected[m.metric]))
+
+    def test_mask(self):
+        mask = np.zeros(self.reference.shape, np.uint8)
+        mask[2:8, 3:9, 4:10] = 1
+        evaluator = eval_.RegressionEvaluator(self.metrics, label='ROI')
+        evaluator.evaluate(sitk.GetImageFromArray(self.prediction), sitk.GetImageFromArray(self.reference), 'subject',
+                           mask=sitk.GetImageFromArray(mask))
+        expected = self._get_expected(self.prediction[mask == 1], self.reference[mask == 1])
+        for result in evaluator.results:
+            self.assertAlmostEqual(result.value, expected[result.metric], delta=1e-5 * abs(expected[result.metric]))
+
+    def test_empty_mask(self):
+        evaluator = eval_.RegressionEvaluator(self.metrics)
+        with self.assertWarns(metric.NotComputableMetricWarning):
+            evaluator.evaluate(self.prediction, self.reference, 'subject', mask=np.zeros(self.reference.shape))
+        expected = {'MAE': np.inf, 'MSE': np.inf, 'RMSE': np.inf, 'NRMSE': np.inf, 'R2': -np.inf, 'PSNR': -np.inf}
+        self.assertEqual({r.metric: r.value for r in evaluator.results}, expected)
+
+    def test_constant_reference(self):
+        reference = np.full(self.reference.shape, 5.0)
+        evaluator = eval_.RegressionEvaluator(self.metrics)
+        with self.assertWarns(metric.NotComputableMetricWarning):
+            evaluator.evaluate(self.prediction, reference, 'subject')
+        results = {r.metric: r.value for r in evaluator.results}
+        self.assertEqual(results['NRMSE'], np.inf)
+        self.assertEqual(results['R2'], -np.inf)
+        self.assertAlmostEqual(results['MSE'], self._get_expected(self.prediction, reference)['MSE'], places=3)
+
+    def test_ssim_mask(self):
+        mask = np.zeros(self.reference.shape, np.uint8)
+        mask[2:8, 3:9, 4:10] = 1
+        evaluator = eval_.RegressionEvaluator([metric.StructuralSimilarityIndexMeasure()])
+        evaluator.evaluate(self.prediction, self.reference, 'subject')
+        evaluator.evaluate(self.prediction, self.reference, 'subject', mask=mask)
+        self.assertNotAlmostEqual(evaluator.results[0].value, evaluator.results[1].value)
+
+        mask[3:7, 3:9, 3:11] = 0  # only voxels at the border, where the structural similarity is not defined
+        with self.assertWarns(metric.NotComputableMetricWarning):
+            evaluator.evaluate(self.prediction, self.reference, 'subject', mask=mask)
+        self.assertEqual(evaluator.results[2].value, float('-inf'))
+
+    def test_evaluate_many(self):
+        mask = np.zeros(self.reference.shape, np.uint8)
+        mask[2:8, 3:9, 4:10] = 1
+        cases = [(self.prediction, self.reference, 'all'), (self.prediction, self.reference, 'masked', {'mask': mask})]
+        evaluator = eval_.RegressionEvaluator(self.metrics)
+        evaluator.evaluate_many(cases, num_workers=2)
+
+        expected = eval_.RegressionEvaluator(self.metrics)
+        expected.evaluate(self.prediction, self.reference, 'all')
+        expected.evaluate(self.prediction, self.reference, 'masked', mask=mask)
+        self.assertEqual([(r.id_, r.metric, r.value) for r in evaluator.results],
+                         [(r.id_, r.metric, r.value) for r in expected.results])
+
+    def test_not_supported(self):
+        with self.assertRaises(ValueError):
+            eval_.RegressionEvaluator([metric.DiceCoefficient()])
+        evaluator = eval_.RegressionEvaluator(self.metrics)
+        with self.assertRaises(ValueError):
+            evaluator.evaluate(self.prediction, self.reference, 'subject', mask=np.ones((2, 2)))
@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+import scipy.ndimage as ndimage
+import skimage.metrics
+
+import pymia.evaluation.metric as metric
+import pymia.evaluation.metric.base as base
+
+
+class TestDistances(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.reference = np.zeros((12, 14, 16), np.uint8)
+        self.reference[3:9, 4:10, 5:12] = 1
+        self.prediction = np.zeros_like(self.reference)
+        self.prediction[4:10, 4:11, 6:12] = 1
+        self.prediction[rs.rand(*self.reference.shape) < 0.01] = 1
+
+    def test_neighbour_code_map(self):
+        kernel = np.array([[[128, 64], [32, 16]], [[8, 4], [2, 1]]])
+        padded = np.pad(self.reference, ((0, 1), ) * 3)
+        expected = ndimage.correlate(padded, kernel, mode='constant', cval=0)
+        np.testing.assert_array_equal(base._get_neighbour_code_map(self.reference), expected)
+
+    def test_bounding_box(self):
+        self.assertEqual(metric.get_bounding_box(self.reference), (slice(3, 9), slice(4, 10), slice(5, 12)))
+        other = np.zeros_like(self.reference)
+        other[10, 1, 6] = 1
+        self.assertEqual(metric.get_bounding_box(self.reference, other), (slice(3, 11), slice(1, 10), slice(5, 12)))
+        self.assertIsNone(metric.get_bounding_box(np.zeros_like(self.reference)))
+
+    def test_surface_distances(self):
+        spacing = (1.0, 1.5, 0.7)
+        prediction = np.zeros((30, 30, 30), np.uint8)
+        prediction[5:20, 8:25, 6:22] = 1
+        reference = np.zeros_like(prediction)
+        reference[7:22, 8:23, 5:24] = 1
+        borders = base._get_neighbour_code_map(prediction) % 255 != 0
+        at = base._get_neighbour_code_map(reference) % 255 != 0
+        expected = ndimage.distance_transform_edt(~borders, sampling=spacing)[at]
+        surface = metric.Surface(prediction, spacing)
+        np.testing.assert_array_equal(surface.points, np.argwhere(borders))
+
+        # sparse surfaces use the nearest neighbour search
+        self.assertLess(len(surface.points) * 16, borders.size)
+        np.testing.assert_array_equal(surface.get_distances(np.argwhere(at)), expected)
+
+        # dense surfaces use the distance transform, unless the search tree is already built
+        dense = np.ones_like(borders)
+        dense[1::2, 1::2, 1::2] = False
+        expected = ndimage.distance_transform_edt(~dense, sampling=spacing)[at]
+        surface = metric.Surface(np.zeros_like(prediction), spacing)
+        surface.points = np.argwhere(dense)
+        np.testing.assert_array_equal(surface.get_distances(np.argwhere(at)), expected)
+        self.assertIsNotNone(surface.tree)
+        np.testing.assert_array_equal(surface.get_distances(np.argwhere(at)), expected)
+
+    def test_reference_surface(self):
+        spacing = (1.0, 1.5, 0.7)
+        surface = metric.Surface(self.reference, spacing)
+        expected = metric.Distances(self.prediction, self.reference, spacing)
+        actual = metric.Distances(self.prediction, None, spacing, reference_surface=surface)
+        for attr in ('distances_gt_to_pred', 'distances_pred_to_gt', 'surfel_areas_gt', 'surfel_areas_pred'):
+            np.testing.assert_array_equal(getattr(actual, attr), getattr(expected, attr))
+
+    def test_sorted(self):
+        distances = metric.Distances(self.prediction, self.reference, (1.0, 1.5, 0.7))
+        for d, areas in ((distances.distances_gt_to_pred, distances.surfel_areas_gt),
+                         (distances.distances_pred_to_gt, distances.surfel_areas_pred)):
+            self.assertEqual(len(d), len(areas))
+            self.assertTrue(np.all(np.diff(d) >= 0))
+            self.assertTrue(np.all(areas > 0))
+
+    def test_surface_area(self):
+        # the surface area of a box is independent of the voxel corners
+        reference = np.zeros((8, 8, 8), np.uint8)
+        reference[2:6, 2:6, 2:6] = 1
+        distances = metric.Distances(reference, reference, (1.0, 1.0, 1.0))
+        np.testing.assert_array_equal(distances.distances_gt_to_pred, 0)
+        self.assertAlmostEqual(distances.surfel_areas_gt.sum(), distances.surfel_areas_pred.sum())
+        self.assertGreater(distances.surfel_areas_gt.sum(), 0)
+
+    def test_empty(self):
+        empty = np.zeros_like(self.reference)
+        distances = metric.Distances(empty, empty, (1.0, 1.0, 1.0))
+        self.assertIsNone(distances.distances_gt_to_pred)
+
+        distances = metric.Distances(empty, self.reference, (1.0, 1.0, 1.0))
+        self.assertTrue(np.all(np.isinf(distances.distances_gt_to_pred)))
+        self.assertEqual(len(distances.distances_pred_to_gt), 0)
+
+    def test_2d(self):
+        distances = metric.Distances(self.prediction[5], self.reference[5], (1.0, 1.5))
+        self.assertGreater(len(distances.distances_gt_to_pred), 0)
+
+
+class TestStructuralSimilarity(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.reference = rs.rand(12, 20, 18) * 100 + 50
+        self.prediction = self.reference + rs.randn(12, 20, 18) * 10
+
+    def test_skimage(self):
+        for reference, prediction in ((self.reference, self.prediction), (self.reference[5], self.prediction[5])):
+            for gaussian_weights in (False, True):
+                with self.subTest(ndim=reference.ndim, gaussian_weights=gaussian_weights):
+                    expected = skimage.metrics.structural_similarity(reference, prediction, data_range=reference.max(),
+                                                                     gaussian_weights=gaussian_weights)
+                    for chunk_size in (None, 1, 4):
+                        ssim = metric.StructuralSimilarityIndexMeasure(gaussian_weights=gaussian_weights,
+                                                                       chunk_size=chunk_size)
+                        ssim.prediction, ssim.reference = prediction, reference
+                        self.assertAlmostEqual(ssim.calculate(), expected, delta=1e-6)
+
+    def test_mask(self):
+        mask = np.zeros(self.reference.shape, np.uint8)
+        mask[2:10, 0:12, 5:16] = 1
+        _, full = skimage.metrics.structural_similarity(self.reference, self.prediction,
+                                                        data_range=self.reference.max(), full=True)
+        valid = np.zeros(self.reference.shape, bool)
+        valid[3:-3, 3:-3, 3:-3] = True  # without the border of half the window size
+
+        ssim = metric.StructuralSimilarityIndexMeasure(chunk_size=3)
+        ssim.prediction, ssim.reference = self.prediction, self.reference
+        ssim.intermediates = base.Intermediates({'mask': lambda i: mask})
+        self.assertAlmostEqual(ssim.calculate(), full[(mask == 1) & valid].mean(), delta=1e-6)
+
+    def test_window_size(self):
+        ssim = metric.StructuralSimilarityIndexMeasure(win_size=4)
+        ssim.prediction, ssim.reference = self.prediction, self.reference
+        with self.assertRaises(ValueError):
+            ssim.calculate()
+        ssim.win_size = 15
+        with self.assertRaises(ValueError):
+            ssim.calculate()
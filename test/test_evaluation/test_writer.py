@@ -0,0 +1,60 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import pymia.evaluation.evaluator as eval_
+import pymia.evaluation.writer as writer
+
+
+class TestResultTable(unittest.TestCase):
+
+    def setUp(self):
+        rs = np.random.RandomState(0)
+        self.results = [eval_.Result(id_, label, metric, float(rs.rand()))
+                        for id_ in ('S2', 'S1', 'S3') for label in ('B', 'A') for metric in ('DICE', 'HDRFDST')]
+        del self.results[2]  # missing result of S2, label A, DICE
+        self.results.append(eval_.Result('S1', 'B', 'DICE', -1.0))  # duplicate
+
+    def test_get(self):
+        table = eval_.ResultTable(self.results)
+        self.assertEqual(table.ids, ['S1', 'S2', 'S3'])
+        self.assertEqual(table.labels, ['A', 'B'])
+        self.assertEqual(table.metrics, ['DICE', 'HDRFDST'])
+        for id_ in table.ids:
+            for label in table.labels:
+                for metric in table.metrics:
+                    expected = next((r.value for r in self.results
+                                     if r.id_ == id_ and r.label == label and r.metric == metric), None)
+                    self.assertEqual(table.get(id_, label, metric), expected)
+        self.assertIsNone(table.get('S4', 'A', 'DICE'))
+
+        values = table.get_values(default='n/a')
+        self.assertEqual(values.shape, (3, 2, 2))
+        self.assertEqual(values[1, 0, 0], 'n/a')
+        self.assertEqual(values[0, 1, 0], table.get('S1', 'B', 'DICE'))
+
+    def test_aggregate(self):
+        functions = {'MEAN': np.mean, 'STD': np.std}
+        aggregated = writer.StatisticsAggregator(functions).calculate(self.results)
+        expected = [(fn_id, label, metric, float(fn([r.value for r in self.results
+                                                      if r.label == label and r.metric == metric])))
+                    for label in ('A', 'B') for metric in ('DICE', 'HDRFDST') for fn_id, fn in functions.items()]
+        self.assertEqual(len(aggregated), len(expected))
+        for result, (fn_id, label, metric, value) in zip(aggregated, expected):
+            self.assertEqual((result.id_, result.label, result.metric), (fn_id, label, metric))
+            self.assertAlmostEqual(result.value, value)
+        self.assertEqual(eval_.ResultTable([]).aggregate(functions), [])
+
+    def test_csv_writer(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'results.csv')
+            writer.CSVWriter(path).write(eval_.ResultTable(self.results))
+            with open(path, newline='') as file:
+                rows = list(csv.reader(file, delimiter=';'))
+        self.assertEqual(rows[0], ['SUBJECT', 'LABEL', 'DICE', 'HDRFDST'])
+        self.assertEqual(len(rows), 1 + 3 * 2)
+        self.assertEqual(rows[3][:3], ['S2', 'A', 'n/a'])
+        self.assertEqual(float(rows[2][2]), self.results[3].value)  # S1, B, DICE
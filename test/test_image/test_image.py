@@ -60,6 +60,22 @@ class TestImageProperties(unittest.TestCase):
         self.assertEqual(dut.number_of_components_per_pixel, 1)
         self.assertEqual(dut.pixel_id, pixel_id)
 
+    def test_from_values(self):
+        size = (10, 10, 3)
+        direction = (0, 1, 0, 1, 0, 0, 0, 0, 1)
+        image = sitk.Image(list(size), sitk.sitkUInt8)
+        image.SetOrigin(size)
+        image.SetSpacing(size)
+        image.SetDirection(direction)
+        expected = img.ImageProperties(image)
+        dut = img.ImageProperties.from_values(size, size, size, direction)
+
+        self.assertEqual(dut, expected)
+        self.assertEqual(hash(dut), hash(expected))
+        self.assertEqual(dut.dimensions, 3)
+        self.assertEqual(dut.number_of_components_per_pixel, 1)
+        self.assertEqual(dut.pixel_id, sitk.sitkUInt8)
+
     def test_equality(self):
         x = 10
         y = 10
@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+import pymia.data.assembler as assm
+import pymia.data.definition as defs
+import pymia.data.extraction as extr
+import pymia.evaluation.evaluator as eval_
+import pymia.evaluation.metric as metric
+import pymia.inference as inf
+from ..test_data import helper
+
+
+class TestInferencePipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path = helper.create_dataset(self.tmp_dir.name, [(4, 6, 8), (3, 6, 8), (4, 6, 8)])
+        self.datasource = extr.PymiaDatasource(self.dataset_path, extr.SliceIndexing(),
+                                               extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+        self.labels = extr.PymiaDatasource(self.dataset_path, None, extr.DataExtractor(categories=(defs.KEY_LABELS, )))
+
+    def tearDown(self):
+        self.datasource.close_reader()
+        self.labels.close_reader()
+        self.tmp_dir.cleanup()
+
+    def test_run(self):
+        model_calls = []
+
+        def model_fn(inputs):
+            model_calls.append(len(inputs))
+            return inputs  # identity
+
+        pipeline = inf.InferencePipeline(self.datasource, model_fn, batch_size=3, input_key=defs.KEY_LABELS)
+        self.assertEqual(len(pipeline), 4)
+        predictions = pipeline.run()
+
+        self.assertEqual(model_calls, [3, 3, 3, 2])
+        self.assertEqual(sorted(predictions), [0, 1, 2])
+        for subject_index, prediction in predictions.items():
+            np.testing.assert_array_equal(prediction, self.labels[subject_index][defs.KEY_LABELS])
+
+    def test_patches_and_evaluation(self):
+        strategy = extr.PatchWiseIndexing((2, 4, 4), ignore_incomplete=False, stride=(1, 2, 2))
+        evaluator = eval_.SegmentationEvaluator([metric.DiceCoefficient()], {1: 'ONE', 2: 'TWO'})
+        assembler = assm.SubjectAssembler(self.datasource, max_subjects=2)
+        pipeline = inf.InferencePipeline(self.datasource, lambda inputs: inputs, assembler, strategy,
+                                         batch_size=5, input_key=defs.KEY_LABELS, evaluator=evaluator)
+
+        subjects = [subject_index for subject_index, _ in pipeline]
+        self.assertEqual(subjects, [0, 1, 2])  # in the order of assembly
+        self.assertEqual([r.id_ for r in evaluator.results], ['Subject_1', 'Subject_1', 'Subject_2', 'Subject_2',
+                                                              'Subject_3', 'Subject_3'])
+        self.assertTrue(all(r.value == 1 for r in evaluator.results))
+
+    def test_subset(self):
+        sample_indices = np.flatnonzero(self.datasource.indices.subject_indices == 1)
+        pipeline = inf.InferencePipeline(self.datasource, lambda inputs: inputs, batch_size=2,
+                                         input_key=defs.KEY_LABELS, sample_indices=sample_indices)
+        predictions = pipeline.run()
+        self.assertEqual(list(predictions), [1])
+        np.testing.assert_array_equal(predictions[1], self.labels[1][defs.KEY_LABELS])
+
+    def test_model_error(self):
+        def model_fn(inputs):
+            raise RuntimeError('model failed')
+
+        pipeline = inf.InferencePipeline(self.datasource, model_fn, input_key=defs.KEY_LABELS)
+        with self.assertRaises(RuntimeError):
+            pipeline.run()
+        self.assertEqual(pipeline._readers, [])